@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Performance harnesses. Run from the repo root, e.g. `python -m benchmarks.bench_ingest_embedding`.
@@ -0,0 +1,108 @@
+# benchmarks/bench_ann_index.py
+"""
+Recall vs latency vs size for every VECTOR_INDEX_TYPE on a synthetic corpus of unit-norm,
+clustered vectors (shaped like real embeddings: topics plus noise). Each index is built
+with the same code as ingestion (vector_store.build_index), written to disk and opened
+memory-mapped like a live shard. Recall@k is measured against exact search on the
+full-dimension vectors, including for the --reduce runs (shortened embeddings, truncated
+and re-normalized the way text-embedding-3 `dimensions` does it).
+
+    python -m benchmarks.bench_ann_index --chunks 1000000 --dim 1536 --reduce 512
+    python -m benchmarks.bench_ann_index --chunks 200000 --dim 256 --types flat hnsw   # laptop-sized
+
+1M x 1536 float32 is ~6 GB of raw vectors; pick --dim/--chunks to fit the machine.
+"""
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import faiss
+from config import Config
+from modules.vector_store import INDEX_TYPES, MMAP_FLAGS, build_index, tune, describe
+
+
+def synthetic_corpus(chunks, dim, topics, seed=0, block=50000):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim), dtype=np.float32)
+    # Leading components carry most of the energy, as in text-embedding-3 (what makes shortening work)
+    weights = (1.0 / np.sqrt(1.0 + np.arange(dim) / (dim / 16))).astype(np.float32)
+    vectors = np.empty((chunks, dim), dtype=np.float32)
+    for start in range(0, chunks, block):
+        n = min(block, chunks - start)
+        rows = (centers[rng.integers(0, topics, n)] + 0.6 * rng.standard_normal((n, dim), dtype=np.float32)) * weights
+        vectors[start:start + n] = rows / np.linalg.norm(rows, axis=1, keepdims=True)
+    return vectors
+
+
+def shorten(vectors, dim):
+    short = np.ascontiguousarray(vectors[:, :dim])
+    return short / np.linalg.norm(short, axis=1, keepdims=True)
+
+
+def percentile_ms(samples, p):
+    return round(float(np.percentile(samples, p)) * 1000, 3)
+
+
+def run(index_type, vectors, queries, truth, k, tmp):
+    start = time.perf_counter()
+    index = build_index(vectors, index_type)
+    build_s = time.perf_counter() - start
+    path = os.path.join(tmp, f"{index_type}.faiss")
+    faiss.write_index(index, path)
+    del index
+    index = tune(faiss.read_index(path, MMAP_FLAGS)) # Same way MmapShard opens it
+
+    latencies, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    result = {
+        "type": index_type, "dim": vectors.shape[1], "index": describe(index),
+        f"recall@{k}": round(float(recall), 4),
+        "p50_ms": percentile_ms(latencies, 50), "p99_ms": percentile_ms(latencies, 99),
+        "size_mb": round(os.path.getsize(path) / 2**20, 1), "build_s": round(build_s, 1),
+    }
+    os.remove(path)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1000000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--reduce", type=int, nargs="*", default=[], help="Also test shortened embeddings")
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--topics", type=int, default=2000, help="Synthetic clusters in the corpus")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    Config.VECTOR_INDEX_MIN_CHUNKS = 0 # Benchmark the configured structure, not the small-shard fallback
+    print(f"Generating {args.chunks} x {args.dim} corpus...")
+    vectors = synthetic_corpus(args.chunks, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    picks = rng.choice(args.chunks, args.queries, replace=False)
+    queries = vectors[picks] + 0.3 * rng.standard_normal((args.queries, args.dim), dtype=np.float32) / np.sqrt(args.dim)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    print("Exact ground truth...")
+    _, truth = faiss.knn(queries, vectors, args.k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for dim in [args.dim] + args.reduce:
+            corpus = vectors if dim == args.dim else shorten(vectors, dim)
+            probe = queries if dim == args.dim else shorten(queries, dim)
+            for index_type in args.types:
+                if index_type == "ivf_pq" and dim % Config.PQ_M:
+                    print({"type": index_type, "dim": dim, "skipped": f"PQ_M={Config.PQ_M} does not divide {dim}"})
+                    continue
+                print(run(index_type, corpus, probe, truth, args.k, tmp))
+            del corpus
+
+
+if __name__ == "__main__":
+    main()
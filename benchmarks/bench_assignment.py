@@ -0,0 +1,122 @@
+# benchmarks/bench_assignment.py
+"""
+Simulates bursty escalation traffic against a small HR team and compares how evenly
+each assignment strategy spreads the queue:
+
+  random        the old assign_hr_round_robin (random.choice over get_hr_list())
+  round_robin   AssignmentEngine(strategy="round_robin")
+  least_loaded  AssignmentEngine(strategy="least_loaded")
+
+Every tick a few tickets arrive (occasionally a burst of dozens), and each specialist
+resolves their oldest open tickets at their own pace. Reports the mean variance and
+worst spread of open-queue length across staff, plus the share of tickets handled
+in the employee's region.
+
+    python -m benchmarks.bench_assignment --ticks 300 --seed 7
+"""
+import os
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from config import Config
+from modules import database
+from modules.auth import AssignmentEngine
+from modules.migrations import migrate
+
+# (id, region, tickets resolved per tick)
+HR_STAFF = [
+    ("HR001", "US", 2), ("HR002", "India", 2), ("HR003", "India", 1),
+    ("HR004", "India", 1), ("HR005", "US", 1), ("HR006", "UK", 1),
+]
+EMPLOYEE_REGIONS = ["India"] * 5 + ["US"] * 4 + ["UK"]
+
+
+def seed(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO users VALUES (?, ?, 'HR', ?, 'English')",
+                     [(hr_id, f"{hr_id} (HR)", region) for hr_id, region, _ in HR_STAFF])
+    conn.commit()
+    conn.close()
+
+
+def arrivals(rng, burst_rate, burst_size):
+    if rng.random() < burst_rate:
+        return rng.randint(burst_size // 2, burst_size)
+    return rng.choice([0, 1, 1, 2, 3])
+
+
+def run(strategy, ticks, rng_seed, burst_rate, burst_size):
+    rng = random.Random(rng_seed)
+    legacy_rng = random.Random(rng_seed + 1)
+    regions = {hr_id: region for hr_id, region, _ in HR_STAFF}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "assign.db")
+        migrate(db_path, verbose=False)
+        seed(db_path)
+        Config.DB_PATH = db_path
+
+        engine = None
+        if strategy != "random":
+            engine = AssignmentEngine(strategy=strategy)
+
+        variances, spreads, peaks = [], [], []
+        created, in_region = 0, 0
+        for tick in range(ticks):
+            for _ in range(arrivals(rng, burst_rate, burst_size)):
+                region = rng.choice(EMPLOYEE_REGIONS)
+                if engine:
+                    hr_id = engine.assign(region)
+                else:
+                    hr_id = legacy_rng.choice(database.get_hr_list())
+                database.create_ticket(f"EMP{created:05d}", f"escalation {created}", 3.0, hr_id)
+                created += 1
+                in_region += regions[hr_id] == region
+
+            for hr_id, _, capacity in HR_STAFF:
+                oldest = database.get_tickets_page(assigned_to=hr_id, status="Open", sort="oldest", page_size=capacity)
+                for ticket_id in oldest["ticket_id"]:
+                    database.update_ticket_status(int(ticket_id), "Resolved")
+
+            counts = database.get_open_ticket_counts()
+            queue = [counts.get(hr_id, 0) for hr_id, _, _ in HR_STAFF]
+            variances.append(statistics.pvariance(queue))
+            spreads.append(max(queue) - min(queue))
+            peaks.append(max(queue))
+
+        consistent = None
+        if engine:
+            truth = database.get_open_ticket_counts()
+            consistent = all(truth.get(hr_id, 0) == load for hr_id, _, load in engine.snapshot())
+        database.get_pool().close()
+
+    return {
+        "strategy": strategy,
+        "tickets": created,
+        "mean_queue_variance": round(statistics.mean(variances), 2),
+        "p95_queue_spread": sorted(spreads)[int(0.95 * (len(spreads) - 1))],
+        "peak_queue": max(peaks),
+        "in_region_pct": round(100 * in_region / max(created, 1), 1),
+        "counters_consistent": consistent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--burst-rate", type=float, default=0.08, help="Chance per tick of an escalation burst")
+    parser.add_argument("--burst-size", type=int, default=40, help="Largest burst")
+    args = parser.parse_args()
+
+    original_path = Config.DB_PATH
+    try:
+        for strategy in ("random", "round_robin", "least_loaded"):
+            print(run(strategy, args.ticks, args.seed, args.burst_rate, args.burst_size))
+    finally:
+        Config.DB_PATH = original_path
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_cold_start.py
+"""
+Cold start of one region shard at growing corpus sizes: the old LangChain format
+(FAISS.load_local, which reads the whole index and unpickles the docstore) against the
+memory-mapped shard (MmapShard: index.faiss mapped in place, chunks.db read per hit).
+Each load runs in a fresh child process so time and RSS are not flattered by an earlier one.
+
+    python -m benchmarks.bench_cold_start --chunks 10000 50000 200000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+DIM = 1536
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def build(tmp, chunks):
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import FakeEmbeddings
+    from modules.vector_store import write_shard
+
+    rng = np.random.default_rng(chunks)
+    vectors = rng.standard_normal((chunks, DIM), dtype=np.float32)
+    texts = [f"Policy clause {i}: overtime, leave and benefits apply as described. " * 6 for i in range(chunks)]
+    ids = [f"bench.pdf::{i}" for i in range(chunks)]
+    metadatas = [{"region": "India", "page": i // 20} for i in range(chunks)]
+
+    legacy = os.path.join(tmp, f"legacy_{chunks}")
+    FAISS.from_embeddings(list(zip(texts, vectors)), FakeEmbeddings(size=DIM), metadatas=metadatas, ids=ids).save_local(legacy)
+    mmap = os.path.join(tmp, f"mmap_{chunks}")
+    write_shard(mmap, vectors, ids, texts, metadatas)
+    return legacy, mmap
+
+
+def child(fmt, path):
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import FakeEmbeddings
+    from modules.vector_store import MmapShard
+
+    query = np.random.default_rng(0).standard_normal(DIM, dtype=np.float32)
+    baseline = rss_mb() # After imports: only the shard itself is measured
+    start = time.perf_counter()
+    if fmt == "legacy":
+        shard = FAISS.load_local(path, FakeEmbeddings(size=DIM), allow_dangerous_deserialization=True)
+    else:
+        shard = MmapShard(path)
+    load = time.perf_counter() - start
+    loaded_rss = rss_mb() - baseline
+
+    start = time.perf_counter()
+    shard.similarity_search_by_vector(query.tolist(), k=4)
+    first_query = time.perf_counter() - start
+    print(json.dumps({"format": fmt, "load_ms": round(load * 1000, 1), "rss_after_load_mb": round(loaded_rss, 1),
+                      "first_query_ms": round(first_query * 1000, 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--child", nargs=2, metavar=("FORMAT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(*args.child)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for chunks in args.chunks:
+            paths = dict(zip(("legacy", "mmap"), build(tmp, chunks)))
+            for fmt, path in paths.items():
+                out = subprocess.run([sys.executable, "-m", "benchmarks.bench_cold_start", "--child", fmt, path],
+                                     check=True, capture_output=True, text=True).stdout
+                print({"chunks": chunks, **json.loads(out.strip().splitlines()[-1])})
+
+
+if __name__ == "__main__":
+    main()
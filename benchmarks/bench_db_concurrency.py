@@ -0,0 +1,93 @@
+# benchmarks/bench_db_concurrency.py
+"""
+Write throughput of N simulated Streamlit sessions hammering the chat/ticket tables,
+comparing the old connect-per-statement access with the pooled WAL layer.
+
+    python -m benchmarks.bench_db_concurrency --sessions 32 --turns 50
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+from config import Config
+from modules import database
+from modules.migrations import migrate
+
+def legacy_turn(db_path, user_id, i):
+    """What every helper did before: fresh connection, one statement, commit, close."""
+    for role, content in (("user", f"question {i}"), ("assistant", f"answer {i}")):
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO chat_history (user_id, role, content) VALUES (?, ?, ?)", (user_id, role, content))
+        conn.commit()
+        conn.close()
+    if i % 5 == 0:
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO tickets (emp_id, question, score, assigned_to, status) VALUES (?, ?, ?, ?, ?)",
+                     (user_id, f"question {i}", 3.0, "HR001", "Open"))
+        conn.commit()
+        conn.close()
+    conn = sqlite3.connect(db_path)
+    conn.execute("SELECT role, content FROM chat_history WHERE user_id=? ORDER BY msg_id", (user_id,)).fetchall()
+    conn.close()
+
+
+def pooled_turn(db_path, user_id, i):
+    """One transaction per chat turn through the shared pool."""
+    with database.transaction():
+        database.save_chat_message(user_id, "user", f"question {i}")
+        if i % 5 == 0:
+            database.create_ticket(user_id, f"question {i}", 3.0, "HR001")
+        database.save_chat_message(user_id, "assistant", f"answer {i}")
+    database.fetch_chat_history(user_id)
+
+
+def run(mode, sessions, turns):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        migrate(db_path, verbose=False)
+        Config.DB_PATH = db_path
+        turn = legacy_turn if mode == "legacy" else pooled_turn
+
+        errors = []
+        def session(sid):
+            for i in range(turns):
+                try:
+                    turn(db_path, f"EMP{sid:04d}", i)
+                except sqlite3.OperationalError as e:
+                    errors.append(str(e))
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=session, args=(s,)) for s in range(sessions)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute("SELECT COUNT(*) FROM chat_history").fetchone()[0]
+        conn.close()
+        database.get_pool().close()
+        return {"mode": mode, "sessions": sessions, "seconds": round(elapsed, 2),
+                "messages_written": rows, "writes_per_sec": round(rows / elapsed, 1),
+                "locked_errors": len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    original_path = Config.DB_PATH
+    try:
+        for mode in ("legacy", "pooled"):
+            print(run(mode, args.sessions, args.turns))
+    finally:
+        Config.DB_PATH = original_path
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/bench_ingest_embedding.py
+"""
+Drives the ingestion embedding stage (embed_in_batches) against the local stub
+with injected latency and throttling, and reports chunks/s. The same texts are then
+embedded by the offline backend (LocalEmbeddings: fit + embed, no network).
+
+    python -m benchmarks.bench_ingest_embedding --chunks 5000 --latency 0.1 --throttle-rate 0.15
+"""
+import os
+import time
+import argparse
+import tempfile
+from langchain_openai import OpenAIEmbeddings
+from benchmarks.stub_openai import StubOpenAIServer
+from modules.embeddings import CachedEmbeddings, embed_in_batches
+from modules.local_embeddings import LocalEmbeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--in-flight", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--throttle-rate", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    texts = [f"Policy clause {i}: overtime, leave and benefits text for region {i % 7}." for i in range(args.chunks)]
+
+    with StubOpenAIServer(latency=args.latency, jitter=args.jitter, throttle_rate=args.throttle_rate,
+                          error_rate=args.error_rate, dim=256) as stub:
+        raw = OpenAIEmbeddings(model="stub-embedding", api_key="stub", base_url=stub.base_url,
+                               max_retries=0, check_embedding_ctx_length=False)
+
+        # Baseline: one request per batch, strictly serial (what FAISS.from_documents did)
+        for in_flight in (1, args.in_flight):
+            _, stats = embed_in_batches(raw, texts, batch_size=args.batch_size, max_in_flight=in_flight)
+            print(f"in_flight={in_flight}: {stats}")
+
+        # Resume: batches already written to the cache are not re-sent
+        with tempfile.TemporaryDirectory() as tmp:
+            cached = CachedEmbeddings(raw, "stub-embedding", os.path.join(tmp, "cache.db"))
+            embed_in_batches(cached, texts[: len(texts) // 2], batch_size=args.batch_size, max_in_flight=args.in_flight)
+            before = stub.stats["embeddings"]
+            _, stats = embed_in_batches(cached, texts, batch_size=args.batch_size, max_in_flight=args.in_flight)
+            print(f"resumed run: {stats} | API calls: {stub.stats['embeddings'] - before} | cache: {cached.stats()}")
+
+        print(f"stub: {stub.stats}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        local = LocalEmbeddings(tmp).fit(texts)
+        local.save()
+        fit_s = time.perf_counter() - start
+        _, stats = embed_in_batches(local, texts, batch_size=args.batch_size, max_in_flight=args.in_flight)
+        print(f"local backend: fit {fit_s:.2f}s, {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_llm_client.py
+"""
+Exercises LLMClient against the local stub in three upstream conditions:
+
+  healthy  low latency, no failures                -> throughput and latency percentiles
+  flaky    a share of 429s and 500s                 -> success rate with vs without retries
+  slow     every request far slower than the budget -> callers give up at their deadline
+
+For each scenario it compares a plain ChatOpenAI (what the agents used to call directly:
+no deadline, no retries) with the shared client.
+
+    python -m benchmarks.bench_llm_client --calls 200 --concurrency 32
+"""
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import HumanMessage
+from benchmarks.stub_openai import StubOpenAIServer
+from modules.llm_client import LLMClient
+
+SCENARIOS = {
+    "healthy": {"latency": 0.05, "jitter": 0.02},
+    "flaky": {"latency": 0.05, "jitter": 0.02, "throttle_rate": 0.1, "error_rate": 0.1},
+    "slow": {"latency": 5.0},
+}
+
+
+def run(scenario, calls, concurrency, timeout):
+    messages = [HumanMessage(content="What is the overtime rate?")]
+    with StubOpenAIServer(**SCENARIOS[scenario]) as stub:
+        raw = ChatOpenAI(model="stub", api_key="stub", base_url=stub.base_url, max_retries=0)
+        client = LLMClient(llm=raw, max_in_flight=concurrency, timeout=timeout)
+        # The old code had no budget at all; cap the raw run so the benchmark itself terminates
+        raw_timeout = max(timeout, SCENARIOS[scenario]["latency"] * 2)
+
+        results = {}
+        for name, call in (
+            ("direct", lambda: raw.invoke(messages, timeout=raw_timeout)),
+            ("client", lambda: client.invoke(messages, label=scenario)),
+        ):
+            def timed_call(_):
+                start = time.perf_counter()
+                try:
+                    call()
+                    return True, time.perf_counter() - start
+                except Exception:
+                    return False, time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(timed_call, range(calls)))
+            elapsed = time.perf_counter() - start
+            waits = sorted(t for _, t in outcomes)
+            results[name] = {
+                "ok_pct": round(100 * sum(ok for ok, _ in outcomes) / calls, 1),
+                "seconds": round(elapsed, 2),
+                "calls_per_sec": round(calls / elapsed, 1),
+                "p50_ms": round(1000 * waits[len(waits) // 2], 1),
+                "max_wait_ms": round(1000 * waits[-1], 1),
+            }
+        client_stats = client.stats(scenario)
+        results["client"].update(retries=client_stats["retries"], timeouts=client_stats["timeouts"])
+    return {"scenario": scenario, **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=2.0, help="Per-call deadline for the client (seconds)")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append")
+    args = parser.parse_args()
+
+    for scenario in args.scenario or SCENARIOS:
+        calls = args.calls if scenario != "slow" else min(args.calls, args.concurrency * 2)
+        print(run(scenario, calls, args.concurrency, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
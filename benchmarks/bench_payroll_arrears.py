@@ -0,0 +1,104 @@
+# benchmarks/bench_payroll_arrears.py
+"""
+Workforce-wide overtime arrears after a rate change: the batch engine
+(modules.payroll.recompute_arrears: keyset-paged columnar chunks, NumPy arrears, bulk
+writes) against the per-employee path the chat tool uses (one salary lookup, one
+computation and one committed insert per employee). The per-employee path is timed on
+a sample and extrapolated; its results are checked against the batch run's.
+
+    python -m benchmarks.bench_payroll_arrears --employees 500000 --multiplier 1.75
+    python -m benchmarks.bench_payroll_arrears --employees 500000 --chunk-size 10000 100000
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import numpy as np
+from config import Config
+from modules import database
+from modules.migrations import migrate
+from modules.payroll import employee_arrears, recompute_arrears
+
+# region -> (currency, typical base hourly rate)
+REGIONS = {"India": ("Rs", 1100.0), "US": ("USD", 48.0), "Germany": ("EUR", 35.0)}
+
+
+def seed(db_path, employees, seed=0, block=100000):
+    rng = np.random.default_rng(seed)
+    names = list(REGIONS)
+    conn = sqlite3.connect(db_path)
+    for start in range(0, employees, block):
+        n = min(block, employees - start)
+        regions = rng.choice(len(names), n, p=[0.5, 0.3, 0.2])
+        base = np.array([REGIONS[names[r]][1] for r in regions]) * rng.uniform(0.5, 2.0, n)
+        hours = np.where(rng.random(n) < 0.6, rng.integers(1, 60, n), 0) # 40% have no pending overtime
+        conn.executemany(
+            "INSERT INTO payroll (emp_id, region, currency, base_hourly, pending_ot_hours, ot_multiplier) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"EMP{start + i:07d}", names[r], REGIONS[names[r]][0], round(float(b), 2), float(h), 1.5)
+             for i, (r, b, h) in enumerate(zip(regions, base, hours)))
+        )
+    conn.commit()
+    conn.close()
+
+
+def per_employee(emp_ids, multiplier, run_id):
+    """The pre-batch shape of the work: every employee is its own lookup and its own write."""
+    start = time.perf_counter()
+    for emp_id in emp_ids:
+        data = employee_arrears(emp_id, multiplier)
+        if data["arrears"] > 0:
+            database.save_payroll_arrears([(run_id, emp_id, "", data["currency"], data["pending_ot_hours"],
+                                            data["ot_multiplier"], multiplier, data["arrears"])])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=500000)
+    parser.add_argument("--multiplier", type=float, default=1.75, help="New overtime rate (currently 1.5x)")
+    parser.add_argument("--chunk-size", type=int, nargs="+", default=[Config.PAYROLL_CHUNK_SIZE])
+    parser.add_argument("--sample", type=int, default=2000, help="Employees timed on the per-employee path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DB_PATH = os.path.join(tmp, "payroll.db")
+        migrate(Config.DB_PATH, verbose=False)
+        start = time.perf_counter()
+        seed(Config.DB_PATH, args.employees)
+        print(f"Seeded {args.employees:,} employees in {time.perf_counter() - start:.1f}s")
+
+        batch = None
+        for chunk_size in args.chunk_size:
+            for region in ("India", None):
+                report = recompute_arrears(args.multiplier, region=region, chunk_size=chunk_size)
+                print({"path": "batch", "region": region or "all", "chunk_size": chunk_size,
+                       "employees": report["employees"], "affected": report["affected"],
+                       "seconds": report["seconds"],
+                       "employees_per_s": round(report["employees"] / max(report["seconds"], 1e-9))})
+                if region is None:
+                    batch = report
+        for total in batch["totals"]:
+            print(f"  {total['region']:<8} {total['currency']:<4} {total['employees']:>8,} owed  "
+                  f"{total['arrears']:>18,.2f}")
+
+        sample = [f"EMP{i:07d}" for i in np.random.default_rng(1).choice(args.employees, args.sample, replace=False)]
+        loop_run = database.start_payroll_run(None, args.multiplier, "per-employee baseline")
+        seconds = per_employee(sample, args.multiplier, loop_run)
+        estimate = seconds / len(sample) * batch["employees"]
+        print({"path": "per-employee", "sampled": len(sample), "seconds": round(seconds, 2),
+               "extrapolated_s": round(estimate, 1), "speedup": round(estimate / batch["seconds"], 1)})
+
+        with database._reader() as conn:
+            mismatches = conn.execute(
+                "SELECT COUNT(*) FROM payroll_arrears l LEFT JOIN payroll_arrears b "
+                "ON b.run_id=? AND b.emp_id=l.emp_id WHERE l.run_id=? AND (b.arrears IS NULL OR b.arrears != l.arrears)",
+                (batch["run_id"], loop_run)
+            ).fetchone()[0]
+        print(f"Per-employee results differing from the batch run: {mismatches}")
+        database.get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_regulation_poller.py
+"""
+Cost of watching many jurisdictions with RegulationPoller: half the sources are HTTP
+pages on the stub regulator, half are local files. Runs a first cycle (everything is
+new), then quiet cycles with nothing changed, then a cycle where a few sources publish
+an update. For comparison, the old approach fetched and parsed every source on every scan.
+
+    python -m benchmarks.bench_regulation_poller --sources 40 --cycles 5 --changes 2
+"""
+import os
+import time
+import argparse
+import tempfile
+from config import Config
+from modules import database
+from modules.migrations import migrate
+from modules.regulation_feed import RegulationPoller, parse_regulation
+from benchmarks.stub_regulator import StubRegulatorServer, render
+
+
+def naive_cycle(sources):
+    """Unconditional fetch + parse of every source (what check_for_updates did for its one page)."""
+    import urllib.request
+    for source in sources:
+        if source["url"].startswith("http"):
+            with urllib.request.urlopen(source["url"]) as response:
+                raw = response.read()
+        else:
+            with open(source["url"], "rb") as f:
+                raw = f.read()
+        parse_regulation(raw.decode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=40)
+    parser.add_argument("--cycles", type=int, default=5, help="Quiet cycles after the first one")
+    parser.add_argument("--changes", type=int, default=2, help="Sources updated before the final cycle")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub regulator latency per request")
+    args = parser.parse_args()
+
+    original_path = Config.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DB_PATH = os.path.join(tmp, "feed.db")
+        migrate(Config.DB_PATH, verbose=False)
+
+        http_names = [f"web{i:02d}" for i in range(args.sources // 2)]
+        with StubRegulatorServer(jurisdictions=http_names, latency=args.latency) as stub:
+            sources = [{"name": n, "url": stub.url(n), "region": n} for n in http_names]
+            for i in range(args.sources - len(http_names)):
+                path = os.path.join(tmp, f"file{i:02d}.html")
+                with open(path, "wb") as f:
+                    f.write(render(f"file{i:02d} Labour Code", "Baseline employment rules."))
+                sources.append({"name": f"file{i:02d}", "url": path, "region": f"file{i:02d}"})
+
+            poller = RegulationPoller(sources)
+            try:
+                first = poller.poll_once()
+                print({"cycle": "first", **{k: first[k] for k in ("checked", "changed", "seconds")}})
+
+                start = time.perf_counter()
+                for _ in range(args.cycles):
+                    quiet = poller.poll_once()
+                per_cycle = (time.perf_counter() - start) / args.cycles
+                print({"cycle": "quiet", "changed": quiet["changed"], "unchanged": quiet["unchanged"],
+                       "seconds_per_cycle": round(per_cycle, 3), "http_304": stub.stats["not_modified"]})
+
+                for i in range(args.changes):
+                    stub.publish(http_names[i], f"{http_names[i]} Overtime Amendment", "Overtime is now paid at 2x.")
+                update = poller.poll_once()
+                print({"cycle": "update", "changed": update["changed"], "enqueued": [n["title"] for n in update["new"]],
+                       "seconds": update["seconds"]})
+
+                start = time.perf_counter()
+                for _ in range(args.cycles):
+                    naive_cycle(sources)
+                naive = (time.perf_counter() - start) / args.cycles
+                print({"cycle": "naive fetch+parse", "seconds_per_cycle": round(naive, 3),
+                       "speedup": round(naive / per_cycle, 1) if per_cycle else None})
+            finally:
+                database.get_pool().close()
+    Config.DB_PATH = original_path
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_retrieval_modes.py
+"""
+Retrieval latency and hit quality per RETRIEVAL_MODE (vector / lexical / hybrid) on the
+policy PDFs in data/policies. Each question names the region it is asked from and a phrase
+the right chunk contains; hit@1 / hit@4 count how often that chunk is ranked first / retrieved.
+
+Embeddings come from the local stub (--embed-latency simulates the API round trip) unless
+--live is given (Config.OPENAI_BASE_URL) or --local (the offline TF-IDF+SVD backend). Stub
+vectors carry no meaning, so vector hit quality is only representative with --live / --local.
+
+    python -m benchmarks.bench_retrieval_modes --embed-latency 0.08 --rounds 5
+    python -m benchmarks.bench_retrieval_modes --live
+    python -m benchmarks.bench_retrieval_modes --local
+"""
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from config import Config
+from benchmarks.stub_openai import StubOpenAIServer
+
+# (region, question, phrase in the chunk that answers it)
+EVAL_SET = [
+    ("US", "How does the 401k match work?", "matches 100% of employee contributions"),
+    ("US", "When am I eligible for the 401(k) plan?", "first of the month following 30 days"),
+    ("US", "How many PTO days can I carry over?", "maximum of 5 days can be carried over"),
+    ("US", "What is the PTO accrual rate?", "1.25 days of PTO per month"),
+    ("US", "Is there a stipend for my home office?", "one-time stipend of $500"),
+    ("US", "How many days a week must I be in the office?", "3 days a week"),
+    ("US", "Can I be fired without cause?", "at-will"),
+    ("India", "How long is maternity leave?", "26 weeks of paid leave"),
+    ("India", "What is the EPF contribution?", "12% of Basic Pay"),
+    ("India", "How is gratuity calculated?", "Drawn Basic / 26) * 15"),
+    ("India", "Do managers get overtime?", "Not applicable for managerial roles"),
+    ("India", "What is the notice period for confirmed employees?", "Notice period is 60 days"),
+    ("India", "Who handles POSH complaints?", "Internal Complaints Committee"),
+    ("India", "How many casual leave days do I get?", "Casual Leave (CL): 8 days"),
+    ("Germany", "How many vacation days do I get?", "30 working days of vacation"),
+    ("Germany", "When do I need a doctor's note for sick leave?", "mandatory if sick leave exceeds 3"),
+    ("Germany", "What is the notice period during probation?", "notice period is 2"),
+    ("Germany", "Who must be consulted about overtime?", "Works Council must be consulted"),
+    ("Germany", "Until when can I take leftover vacation?", "March 31st"),
+]
+
+
+def contains(doc, phrase):
+    return phrase in " ".join(doc.page_content.split()) # PDF text wraps lines mid-sentence
+
+
+def evaluate(researcher, mode, rounds):
+    researcher.mode = mode
+    latencies, hit1, hit4 = [], 0, 0
+    for r in range(rounds):
+        for region, question, phrase in EVAL_SET:
+            # A fresh wording each round so the answer cache cannot answer
+            start = time.perf_counter()
+            docs = researcher.retrieve(f"{question} (round {r})" if r else question, region)["docs"]
+            latencies.append(time.perf_counter() - start)
+            if r == 0:
+                hit1 += bool(docs) and contains(docs[0], phrase)
+                hit4 += any(contains(d, phrase) for d in docs)
+    n = len(EVAL_SET)
+    return {"mode": mode, "hit@1": round(hit1 / n, 2), "hit@4": round(hit4 / n, 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embed-latency", type=float, default=0.08, help="Stub embedding round trip (s)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--live", action="store_true", help="Use Config.OPENAI_BASE_URL instead of the stub")
+    parser.add_argument("--local", action="store_true", help="Use the offline embedding backend")
+    args = parser.parse_args()
+    if args.local:
+        Config.EMBEDDING_BACKEND = "local"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.VECTOR_DB_PATH = os.path.join(tmp, "kb")
+        Config.ANSWER_CACHE_PATH = os.path.join(tmp, "answers.db")
+        stub = None
+        if not (args.live or args.local):
+            stub = StubOpenAIServer(latency=args.embed_latency)
+            Config.OPENAI_BASE_URL = stub.start()
+        try:
+            from modules.embeddings import build_embeddings
+            from modules.knowledge_base import sync_knowledge_base
+            from modules.agent import ResearcherAgent
+
+            def fresh_embeddings(name):
+                Config.EMBEDDING_CACHE_PATH = os.path.join(tmp, f"embeddings_{name}.db")
+                embeddings = build_embeddings()
+                if stub:
+                    embeddings.underlying.check_embedding_ctx_length = False # The stub takes raw strings
+                return embeddings
+
+            _, report = sync_knowledge_base(fresh_embeddings("ingest"), workers=1)
+            print(f"Indexed {report['total_chunks']} chunks in {report['regions']}")
+            researcher = ResearcherAgent(None, fresh_embeddings("ingest"), Config.VECTOR_DB_PATH)
+            for mode in ("vector", "lexical", "hybrid"):
+                researcher.embeddings = fresh_embeddings(mode) # Cold cache: every query pays its round trip
+                print(evaluate(researcher, mode, args.rounds))
+        finally:
+            if stub:
+                stub.stop()
+
+
+if __name__ == "__main__":
+    main()
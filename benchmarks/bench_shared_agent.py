@@ -0,0 +1,107 @@
+# benchmarks/bench_shared_agent.py
+"""
+Memory and startup cost of N concurrent users, comparing one HRAgent per Streamlit
+session (the old st.session_state.agent) with the shared per-process agent that
+main.py now gets from st.cache_resource. Each user runs one retrieval against a
+synthetic FAISS index. Every mode runs in a fresh child process so RSS numbers are clean.
+
+    python -m benchmarks.bench_shared_agent --users 200 --chunks 2000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from benchmarks.stub_openai import StubOpenAIServer, stub_vector
+
+DIM = 1536
+REGIONS = ("India", "US", "General")
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def build_index(db_path, chunks):
+    """Synthetic per-region shards in the layout load_shards() expects."""
+    import numpy as np
+    from modules.knowledge_base import shard_path, save_manifest, index_spec, MANIFEST_LAYOUT
+    from modules.vector_store import write_shard
+
+    for r, region in enumerate(REGIONS):
+        texts = [f"{region} policy clause {i}: overtime, leave and benefits." * 4 for i in range(r, chunks, len(REGIONS))]
+        vectors = np.array([stub_vector(t, DIM) for t in texts], dtype=np.float32)
+        write_shard(shard_path(region, db_path), vectors, [f"{region}::{i}" for i in range(len(texts))],
+                    texts, [{"region": region}] * len(texts))
+    save_manifest({"version": "bench", "layout": MANIFEST_LAYOUT, "index": index_spec(), "files": {}}, db_path)
+
+
+def child(mode, users, tmp, base_url):
+    Config.OPENAI_BASE_URL = base_url
+    Config.VECTOR_DB_PATH = os.path.join(tmp, "kb")
+    Config.DB_PATH = os.path.join(tmp, "hr.db")
+    Config.ANSWER_CACHE_PATH = os.path.join(tmp, f"answers_{mode}.db")
+    Config.EMBEDDING_CACHE_PATH = os.path.join(tmp, f"embeddings_{mode}.db")
+    from modules.agent import HRAgent
+
+    def new_agent():
+        agent = HRAgent()
+        agent.embeddings.underlying.check_embedding_ctx_length = False # The stub takes raw strings
+        return agent
+
+    baseline = rss_mb()
+    start = time.perf_counter()
+    if mode == "per_session":
+        sessions = [new_agent() for _ in range(users)] # Every session held its own agent
+    else:
+        shared = new_agent()
+        sessions = [shared] * users
+    startup = time.perf_counter() - start
+
+    def user_turn(i):
+        agent = sessions[i]
+        return len(agent.researcher.retrieve(f"What is the overtime rule #{i}?", REGIONS[i % len(REGIONS)])["docs"])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        found = sum(pool.map(user_turn, range(users)))
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "mode": mode, "users": users, "agents": len({id(a) for a in sessions}),
+        "startup_s": round(startup, 2), "retrieval_s": round(elapsed, 2), "docs_found": found,
+        "rss_growth_mb": round(rss_mb() - baseline, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic chunks across all region shards")
+    parser.add_argument("--mode", choices=["per_session", "shared"], action="append")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "TMP", "URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, tmp, url = args.child
+        return child(mode, args.users, tmp, url)
+
+    with tempfile.TemporaryDirectory() as tmp, StubOpenAIServer(dim=DIM) as stub:
+        from modules.migrations import migrate
+        migrate(os.path.join(tmp, "hr.db"), verbose=False)
+        build_index(os.path.join(tmp, "kb"), args.chunks)
+        for mode in args.mode or ("per_session", "shared"):
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_shared_agent", "--users", str(args.users),
+                            "--child", mode, tmp, stub.base_url], check=True)
+
+
+if __name__ == "__main__":
+    main()
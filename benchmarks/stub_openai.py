@@ -0,0 +1,203 @@
+# benchmarks/stub_openai.py
+"""
+Local stand-in for the OpenAI-compatible gateway behind Config.OPENAI_BASE_URL.
+Serves /v1/embeddings and /v1/chat/completions with configurable latency,
+jitter, throttling (429 + Retry-After) and server errors (500).
+
+    python -m benchmarks.stub_openai --port 8808 --latency 0.05 --throttle-rate 0.1
+"""
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+CLASSIFIER_REPLY = '{"intent": "POLICY_FACTS", "type": "L1_FACTUAL", "tone": 1}'
+
+
+def default_chat_reply(messages):
+    """Canned replies: valid classifier JSON for the supervisor, plain prose for everything else."""
+    if any("JSON classifier" in m.get("content", "") for m in messages):
+        return CLASSIFIER_REPLY
+    return "Employees are entitled to overtime at 1.5x the base hourly rate. (stub answer)"
+
+
+def stub_vector(text, dim):
+    """Deterministic unit vector per text, so repeated texts embed identically."""
+    seed = int.from_bytes(hashlib.sha256(str(text).encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class StubOpenAIServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 throttle_rate=0.0, error_rate=0.0, dim=1536, chat_reply=None, stream_delay=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.dim = dim
+        self.chat_reply = chat_reply or default_chat_reply
+        self.stream_delay = stream_delay # Seconds between streamed tokens
+        self.stats = {"requests": 0, "embeddings": 0, "chat": 0, "throttled": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        ThreadingHTTPServer.request_queue_size = 128 # Default backlog of 5 stalls bursts of connects
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass # Keep benchmark output clean
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass # Client cancelled the request (e.g. speculative work on the ticket path)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                server._count("requests")
+
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+
+                roll = random.random()
+                if roll < server.throttle_rate:
+                    server._count("throttled")
+                    return self._send_json(429, {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error"}},
+                                           headers={"Retry-After": "0.2"})
+                if roll < server.throttle_rate + server.error_rate:
+                    server._count("errors")
+                    return self._send_json(500, {"error": {"message": "Internal error (stub)", "type": "server_error"}})
+
+                if self.path.endswith("/embeddings"):
+                    server._count("embeddings")
+                    return self._send_json(200, self._embeddings(request))
+                if self.path.endswith("/chat/completions"):
+                    server._count("chat")
+                    if request.get("stream"):
+                        return self._send_stream(request)
+                    return self._send_json(200, self._chat(request))
+                return self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def _embeddings(self, request):
+                inputs = request.get("input", [])
+                if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                    inputs = [inputs]
+                data = []
+                for i, text in enumerate(inputs):
+                    vector = stub_vector(text, request.get("dimensions") or server.dim)
+                    if request.get("encoding_format") == "base64":
+                        embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+                    else:
+                        embedding = vector.tolist()
+                    data.append({"object": "embedding", "index": i, "embedding": embedding})
+                tokens = sum(len(str(t).split()) for t in inputs)
+                return {"object": "list", "data": data, "model": request.get("model"),
+                        "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+            def _send_stream(self, request):
+                """Server-sent events, one word per chunk, like the real streaming endpoint."""
+                content = server.chat_reply(request.get("messages", []))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                base = {"id": "chatcmpl-stub-stream", "object": "chat.completion.chunk",
+                        "created": int(time.time()), "model": request.get("model")}
+                words = content.split(" ")
+                try:
+                    for i, word in enumerate(words):
+                        delta = {"role": "assistant", "content": word if i == 0 else " " + word}
+                        chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        if server.stream_delay:
+                            time.sleep(server.stream_delay)
+                    done = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                    self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                self.close_connection = True
+
+            def _chat(self, request):
+                messages = request.get("messages", [])
+                content = server.chat_reply(messages)
+                prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+                completion_tokens = len(content.split())
+                return {
+                    "id": f"chatcmpl-stub-{random.randint(0, 1 << 30)}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens},
+                }
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stub server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency", type=float, default=0.05, help="Base seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds per request")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    stub = StubOpenAIServer(args.host, args.port, args.latency, args.jitter, args.throttle_rate, args.error_rate, args.dim)
+    print(f"🧪 Stub OpenAI server on {stub.base_url} (Ctrl+C to stop)")
+    try:
+        stub._httpd.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
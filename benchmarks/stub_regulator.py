@@ -0,0 +1,117 @@
+# benchmarks/stub_regulator.py
+"""
+Local stand-in for government regulation sites: serves one page per jurisdiction at
+/<jurisdiction>.html in the same layout gov_app.py publishes, with ETag and
+Last-Modified validators. Conditional GETs for an unchanged page get a bodyless 304.
+
+    python -m benchmarks.stub_regulator --port 8809 --jurisdictions 40
+"""
+import time
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE = """<html><body>
+    <div id="regulation">
+        <h1 class="reg-title">{title}</h1>
+        <p class="meta">Published: {published}</p>
+        <hr>
+        <div class="reg-body">{body}</div>
+    </div>
+</body></html>"""
+
+
+def render(title, body):
+    return PAGE.format(title=title, body=body, published=time.strftime("%Y-%m-%d")).encode("utf-8")
+
+
+class StubRegulatorServer:
+    def __init__(self, host="127.0.0.1", port=0, jurisdictions=(), latency=0.0):
+        self.latency = latency
+        self.pages = {} # name -> (bytes, etag, last_modified)
+        self.stats = {"requests": 0, "full": 0, "not_modified": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        for name in jurisdictions:
+            self.publish(name, f"{name} Labour Code", f"Baseline employment rules for {name}.")
+        ThreadingHTTPServer.request_queue_size = 128
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+
+    def url(self, name):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/{name}.html"
+
+    def publish(self, name, title, body):
+        page = render(title, body)
+        with self._lock:
+            self.pages[name] = (page, f'"{hashlib.sha256(page).hexdigest()[:16]}"', formatdate(usegmt=True))
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                name = self.path.strip("/").removesuffix(".html")
+                with server._lock:
+                    server.stats["requests"] += 1
+                    entry = server.pages.get(name)
+                if entry is None:
+                    self.send_error(404)
+                    return
+                page, etag, last_modified = entry
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.stats["not_modified"] += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                with server._lock:
+                    server.stats["full"] += 1
+                    server.stats["bytes"] += len(page)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                self.wfile.write(page)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve simulated regulation pages.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8809)
+    parser.add_argument("--jurisdictions", type=int, default=10)
+    args = parser.parse_args()
+
+    names = [f"region{i:02d}" for i in range(args.jurisdictions)]
+    stub = StubRegulatorServer(args.host, args.port, names)
+    print(f"🏛️ Serving {len(names)} jurisdictions, e.g. {stub.url(names[0])} (Ctrl+C to stop)")
+    try:
+        stub._httpd.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
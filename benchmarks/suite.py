@@ -0,0 +1,221 @@
+# benchmarks/suite.py
+"""
+End-to-end benchmark suite: the app's main operations against the local OpenAI stub
+(benchmarks.stub_openai, with configurable latency, jitter, 429 and 500 rates), each at
+one or more concurrency levels, on a throwaway DB / knowledge base built from data/policies.
+
+  score     HRAgent.calculate_score            (fast classifier or LLM)
+  search    ResearcherAgent.search              (retrieval + synthesis)
+  draft     HRAgent.draft_ticket_resolution     (RAG + payroll tool + LLM)
+  rebuild   HRAgent.rebuild_knowledge_base      (full sync into an emptied index dir; warm embedding cache)
+  watchdog  PolicyWatchdog.analyze_impact       (keywords + search_all + analysis, memo bypassed)
+
+Questions get a per-call suffix so the answer cache and stored analyses cannot short-circuit
+the work. Reports throughput and p50/p95/p99 latency per operation, saves them as JSON
+(--save) and compares against a stored run (--baseline). The exit status is 1 on a
+regression, so the suite can gate a deploy:
+
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --baseline baseline.json --save latest.json
+    python -m benchmarks.suite --latency 0.2 --jitter 0.1 --error-rate 0.05 --concurrency 1 8 32
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from config import Config
+from benchmarks.stub_openai import StubOpenAIServer
+
+QUESTIONS = [
+    ("US", "How does the 401k match work?"),
+    ("US", "How many PTO days can I carry over?"),
+    ("India", "What is the overtime pay rate for my pending hours?"),
+    ("India", "How long is maternity leave?"),
+    ("Germany", "How many vacation days do I get?"),
+    ("Germany", "Who must be consulted about overtime?"),
+]
+REGULATION = ("Ministry of Labour notification: overtime must now be paid at 1.75x the ordinary rate "
+              "and maternity leave is extended to 28 weeks.")
+OPERATIONS = ("score", "search", "draft", "rebuild", "watchdog")
+
+
+def percentile_ms(samples, p):
+    return round(float(np.percentile(samples, p)) * 1000, 2) if samples else None
+
+
+def run_operation(call, calls, concurrency, failed=None):
+    """Runs call(i) for i in range(calls) on `concurrency` threads; exceptions and failed(result) count as errors."""
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            result = call(i)
+            ok = not (failed and failed(result))
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, range(calls)))
+    wall = time.perf_counter() - start
+    latencies = [seconds for seconds, ok in outcomes if ok]
+    return {
+        "calls": calls, "concurrency": concurrency, "errors": calls - len(latencies),
+        "wall_s": round(wall, 3), "throughput_per_s": round(len(latencies) / wall, 2),
+        "p50_ms": percentile_ms(latencies, 50), "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+    }
+
+
+def seed_db(db_path):
+    from modules.migrations import migrate
+    migrate(db_path, verbose=False)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, 'English')",
+                     [("EMP001", "John Doe", "EMP", "US"), ("EMP002", "Rahul Sharma", "EMP", "India"),
+                      ("HR001", "Alice (HR)", "HR", "US")])
+    conn.executemany("INSERT OR REPLACE INTO payroll (emp_id, region, currency, base_hourly, pending_ot_hours, "
+                     "ot_multiplier) VALUES (?, ?, ?, ?, ?, ?)",
+                     [("EMP001", "US", "USD", 50, 10, 1.5), ("EMP002", "India", "Rs", 1153, 30, 1.5)])
+    conn.commit()
+    conn.close()
+
+
+def operations(agent, watchdog):
+    """name -> (call(i), failed(result) or None)."""
+    def question(i):
+        region, text = QUESTIONS[i % len(QUESTIONS)]
+        return region, f"{text} (#{i})"
+
+    def draft(i):
+        region, text = question(i)
+        return agent.draft_ticket_resolution({"question": text, "emp_id": "EMP002", "region": region})
+
+    def rebuild(i):
+        shutil.rmtree(Config.VECTOR_DB_PATH, ignore_errors=True) # Full sync every time, not a no-op
+        return agent.rebuild_knowledge_base()
+
+    return {
+        "score": (lambda i: agent.calculate_score(question(i)[1]), lambda r: r.get("decided_by") == "error"),
+        "search": (lambda i: agent.researcher.search(*reversed(question(i))), lambda r: not r),
+        "draft": (draft, lambda r: not r),
+        "rebuild": (rebuild, lambda r: not r.startswith("✅")),
+        "watchdog": (lambda i: watchdog.analyze_impact(f"{REGULATION} (#{i})", refresh=True), None),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(args):
+    with tempfile.TemporaryDirectory() as tmp, StubOpenAIServer(
+        latency=args.latency, jitter=args.jitter, throttle_rate=args.throttle_rate, error_rate=args.error_rate
+    ) as stub:
+        Config.OPENAI_BASE_URL = stub.base_url
+        Config.DB_PATH = os.path.join(tmp, "hr.db")
+        Config.VECTOR_DB_PATH = os.path.join(tmp, "kb")
+        Config.ANSWER_CACHE_PATH = os.path.join(tmp, "answers.db")
+        Config.EMBEDDING_CACHE_PATH = os.path.join(tmp, "embeddings.db")
+        seed_db(Config.DB_PATH)
+        from modules.agent import HRAgent
+        from modules.watchdog import PolicyWatchdog
+
+        agent = HRAgent()
+        if hasattr(agent.embeddings, "underlying"):
+            agent.embeddings.underlying.check_embedding_ctx_length = False # The stub takes raw strings
+        setup = agent.rebuild_knowledge_base()
+        print(f"Setup: {setup}")
+        ops = operations(agent, PolicyWatchdog(agent))
+
+        results, issued = {}, 0
+        try:
+            for name in args.ops:
+                call, failed = ops[name]
+                levels = [1] if name == "rebuild" else args.concurrency # Rebuilds serialize on a lock anyway
+                for concurrency in levels:
+                    calls = args.rebuild_calls if name == "rebuild" else max(args.calls, concurrency)
+                    # Fresh call numbers per level, or the answer cache would serve the repeats
+                    stats = run_operation(lambda i, first=issued: call(first + i), calls, concurrency, failed)
+                    issued += calls
+                    results[f"{name}@{concurrency}"] = stats
+                    print(f"{name + '@' + str(concurrency):<14} {json.dumps(stats)}")
+        finally:
+            agent.close()
+
+        return {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": git_commit(),
+                "python": platform.python_version(), "model": Config.MODEL_NAME,
+                "embedding_backend": Config.EMBEDDING_BACKEND, "index_type": Config.VECTOR_INDEX_TYPE,
+                "stub": {"latency": args.latency, "jitter": args.jitter, "throttle_rate": args.throttle_rate,
+                         "error_rate": args.error_rate, **stub.stats},
+            },
+            "results": results,
+        }
+
+
+def compare(current, baseline, tolerance):
+    """Regressions of `current` vs `baseline` results: slower p95/p99, lower throughput or more errors."""
+    regressions = []
+    for key, now in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if not before:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if now[metric] is not None and before[metric] and now[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{key}: {metric} {before[metric]} -> {now[metric]}")
+        if now["throughput_per_s"] < before["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput_per_s {before['throughput_per_s']} -> {now['throughput_per_s']}")
+        if now["errors"] / now["calls"] > before["errors"] / before["calls"] + tolerance / 10:
+            regressions.append(f"{key}: errors {before['errors']}/{before['calls']} -> {now['errors']}/{now['calls']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--calls", type=int, default=40, help="Calls per operation and concurrency level")
+    parser.add_argument("--rebuild-calls", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Stub extra random seconds per request")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of stub requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests answered 500")
+    parser.add_argument("--save", help="Write the results JSON here")
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before flagging")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.save}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        print(f"Compared with {args.baseline} (commit {baseline.get('meta', {}).get('commit')}, "
+              f"tolerance {args.tolerance:.0%}): {len(regressions)} regression(s)")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
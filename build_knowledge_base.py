@@ -1,52 +1,23 @@
-import os
-import shutil
-from langchain_community.vectorstores import FAISS # <--- CHANGED
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import argparse
 from config import Config
+from modules.embeddings import build_embeddings
+from modules.knowledge_base import sync_knowledge_base, format_report
 
-def ingest_all_policies():
-    print(f"🚀 Starting Ingestion (Engine: FAISS)...")
+def ingest_all_policies(workers=None):
+    print(f"🚀 Starting Ingestion (Engine: FAISS {Config.VECTOR_INDEX_TYPE}, region shards)...")
     
-    embeddings = OpenAIEmbeddings(
-        model=Config.EMBEDDING_MODEL,
-        api_key=Config.OPENAI_API_KEY,
-        base_url=Config.OPENAI_BASE_URL
-    )
+    # Same disk cache as the app: unchanged chunks are never re-sent to the API
+    embeddings = build_embeddings()
 
-    # 1. Reset
-    if os.path.exists(Config.VECTOR_DB_PATH):
-        shutil.rmtree(Config.VECTOR_DB_PATH)
+    # Only new/changed PDFs are parsed & embedded; deleted ones are purged from the index.
+    shards, report = sync_knowledge_base(embeddings, workers=workers)
 
-    # 2. Load Docs
-    files = [f for f in os.listdir(Config.POLICIES_DIR) if f.endswith(".pdf")]
-    all_docs = []
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-
-    for file in files:
-        file_path = os.path.join(Config.POLICIES_DIR, file)
-        try:
-            region = file.split("_")[1].replace(".pdf", "")
-        except:
-            region = "General"
-            
-        print(f"📖 Reading {file}...")
-        loader = PyPDFLoader(file_path)
-        chunks = text_splitter.split_documents(loader.load())
-        
-        for doc in chunks:
-            doc.metadata["region"] = region
-            
-        all_docs.extend(chunks)
-
-    # 3. Build & Save
-    if all_docs:
-        vector_db = FAISS.from_documents(all_docs, embeddings)
-        vector_db.save_local(Config.VECTOR_DB_PATH)
-        print(f"🎉 Success! Saved FAISS index to {Config.VECTOR_DB_PATH} with {len(all_docs)} chunks.")
+    if report["total_chunks"]:
+        print(f"🎉 Success! FAISS shards {report['regions']} at {Config.VECTOR_DB_PATH} ({format_report(report)}).")
     else:
         print("❌ No documents found.")
 
 if __name__ == "__main__":
-    ingest_all_policies()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Sync the policy PDFs into the FAISS knowledge base.")
+    parser.add_argument("--workers", type=int, default=None, help="PDF parsing processes (default: Config.INGEST_WORKERS / all cores)")
+    ingest_all_policies(parser.parse_args().workers)
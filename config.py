@@ -7,12 +7,80 @@ class Config:
     
     # Paths
     DB_PATH = "data/hr_system.db"
+    DB_POOL_SIZE = 8 # Pooled SQLite connections shared by all sessions
+    DB_BUSY_TIMEOUT_MS = 5000
+    CHAT_PAGE_SIZE = 30 # Messages loaded per "load earlier" page in the employee portal
+    TICKET_PAGE_SIZE = 50 # Rows per page in the HR ticket grid
     POLICIES_DIR = "data/policies"
     VECTOR_DB_PATH = "data/faiss_vectors"
+    EMBEDDING_CACHE_PATH = "data/embedding_cache.db"
+    ANSWER_CACHE_PATH = "data/answer_cache.db"
+    CLASSIFIER_MODEL_PATH = "data/fast_classifier.json"
+    
+    # Ingestion
+    INGEST_WORKERS = None # Processes used to parse PDFs (None = all cores)
+    EMBED_BATCH_SIZE = 128 # Chunks per embeddings request
+    EMBED_MAX_IN_FLIGHT = 4 # Concurrent embeddings requests (halved on every 429)
+    EMBED_MAX_RETRIES = 6
+    
+    # Vector Index (changing type or dimensions rebuilds the shards on the next sync)
+    VECTOR_INDEX_TYPE = "flat" # "flat" (exact), "hnsw", "ivf_flat" or "ivf_pq"
+    VECTOR_INDEX_MIN_CHUNKS = 20000 # Smaller shards stay flat (exact is fast there, and IVF/PQ need data to train)
+    HNSW_M = 32 # Graph neighbours per node
+    HNSW_EF_CONSTRUCTION = 80
+    HNSW_EF_SEARCH = 64 # Higher = better recall, slower queries
+    IVF_NLIST = None # Coarse clusters (None = ~4*sqrt(chunks))
+    IVF_NPROBE = 16 # Clusters scanned per query
+    IVF_TRAIN_SAMPLE = 100000 # Vectors used to train the quantizers
+    PQ_M = 64 # Sub-quantizers (must divide the embedding dimension)
+    PQ_BITS = 8 # Bits per sub-quantizer code
+    
+    # Retrieval
+    RETRIEVAL_MODE = "vector" # "vector", "lexical" (BM25, no embedding call) or "hybrid" (both, rank-fused)
+    HYBRID_RRF_K = 60 # Reciprocal rank fusion damping; higher flattens the rank weights
     
     # Thresholds
     SCORING_THRESHOLD = 2.7
+    HIGH_RISK_SCORE = 3.0 # Dashboard "High Risk" counter
+    FAST_CLASSIFIER_CONFIDENCE = 0.85 # Below this the supervisor LLM classifies instead
+    
+    # Ticket Assignment
+    ASSIGNMENT_STRATEGY = "least_loaded" # or "round_robin" (persistent rotation)
+    ASSIGNMENT_REGION_SLACK = 5 # Extra open tickets tolerated before spilling to another region
+    ASSIGNMENT_RESYNC_SECONDS = 60 # Reload roster + load counters from the DB
+    
+    # Ticket Drafting
+    DRAFT_WORKERS = 4 # Tickets pre-drafted concurrently
+    AUTO_DRAFT_ON_CREATE = True # Pre-draft every new ticket in the background
+    
+    # Payroll
+    PAYROLL_OT_MULTIPLIER_RANGE = (1.0, 4.0) # Overtime rates outside this are treated as misparses, not policy
+    PAYROLL_CHUNK_SIZE = 50000 # Employees loaded per columnar chunk by the arrears engine
+    
+    # Regulatory Feed (local files or http(s) URLs)
+    REGULATION_SOURCES = [
+        {"name": "India Labour Ministry", "url": "simulated_internet/gov_page.html", "region": "India"},
+    ]
+    REGULATION_POLL_SECONDS = 300 # Background poll interval (0 = only on "INITIATE EXTERNAL SCAN")
+    REGULATION_POLL_WORKERS = 8 # Sources checked concurrently
+    REGULATION_HTTP_TIMEOUT = 10
+    
+    # Answer Cache
+    ANSWER_CACHE_TTL_HOURS = 24
+    ANSWER_CACHE_MAX_ENTRIES = 5000
+    ANSWER_CACHE_SEMANTIC_THRESHOLD = None # e.g. 0.95 to reuse answers for near-identical questions
     
     # LLM Settings
     MODEL_NAME = "gpt-5-nano-2025-08-07" # or gpt-3.5-turbo
     EMBEDDING_MODEL = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS = None # e.g. 512 to request shortened text-embedding-3 vectors
+    EMBEDDING_BACKEND = "openai" # or "local": hashed TF-IDF + SVD fitted on the policies (no network)
+    LOCAL_EMBEDDING_DIM = 256
+    LOCAL_EMBEDDING_MAX_FEATURES = 50000 # Vocabulary kept (most frequent word/bigram buckets)
+    LOCAL_EMBEDDING_FIT_SAMPLE = 10000 # Chunks used to fit the model on a full rebuild
+    LOCAL_EMBEDDING_MIN_COVERAGE = 0.9 # New chunks' words the model must know, else a sync refits and re-embeds all
+    EMBEDDING_CACHE_MAX_MB = 512 # LRU eviction kicks in above this size
+    LLM_TIMEOUT_SECONDS = 60 # Default deadline per LLM call (slot wait + request + retries)
+    LLM_CLASSIFY_TIMEOUT_SECONDS = 10 # Tighter budget for the supervisor classification
+    LLM_MAX_RETRIES = 3 # Transient errors only (429 / 5xx / timeouts)
+    LLM_MAX_IN_FLIGHT = 16 # Concurrent LLM requests across all sessions
@@ -0,0 +1,83 @@
+# evaluate_classifier.py
+"""
+Offline evaluation of the local fast-path classifier against logged LLM decisions.
+
+    python evaluate_classifier.py              # hold-out agreement + fraction of LLM calls saved
+    python evaluate_classifier.py --train      # fit on every logged row and save the model
+"""
+import argparse
+from config import Config
+from modules.agent import HRAgent
+from modules.classifier import FastClassifier, HINTS
+from modules.database import fetch_classification_log
+
+MIN_TRAINING_ROWS = 50
+
+
+def evaluate(rows, threshold, holdout_every=5):
+    """Trains on 4/5 of the rows, scores the held-out 1/5 against the LLM labels."""
+    train = [r for i, r in enumerate(rows) if i % holdout_every]
+    test = [r for i, r in enumerate(rows) if not i % holdout_every]
+    clf = FastClassifier(model_path="", threshold=threshold).train(train, save=False)
+
+    stats = {"total": len(test), "decided_locally": 0, "field_agree": 0, "escalation_agree": 0}
+    for question, llm_metrics in test:
+        guess = clf.classify(question)
+        if guess is None:
+            continue
+        stats["decided_locally"] += 1
+        stats["field_agree"] += all(str(guess["metrics"][f]) == str(llm_metrics[f]) for f in FastClassifier.FIELDS)
+        local_escalate = HRAgent.score_metrics(guess["metrics"])["final_score"] > Config.SCORING_THRESHOLD
+        llm_escalate = HRAgent.score_metrics(llm_metrics)["final_score"] > Config.SCORING_THRESHOLD
+        stats["escalation_agree"] += local_escalate == llm_escalate
+    return stats
+
+
+# What each keyword hint claims, checked against the LLM's labels: (description, predicate on metrics)
+HINT_TARGETS = {
+    "hostile": ("rated tone >= 3", lambda m: str(m.get("tone")).isdigit() and int(m["tone"]) >= 3),
+    "grievance": ("labelled GRIEVANCE_ESCALATION", lambda m: m.get("intent") == "GRIEVANCE_ESCALATION"),
+}
+
+
+def hint_precision(rows):
+    """Per keyword hint: logged questions it fires on, and how many of those the LLM agreed with (HINT_TARGETS)."""
+    stats = {}
+    for name, pattern in HINTS.items():
+        hits = [m for q, m in rows if pattern.search(q)]
+        label, agrees = HINT_TARGETS[name]
+        stats[name] = {"hits": len(hits), "agree": sum(agrees(m) for m in hits), "target": label}
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=Config.FAST_CLASSIFIER_CONFIDENCE)
+    parser.add_argument("--train", action="store_true", help="Fit on all logged rows and save to Config.CLASSIFIER_MODEL_PATH")
+    args = parser.parse_args()
+
+    rows = fetch_classification_log("llm")
+    print(f"📚 {len(rows)} logged LLM classifications")
+    if len(rows) < MIN_TRAINING_ROWS:
+        print(f"⚠️ Need at least {MIN_TRAINING_ROWS} rows; only keyword rules will be active.")
+        return
+
+    for name, hint in hint_precision(rows).items():
+        if hint["hits"]:
+            print(f"🔎 '{name}' keyword hint: {hint['agree']}/{hint['hits']} "
+                  f"({hint['agree'] / hint['hits']:.1%}) {hint['target']} by the LLM")
+
+    stats = evaluate(rows, args.threshold)
+    local = stats["decided_locally"]
+    print(f"⚡ LLM calls saved: {local}/{stats['total']} ({local / max(stats['total'], 1):.1%}) at threshold {args.threshold}")
+    if local:
+        print(f"🎯 Exact agreement with LLM (intent/type/tone): {stats['field_agree'] / local:.1%}")
+        print(f"🚦 Escalation-decision agreement: {stats['escalation_agree'] / local:.1%}")
+
+    if args.train:
+        FastClassifier().train(rows)
+        print(f"💾 Model saved to {Config.CLASSIFIER_MODEL_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,16 @@ from modules.database import (
     create_ticket, 
     update_ticket_status, 
     log_hr_response, 
-    get_all_tickets,
-    fetch_chat_history,
-    save_chat_message
+    get_tickets_page,
+    ticket_cursor,
+    get_ticket_metrics,
+    count_tickets,
+    fetch_chat_history_page,
+    save_chat_message,
+    transaction
 )
 from modules.agent import HRAgent
-from modules.auth import assign_hr_round_robin
+from modules.auth import assign_hr, release_hr
 from modules.watchdog import PolicyWatchdog
 
 # --- PAGE CONFIGURATION ---
@@ -117,14 +121,22 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# --- SHARED AGENT (one per process) ---
+@st.cache_resource(show_spinner="Loading knowledge base...", on_release=lambda agent: agent.close())
+def load_agent():
+    """
+    One HRAgent (LLM client, embeddings, FAISS shards) for every session in this server process.
+    It is thread-safe: rebuilds swap the index in atomically, and per-user state stays in st.session_state.
+    """
+    return HRAgent()
+
 # --- CLOUD/FIRST-RUN INITIALIZATION ---
 if not os.path.exists(Config.DB_PATH):
     if 'has_run_setup' not in st.session_state:
         st.info("System Initialization: Building Database & Index...")
         try:
             import setup_env 
-            agent_temp = HRAgent()
-            res = agent_temp.rebuild_knowledge_base()
+            res = load_agent().rebuild_knowledge_base()
             st.session_state['has_run_setup'] = True
             st.success(f"Setup Complete: {res}")
             time.sleep(1)
@@ -133,9 +145,6 @@ if not os.path.exists(Config.DB_PATH):
             st.code(f"Setup Failed: {e}") 
 
 # --- SESSION STATE INITIALIZATION ---
-if 'agent' not in st.session_state:
-    st.session_state.agent = HRAgent()
-
 if 'user' not in st.session_state:
     st.session_state.user = None
 
@@ -171,7 +180,7 @@ if not st.session_state.user:
 # ====================================================
 else:
     user = st.session_state.user
-    agent = st.session_state.agent
+    agent = load_agent()
     
     # --- SIDEBAR ---
     with st.sidebar:
@@ -187,7 +196,7 @@ else:
         st.divider()
         if st.button("SIGN OUT", use_container_width=True):
              # 1. Clear specific keys to ensure a fresh state
-            keys_to_clear = ['user', 'messages', 'scraped_data', 'analysis_res', 'draft_reply']
+            keys_to_clear = ['user', 'messages', 'history_cursor', 'history_has_more', 'scraped_data', 'analysis_res', 'draft_reply', 'draft_ticket']
             for key in keys_to_clear:
                 if key in st.session_state:
                     del st.session_state[key]
@@ -200,53 +209,88 @@ else:
     if user['role'] == 'EMP':
         st.markdown('<div class="main-header">EMPLOYEE SUPPORT PORTAL</div>', unsafe_allow_html=True)
 
-        # Load History
-        if "messages" not in st.session_state or not st.session_state.messages:
-            db_history = fetch_chat_history(user['id'])
-            st.session_state.messages = db_history if db_history else []
+        # Load History (newest page only; older pages on demand)
+        if "messages" not in st.session_state:
+            page, cursor, has_more = fetch_chat_history_page(user['id'])
+            st.session_state.messages = page
+            st.session_state.history_cursor = cursor
+            st.session_state.history_has_more = has_more
 
         # 1. DISPLAY CHAT (Reverted to Standard Streamlit Style)
-        for msg in st.session_state.messages:
-            st.chat_message(msg["role"]).write(msg["content"])
+        # A fragment: "load earlier" reruns only the transcript, not the agent/chat input
+        def load_earlier():
+            older, cursor, has_more = fetch_chat_history_page(user['id'], st.session_state.history_cursor)
+            st.session_state.messages = older + st.session_state.messages
+            st.session_state.history_cursor = cursor
+            st.session_state.history_has_more = has_more
+
+        @st.fragment
+        def render_transcript():
+            if st.session_state.history_has_more:
+                st.button("LOAD EARLIER MESSAGES", use_container_width=True, on_click=load_earlier)
+            for msg in st.session_state.messages:
+                st.chat_message(msg["role"]).write(msg["content"])
+
+        render_transcript()
 
         # 2. HANDLE INPUT
         if question := st.chat_input("Type your inquiry here..."):
             # A. User Message
             st.session_state.messages.append({"role": "user", "content": question})
             st.chat_message("user").write(question)
-            save_chat_message(user['id'], "user", question)
 
-            # B. Agent Logic
+            # B. Agent Logic (classification + speculative retrieval run concurrently)
             with st.spinner("Processing request..."):
-                analysis = agent.calculate_score(question)
-                score = analysis['final_score']
-                metrics = analysis['metrics']
+                turn = agent.process_turn(question, user['region'], stream=True)
+                score = turn['final_score']
+                metrics = turn['metrics']
 
                 # --- 3. SHOW SCORE METRICS (RESTORED) ---
                 with st.expander("🧠 Agent Thought Process", expanded=True):
-                    c1, c2, c3 = st.columns(3)
+                    c1, c2, c3, c4 = st.columns(4)
                     c1.markdown(f"**Intent:** `{metrics.get('intent')}`")
                     c2.markdown(f"**Tone:** `{metrics.get('tone')}/4`")
                     c3.markdown(f"**Risk Score:** `{score}`")
+                    c4.markdown(f"**Decided By:** `{turn.get('decided_by')}`")
                     
-                    if score > 2.7:
+                    if turn['escalate']:
                         st.markdown(f"<span style='color:red'><b>DECISION: ESCALATE (Avg. TAT: 6 hours)</b></span>", unsafe_allow_html=True)
                     else:
                         st.markdown(f"<span style='color:green'><b>DECISION: RESEARCH & ANSWER</b></span>", unsafe_allow_html=True)
+                    st.caption(" | ".join(f"{k}: {v}" for k, v in turn['timings'].items()))
 
             # C. Generate Response
-            if score > 2.7:
-                assigned_to = assign_hr_round_robin()
-                t_id = create_ticket(user['id'], question, score, assigned_to)
-                
-                response_text = f"**ESCALATION PROTOCOL INITIATED**\n\nTicket #{t_id} has been generated. Specialist {assigned_to} has been notified for immediate review."
+            if turn['escalate']:
+                assigned_to = assign_hr(user['region']) # Reserves a slot in their queue
+                # User message, ticket and reply commit together
+                try:
+                    with transaction():
+                        save_chat_message(user['id'], "user", question)
+                        t_id = create_ticket(user['id'], question, score, assigned_to)
+                        response_text = f"**ESCALATION PROTOCOL INITIATED**\n\nTicket #{t_id} has been generated. Specialist {assigned_to} has been notified for immediate review."
+                        save_chat_message(user['id'], "assistant", response_text)
+                except Exception:
+                    release_hr(assigned_to) # No ticket was committed: hand the slot back
+                    raise
+                if Config.AUTO_DRAFT_ON_CREATE:
+                    # HR opens the case with a reply already drafted
+                    agent.drafter.submit({"ticket_id": t_id, "emp_id": user['id'], "question": question, "region": user['region']})
+                st.chat_message("assistant").write(response_text)
+            elif turn['answer']:
+                response_text = turn['answer'] # Knowledge Base empty -> nothing to stream
+                st.chat_message("assistant").write(response_text)
             else:
-                response_text = agent.get_rag_answer(question, user['region'])
+                # Retrieval already finished alongside classification: stream the synthesis token by token
+                response_text = st.chat_message("assistant").write_stream(
+                    agent.get_rag_answer_stream(question, user['region'], turn['retrieval'])
+                )
 
-            # D. Assistant Reply
+            # D. Assistant Reply (the whole turn is written in one transaction)
             st.session_state.messages.append({"role": "assistant", "content": response_text})
-            st.chat_message("assistant").write(response_text)
-            save_chat_message(user['id'], "assistant", response_text)
+            if not turn['escalate']:
+                with transaction():
+                    save_chat_message(user['id'], "user", question)
+                    save_chat_message(user['id'], "assistant", response_text)
 
     # ====================================================
     # VIEW 2: HR DASHBOARD
@@ -256,9 +300,8 @@ else:
         header_title = "SYSTEM ADMINISTRATION" if user['role'] == 'ADMIN' else "AGENT DASHBOARD"
         st.markdown(f'<div class="main-header">{header_title}</div>', unsafe_allow_html=True)
 
-        df_tickets = get_all_tickets()
-        if user['role'] == 'HR':
-            df_tickets = df_tickets[df_tickets['assigned_to'] == user['id']]
+        # Filters, counts and paging all run in SQL; only one page of tickets is ever loaded
+        assignee = user['id'] if user['role'] == 'HR' else None
 
         # Tabs
         tabs = ["TICKET MANAGEMENT"]
@@ -269,11 +312,12 @@ else:
 
         # TAB 1: TICKETS
         with active_tab[0]:
+            metrics = get_ticket_metrics(assignee)
             m1, m2, m3, m4 = st.columns(4)
-            m1.metric("Total Volume", len(df_tickets))
-            m2.metric("Pending", len(df_tickets[df_tickets['status'] == 'Open']))
-            m3.metric("High Risk", len(df_tickets[df_tickets['score'] >= 3.0]))
-            m4.metric("Resolved", len(df_tickets[df_tickets['status'] == 'Resolved']))
+            m1.metric("Total Volume", metrics['total'])
+            m2.metric("Pending", metrics['open'])
+            m3.metric("High Risk", metrics['high_risk'])
+            m4.metric("Resolved", metrics['resolved'])
             
             st.divider()
             
@@ -281,6 +325,41 @@ else:
 
             with c_grid:
                 st.subheader("Active Queue")
+                f1, f2, f3 = st.columns(3)
+                status_filter = f1.selectbox("Status", ["All", "Open", "In Progress", "Resolved"], key="ticket_status_filter")
+                sort_by = f2.selectbox("Sort", ["newest", "oldest", "risk"], format_func=str.title, key="ticket_sort")
+                high_risk_only = f3.toggle("High Risk Only", key="ticket_high_risk")
+
+                filters = {
+                    "assigned_to": assignee,
+                    "status": None if status_filter == "All" else status_filter,
+                    "min_score": Config.HIGH_RISK_SCORE if high_risk_only else None,
+                }
+                total_rows = count_tickets(**filters)
+                page_count = max(1, -(-total_rows // Config.TICKET_PAGE_SIZE))
+                # Keyset paging: a stack of page-start cursors; new filters or sort start over at page 1
+                view = (status_filter, sort_by, high_risk_only)
+                if st.session_state.get("ticket_view") != view:
+                    st.session_state["ticket_view"] = view
+                    st.session_state["ticket_cursors"] = [None]
+                cursors = st.session_state["ticket_cursors"]
+                df_tickets = get_tickets_page(**filters, sort=sort_by, after=cursors[-1])
+                next_cursor = ticket_cursor(df_tickets, sort_by)
+
+                p_prev, p_label, p_next = st.columns([1, 2, 1])
+                if p_prev.button("PREVIOUS PAGE", disabled=len(cursors) == 1, use_container_width=True):
+                    cursors.pop()
+                    st.rerun()
+                p_label.caption(f"Page {len(cursors)} of {page_count} ({total_rows:,} tickets)")
+                if p_next.button("NEXT PAGE", disabled=next_cursor is None or len(cursors) >= page_count, use_container_width=True):
+                    cursors.append(next_cursor)
+                    st.rerun()
+
+                if st.button("PRE-DRAFT OPEN QUEUE", use_container_width=True):
+                    with st.spinner("Drafting replies for open tickets..."):
+                        res = agent.drafter.draft_open_tickets(assigned_to=assignee)
+                    st.success(f"Drafted {res['drafted']} ticket(s) in {res['seconds']}s ({res['failed']} failed).")
+
                 with st.container(border=True):
                     edited_df = st.data_editor(
                         df_tickets,
@@ -290,7 +369,7 @@ else:
                             "ticket_id": st.column_config.NumberColumn("ID"),
                             "question": st.column_config.TextColumn("Subject"),
                         },
-                        disabled=["ticket_id", "emp_id", "question", "score", "assigned_to"],
+                        disabled=["ticket_id", "emp_id", "question", "score", "assigned_to", "created_at", "updated_at"],
                         hide_index=True,
                         use_container_width=True,
                         key="ticket_editor",
@@ -320,14 +399,24 @@ else:
                         with st.form("reply_form"):
                             # Blue Button (Forced via CSS)
                             if st.form_submit_button("GENERATE AI DRAFT", type="primary", use_container_width=True):
-                                with st.spinner("Analyzing..."):
-                                    t_data = ticket_row.to_dict()
-                                    if 'region' not in t_data: t_data['region'] = 'India'
-                                    draft_text = agent.draft_ticket_resolution(t_data)
-                                    st.session_state['draft_reply'] = draft_text
-                                    st.rerun()
-
-                            default_text = st.session_state.get('draft_reply', "")
+                                t_data = ticket_row.to_dict()
+                                # Same region as the background drafter (users join, 'General' if unknown)
+                                requester = fetch_user(t_data['emp_id'])
+                                t_data['region'] = (requester or {}).get('region') or 'General'
+                                # Stream tokens into a preview, then hand the full text to the editable area
+                                draft_text = st.write_stream(agent.draft_ticket_resolution_stream(t_data))
+                                st.session_state['draft_reply'] = draft_text
+                                st.session_state['draft_ticket'] = selected_t_id
+                                st.rerun()
+
+                            # A draft generated in this session wins; otherwise use the pre-drafted one
+                            if st.session_state.get('draft_ticket') == selected_t_id:
+                                default_text = st.session_state.get('draft_reply', "")
+                            else:
+                                stored = agent.drafter.get(int(selected_t_id))
+                                default_text = stored['draft'] if stored else ""
+                                if stored:
+                                    st.caption(f"⚡ Pre-drafted {stored['created_at']} (KB {agent.researcher.kb_version})")
                             reply_text = st.text_area("Draft Body", value=default_text, height=150)
 
                             c1, c2 = st.columns(2)
@@ -340,14 +429,14 @@ else:
                             if btn_resolve and reply_text:
                                 log_hr_response(selected_t_id, reply_text)
                                 update_ticket_status(selected_t_id, "Resolved")
-                                if 'draft_reply' in st.session_state: del st.session_state['draft_reply']
+                                for key in ('draft_reply', 'draft_ticket'): st.session_state.pop(key, None)
                                 st.success("Case Closed.")
                                 time.sleep(1)
                                 st.rerun()
                             elif btn_progress and reply_text:
                                 log_hr_response(selected_t_id, reply_text)
                                 update_ticket_status(selected_t_id, "In Progress")
-                                if 'draft_reply' in st.session_state: del st.session_state['draft_reply']
+                                for key in ('draft_reply', 'draft_ticket'): st.session_state.pop(key, None)
                                 st.info("Status Updated.")
                                 time.sleep(1)
                                 st.rerun()
@@ -378,11 +467,31 @@ else:
                                 res = agent.rebuild_knowledge_base()
                                 st.success(res)
 
+                        cache_stats = agent.researcher.answer_cache.stats()
+                        st.caption(
+                            f"Answer cache: {cache_stats['hit_rate']:.0%} hit rate "
+                            f"({cache_stats['hits']} exact / {cache_stats['semantic_hits']} semantic), "
+                            f"{cache_stats['entries']} entries, {cache_stats['lifetime_saved_s']}s LLM time saved"
+                        )
+                        llm_stats = agent.llm.stats()
+                        st.caption(
+                            f"LLM: {llm_stats['calls']} calls, p50 {llm_stats['p50_ms']} ms / p95 {llm_stats['p95_ms']} ms, "
+                            f"{llm_stats['retries']} retries, {llm_stats['timeouts']} timeouts, {llm_stats['in_flight']} in flight, "
+                            f"{llm_stats['prompt_tokens'] + llm_stats['completion_tokens']} tokens"
+                        )
+
         # TAB 3: WATCHDOG
         if user['role'] == 'ADMIN' and len(tabs) > 2:
             with active_tab[2]:
                 watchdog = PolicyWatchdog(agent)
+                watchdog.poller.start() # Background polling every Config.REGULATION_POLL_SECONDS (idempotent)
                 st.subheader("Regulatory Monitor")
+                if watchdog.poller.last_report:
+                    rep = watchdog.poller.last_report
+                    st.caption(
+                        f"{rep['checked']} sources | {rep['changed']} changed, {rep['unchanged'] + rep['same_content']} unchanged, "
+                        f"{len(rep['errors'])} errors | last cycle {rep['seconds']}s"
+                    )
                 
                 # Blue Button (Forced via CSS)
                 if st.button("INITIATE EXTERNAL SCAN", type="primary"):
@@ -390,12 +499,20 @@ else:
                         res = watchdog.check_for_updates()
                         if res['status'] == 'success':
                             st.session_state['scraped_data'] = res
+                            st.session_state.pop('analysis_res', None) # Re-resolved below for the new text
+                            st.session_state.pop('payroll_res', None)
                             st.info("Update Detected")
                         else:
                             st.markdown(f"<div style='color: #475569;'>{res['content']}</div>", unsafe_allow_html=True)
 
                 if 'scraped_data' in st.session_state:
                     data = st.session_state['scraped_data']
+                    if 'analysis_res' not in st.session_state:
+                        # Already analyzed under this KB + model? Show it without any LLM call
+                        cached = watchdog.cached_analysis(data['body'])
+                        if cached:
+                            st.session_state['analysis_res'] = cached
+                            if data.get('item_id'): watchdog.mark_analyzed(data['item_id'])
                     st.divider()
                     
                     # Create a container to keep layout stable
@@ -414,23 +531,61 @@ else:
                             st.markdown("##### Legal Analysis Tools")
                             st.caption("AI-powered impact assessment and drafting.")
                             
-                            # ACTION: Run Analysis (Blue Button)
-                            if st.button("RUN IMPACT ANALYSIS", type="primary", use_container_width=True):
+                            # ACTION: Run Analysis (Blue Button); re-running it forces a fresh analysis
+                            has_analysis = 'analysis_res' in st.session_state
+                            label = "REFRESH IMPACT ANALYSIS" if has_analysis else "RUN IMPACT ANALYSIS"
+                            if st.button(label, type="primary", use_container_width=True):
                                 with st.spinner("AI Agents are comparing policies..."):
-                                    analysis = watchdog.analyze_impact(data['body'])
+                                    analysis = watchdog.analyze_impact(data['body'], title=data['title'], refresh=has_analysis)
                                     st.session_state['analysis_res'] = analysis
+                                    if data.get('item_id'): watchdog.mark_analyzed(data['item_id'])
                             
                             # Show Results
                             if 'analysis_res' in st.session_state:
                                 res = st.session_state['analysis_res']
                                 
                                 st.success("Analysis Complete")
+                                if res.get('cached'):
+                                    st.caption(f"Stored analysis from {res['created_at']} (no LLM calls)")
                                 with st.expander("View Comparison Matrix", expanded=True):
                                     st.markdown(res['comparison_analysis'])
                                 
-                                email_draft = watchdog.draft_legal_email(res['comparison_analysis'])
+                                email_draft = watchdog.draft_legal_email(res['comparison_analysis']) # Memoized: reruns are free
                                 st.text_area("Legal Briefing Draft", value=email_draft, height=200)
                                 
                                 # Blue Button (Forced via CSS)
                                 if st.button("DISPATCH TO LEGAL", type="primary", use_container_width=True):
                                     st.success("Briefing dispatched via secure channel.")
+
+                                # Payroll exposure: one vectorized batch over the region's payroll table,
+                                # at a rate the reviewer has seen (and may correct) before any run is written
+                                parsed_rate = watchdog.ot_multiplier(data['body'])
+                                low, high = Config.PAYROLL_OT_MULTIPLIER_RANGE
+                                if parsed_rate is None:
+                                    st.caption("No overtime rate found in this regulation; enter it to compute arrears.")
+                                else:
+                                    st.caption(f"Overtime rate parsed from the regulation: {parsed_rate}x")
+                                new_rate = st.number_input(
+                                    "New overtime multiplier", min_value=low, max_value=high,
+                                    value=parsed_rate, step=0.05, format="%.2f", key=f"ot_rate_{data.get('item_id')}"
+                                )
+                                if st.button("COMPUTE WORKFORCE ARREARS", use_container_width=True, disabled=new_rate is None):
+                                    with st.spinner("Recomputing overtime arrears..."):
+                                        st.session_state['payroll_res'] = watchdog.payroll_impact(
+                                            new_rate, region=data.get('region'), title=data['title']
+                                        )
+                                if 'payroll_res' in st.session_state:
+                                    pay = st.session_state['payroll_res']
+                                    st.caption(f"Run #{pay['run_id']}: {pay['employees']:,} employees at {pay['new_multiplier']}x, "
+                                               f"{pay['affected']:,} owed arrears ({pay['seconds']}s)")
+                                    for t in pay['totals']:
+                                        st.metric(f"{t['region']} arrears ({t['employees']:,} employees)", f"{t['currency']} {t['arrears']:,.2f}")
+
+                history = watchdog.history()
+                if history:
+                    with st.expander(f"Analysis History ({len(history)})"):
+                        entry = st.selectbox(
+                            "Past analyses", history,
+                            format_func=lambda h: f"{h['created_at']} | {h['title'] or 'Untitled'} | KB {h['kb_version']} | {h['model']}"
+                        )
+                        st.markdown(entry['result']['comparison_analysis'])
@@ -0,0 +1,222 @@
+# modules/answer_cache.py
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from config import Config
+
+
+def normalize_question(question):
+    """'  What is the OVERTIME rate?? ' -> 'what is the overtime rate'"""
+    text = re.sub(r"\s+", " ", question.lower()).strip()
+    return text.rstrip("?!. ")
+
+
+class _SemanticScope:
+    """
+    Unit-normalized question embeddings of one (region, kb_version), held in memory so a
+    semantic lookup is one matrix-vector product instead of reading and decoding every row.
+    Rows are appended into spare capacity; removed rows are blanked and compacted away once
+    they make up half the matrix.
+    """
+
+    def __init__(self, rows):
+        self.matrix = None
+        self.created = np.empty(0)
+        self.entries = [] # row -> (cache_key, answer, latency_ms), or None once removed
+        self.rows = {}    # cache_key -> row
+        self.size = self.dead = 0
+        for cache_key, answer, embedding, latency_ms, created in rows:
+            self.add(cache_key, answer, np.frombuffer(embedding, dtype=np.float32), latency_ms, created)
+
+    def add(self, cache_key, answer, vector, latency_ms, created):
+        self.remove(cache_key)
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) + 1e-12)
+        if self.matrix is None or self.size == len(self.matrix):
+            self._resize(max(16, 2 * (self.size - self.dead)), len(vector))
+        self.matrix[self.size] = vector
+        self.created[self.size] = created
+        self.entries.append((cache_key, answer, latency_ms))
+        self.rows[cache_key] = self.size
+        self.size += 1
+
+    def remove(self, cache_key):
+        row = self.rows.pop(cache_key, None)
+        if row is None:
+            return
+        self.created[row] = -np.inf # Never matches (see best)
+        self.entries[row] = None
+        self.dead += 1
+        if self.dead * 2 > self.size:
+            self._resize(max(16, 2 * (self.size - self.dead)), self.matrix.shape[1])
+
+    def _resize(self, capacity, dim):
+        """Copies the live rows into a fresh (capacity x dim) matrix."""
+        live = [row for row in range(self.size) if self.entries[row] is not None]
+        matrix = np.zeros((capacity, dim), dtype=np.float32)
+        created = np.full(capacity, -np.inf)
+        if live:
+            matrix[:len(live)] = self.matrix[live]
+            created[:len(live)] = self.created[live]
+        self.matrix, self.created = matrix, created
+        self.entries = [self.entries[row] for row in live]
+        self.rows = {entry[0]: row for row, entry in enumerate(self.entries)}
+        self.size, self.dead = len(live), 0
+
+    def best(self, query, min_created):
+        """(similarity, (cache_key, answer, latency_ms)) of the closest unexpired row, or None."""
+        if not self.size - self.dead:
+            return None
+        query = np.asarray(query, dtype=np.float32)
+        sims = self.matrix[:self.size] @ (query / (np.linalg.norm(query) + 1e-12))
+        sims[self.created[:self.size] < min_created] = -np.inf
+        row = int(np.argmax(sims))
+        return (float(sims[row]), self.entries[row]) if np.isfinite(sims[row]) else None
+
+
+class AnswerCache:
+    """
+    Persistent cache of synthesized RAG answers keyed by
+    (normalized question, region, knowledge-base version).
+    Entries expire after a TTL and the least recently used rows are evicted
+    past max_entries. With a semantic threshold set, a miss falls back to the
+    closest cached question (cosine similarity) in the same region + version,
+    searched in an in-memory matrix per scope (loaded on first use, kept current
+    by put / eviction in this process; other processes' new entries show up
+    after the next rebuild's invalidate).
+    """
+
+    def __init__(self, cache_path=None, ttl_hours=None, max_entries=None, semantic_threshold=None):
+        self.cache_path = cache_path or Config.ANSWER_CACHE_PATH
+        self.ttl = (ttl_hours if ttl_hours is not None else Config.ANSWER_CACHE_TTL_HOURS) * 3600
+        self.max_entries = max_entries or Config.ANSWER_CACHE_MAX_ENTRIES
+        self.semantic_threshold = semantic_threshold if semantic_threshold is not None else Config.ANSWER_CACHE_SEMANTIC_THRESHOLD
+        self.counters = {"hits": 0, "semantic_hits": 0, "misses": 0, "saved_ms": 0.0}
+
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._scopes = {} # (region, kb_version) -> _SemanticScope
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS answers
+                              (cache_key TEXT PRIMARY KEY, region TEXT, kb_version TEXT, question TEXT,
+                               answer TEXT, embedding BLOB, latency_ms REAL, created REAL, last_used REAL,
+                               hits INTEGER DEFAULT 0)''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_scope ON answers (region, kb_version)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_lru ON answers (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(question, region, kb_version):
+        raw = f"{normalize_question(question)}|{region}|{kb_version}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _record_hit(self, cache_key, latency_ms, semantic=False):
+        self._conn.execute("UPDATE answers SET last_used=?, hits=hits+1 WHERE cache_key=?", (time.time(), cache_key))
+        self._conn.commit()
+        self.counters["semantic_hits" if semantic else "hits"] += 1
+        self.counters["saved_ms"] += latency_ms or 0.0
+
+    def get(self, question, region, kb_version):
+        """Exact lookup on the normalized question."""
+        cache_key = self._key(question, region, kb_version)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer, latency_ms, created FROM answers WHERE cache_key=?", (cache_key,)
+            ).fetchone()
+            if row and time.time() - row[2] <= self.ttl:
+                self._record_hit(cache_key, row[1])
+                return row[0]
+        return None
+
+    def get_similar(self, query_vector, region, kb_version):
+        """Semantic lookup: reuse an answer whose question embedding is within the threshold."""
+        if not self.semantic_threshold or query_vector is None:
+            return None
+        with self._lock:
+            scope = self._scopes.get((region, kb_version))
+            if scope is None:
+                rows = self._conn.execute(
+                    "SELECT cache_key, answer, embedding, latency_ms, created FROM answers "
+                    "WHERE region=? AND kb_version=? AND embedding IS NOT NULL AND created>=?",
+                    (region, kb_version, time.time() - self.ttl)
+                ).fetchall()
+                scope = self._scopes[(region, kb_version)] = _SemanticScope(rows)
+            best = scope.best(query_vector, time.time() - self.ttl)
+            if best and best[0] >= self.semantic_threshold:
+                cache_key, answer, latency_ms = best[1]
+                self._record_hit(cache_key, latency_ms, semantic=True)
+                return answer
+        return None
+
+    def miss(self):
+        self.counters["misses"] += 1
+
+    def put(self, question, region, kb_version, answer, query_vector=None, latency_ms=None):
+        embedding = np.asarray(query_vector, dtype=np.float32).tobytes() if query_vector is not None else None
+        now = time.time()
+        cache_key = self._key(question, region, kb_version)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (cache_key, region, kb_version, question, answer, embedding, "
+                "latency_ms, created, last_used, hits) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (cache_key, region, kb_version, normalize_question(question),
+                 answer, embedding, latency_ms, now, now)
+            )
+            scope = self._scopes.get((region, kb_version))
+            if scope is not None:
+                if embedding is None:
+                    scope.remove(cache_key)
+                else:
+                    scope.add(cache_key, answer, query_vector, latency_ms, now)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drops expired rows, then the least recently used past max_entries (from the scopes too)."""
+        expired = self._conn.execute("SELECT cache_key FROM answers WHERE created<?", (time.time() - self.ttl,)).fetchall()
+        count = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - len(expired)
+        overflow = []
+        if count > self.max_entries:
+            overflow = self._conn.execute(
+                "SELECT cache_key FROM answers WHERE created>=? ORDER BY last_used ASC LIMIT ?",
+                (time.time() - self.ttl, count - self.max_entries)
+            ).fetchall()
+        evicted = expired + overflow
+        if not evicted:
+            return
+        self._conn.executemany("DELETE FROM answers WHERE cache_key=?", evicted)
+        for scope in self._scopes.values():
+            for (cache_key,) in evicted:
+                scope.remove(cache_key)
+
+    def invalidate(self, keep_version=None):
+        """Called on every knowledge-base rebuild: drops answers from any other KB version."""
+        with self._lock:
+            if keep_version is None:
+                self._conn.execute("DELETE FROM answers")
+            else:
+                self._conn.execute("DELETE FROM answers WHERE kb_version<>?", (keep_version,))
+            self._conn.commit()
+            self._scopes.clear() # Reloaded on next use (also picks up other processes' entries)
+
+    def stats(self):
+        """In-process hit rate + lifetime savings recorded in the table."""
+        served = self.counters["hits"] + self.counters["semantic_hits"]
+        lookups = served + self.counters["misses"]
+        with self._lock:
+            entries, lifetime_hits, lifetime_saved = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * latency_ms), 0) FROM answers"
+            ).fetchone()
+        return {
+            **self.counters,
+            "saved_ms": round(self.counters["saved_ms"], 1),
+            "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "lifetime_hits": lifetime_hits,
+            "lifetime_saved_s": round(lifetime_saved / 1000, 1),
+        }
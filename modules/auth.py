@@ -1,10 +1,155 @@
-import random
-from modules.database import get_hr_list
-
-def assign_hr_round_robin():
-    hr_list = get_hr_list()
-    if not hr_list:
-        return "Unassigned"
-    # In a real app, you'd store the last index in DB. 
-    # For now, random acts as a basic load balancer.
-    return random.choice(hr_list)
\ No newline at end of file
+import time
+import threading
+from config import Config
+from modules.database import (
+    get_hr_roster,
+    get_open_ticket_counts,
+    get_assignment_cursor,
+    set_assignment_cursor,
+    on_ticket_change,
+    transaction,
+)
+
+OPEN_STATUSES = ("Open", "In Progress")
+
+
+class AssignmentEngine:
+    """
+    Picks the HR specialist for a new escalation.
+
+    Strategies:
+      - "least_loaded": fewest Open / In Progress tickets, preferring specialists in the
+        employee's region. Someone outside the region is picked only if their queue is
+        shorter by more than Config.ASSIGNMENT_REGION_SLACK.
+      - "round_robin": strict rotation through the region's specialists (or everyone if
+        the region has none). The cursor lives in assignment_state, so it survives restarts.
+
+    The roster and per-specialist load are held in memory. assign() reserves a slot on
+    the chosen specialist at once, so a burst of concurrent escalations spreads out instead
+    of all seeing the same counts; the ticket's create notification then confirms the
+    reservation rather than counting it again, and release() hands it back if the ticket
+    is never created. update_ticket_status keeps the counters current through
+    on_ticket_change, and a periodic resync from the DB repairs drift from other processes
+    or rolled-back writes (and drops reservations nobody confirmed or released).
+    """
+
+    STRATEGIES = ("least_loaded", "round_robin")
+
+    def __init__(self, strategy=None, region_slack=None, resync_seconds=None):
+        self.strategy = strategy or Config.ASSIGNMENT_STRATEGY
+        if self.strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown assignment strategy: {self.strategy}")
+        self.region_slack = region_slack if region_slack is not None else Config.ASSIGNMENT_REGION_SLACK
+        self.resync_seconds = resync_seconds if resync_seconds is not None else Config.ASSIGNMENT_RESYNC_SECONDS
+        self.roster = {}        # hr_id -> region
+        self.load = {}          # hr_id -> open ticket count
+        self.last_assigned = {} # hr_id -> monotonic time of last assignment (tie-break)
+        self.reserved = {}      # hr_id -> monotonic times of picks whose ticket is not created yet
+        self._synced_at = 0.0
+        self._lock = threading.RLock()
+        on_ticket_change(self._on_ticket_change)
+
+    # --- State ---
+    def resync(self):
+        """Reloads roster and load counters from the DB."""
+        roster = get_hr_roster()
+        counts = get_open_ticket_counts()
+        with self._lock:
+            now = time.monotonic()
+            self.reserved = {
+                hr_id: live for hr_id, picks in self.reserved.items()
+                if hr_id in roster and (live := [t for t in picks if now - t < self.resync_seconds])
+            }
+            self.roster = roster
+            self.load = {hr_id: counts.get(hr_id, 0) + len(self.reserved.get(hr_id, ())) for hr_id in roster}
+            self._synced_at = now
+
+    def _maybe_resync(self):
+        if not self.roster or time.monotonic() - self._synced_at > self.resync_seconds:
+            self.resync()
+
+    def _on_ticket_change(self, ticket_id, assigned_to, old_status, new_status):
+        delta = (new_status in OPEN_STATUSES) - (old_status in OPEN_STATUSES)
+        if not delta:
+            return
+        with self._lock:
+            if old_status is None and self.reserved.get(assigned_to):
+                self.reserved[assigned_to].pop(0) # Counted when assign() picked them
+                return
+            if assigned_to in self.load:
+                self.load[assigned_to] = max(0, self.load[assigned_to] + delta)
+
+    # --- Strategies ---
+    def _candidates(self, region):
+        local = [hr_id for hr_id, r in self.roster.items() if r == region]
+        return local, [hr_id for hr_id in self.roster if hr_id not in local]
+
+    def _least_loaded(self, region):
+        local, remote = self._candidates(region)
+        rank = lambda hr_id: (self.load.get(hr_id, 0), self.last_assigned.get(hr_id, 0.0), hr_id)
+        best_local = min(local, key=rank) if local else None
+        best_remote = min(remote, key=rank) if remote else None
+        if best_local is None:
+            return best_remote
+        if best_remote is not None and self.load[best_remote] + self.region_slack < self.load[best_local]:
+            return best_remote # Region queue is badly backed up; spill over
+        return best_local
+
+    def _round_robin(self, region):
+        local, remote = self._candidates(region)
+        pool = sorted(local or remote)
+        key = f"round_robin:{region if local else '*'}"
+        with transaction(): # Read-modify-write of the shared cursor is atomic across sessions
+            last = get_assignment_cursor(key)
+            choice = pool[(pool.index(last) + 1) % len(pool)] if last in pool else pool[0]
+            set_assignment_cursor(key, choice)
+        return choice
+
+    def assign(self, region=None):
+        """Returns the HR id for a new ticket from an employee in `region`, or "Unassigned"."""
+        with self._lock:
+            self._maybe_resync()
+            if not self.roster:
+                return "Unassigned"
+            if self.strategy == "round_robin":
+                choice = self._round_robin(region)
+            else:
+                choice = self._least_loaded(region)
+            now = time.monotonic()
+            self.last_assigned[choice] = now
+            self.load[choice] = self.load.get(choice, 0) + 1
+            self.reserved.setdefault(choice, []).append(now)
+            return choice
+
+    def release(self, hr_id):
+        """Hands back a slot assign() reserved when the ticket for it was never created."""
+        with self._lock:
+            if self.reserved.get(hr_id):
+                self.reserved[hr_id].pop(0)
+                self.load[hr_id] = max(0, self.load.get(hr_id, 0) - 1)
+
+    def snapshot(self):
+        """[(hr_id, region, open tickets)] for dashboards and benchmarks."""
+        with self._lock:
+            return [(hr_id, self.roster[hr_id], self.load.get(hr_id, 0)) for hr_id in sorted(self.roster)]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_assignment_engine():
+    """Process-wide engine shared by every Streamlit session."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AssignmentEngine()
+        return _engine
+
+
+def assign_hr(region=None):
+    return get_assignment_engine().assign(region)
+
+
+def release_hr(hr_id):
+    get_assignment_engine().release(hr_id)
@@ -0,0 +1,146 @@
+# modules/classifier.py
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from config import Config
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+# --- HIGH-CONFIDENCE RULES ---
+# Each rule: (pattern, metrics, confidence). First match wins, so order matters.
+# Only greetings / chitchat are decided by keywords alone; anything else needs the model or the LLM.
+GREETING_RE = re.compile(
+    r"^\s*(hi+|hello+|hey+|yo|good (morning|afternoon|evening)|thanks?( you)?( so much)?|thx|ty|"
+    r"ok(ay)?|cool|great|bye|goodbye|see you|cheers)[\s!.,:)]*$", re.I
+)
+
+RULES = [
+    (GREETING_RE, {"intent": "GENERAL_CHITCHAT", "type": "L1_FACTUAL", "tone": 1}, 0.98),
+]
+
+# --- KEYWORD HINTS ---
+# Evidence, not verdicts: "How do I file a complaint?" or "I hate to ask, but..." are ordinary questions.
+# A hit becomes an extra token for the Naive Bayes model and a note in the supervisor prompt.
+# evaluate_classifier.py reports how often the LLM agrees with each hint.
+HOSTILE_RE = re.compile(r"\b(hate|idiot|stupid|useless|pathetic|sue|kill|threat|damn|f\*+|wtf)\b", re.I)
+GRIEVANCE_RE = re.compile(
+    r"\b(not working|no reply|no response|still waiting|never (got|received)|nobody|complain(t)?|"
+    r"unfair|ignored|escalate|unacceptable)\b", re.I
+)
+
+HINTS = {"hostile": HOSTILE_RE, "grievance": GRIEVANCE_RE}
+
+
+def keyword_hints(text):
+    """Names of the HINTS whose keywords appear in text."""
+    return [name for name, pattern in HINTS.items() if pattern.search(text)]
+
+
+def tokenize(text):
+    # "#hint" tokens cannot collide with words (TOKEN_RE never yields '#')
+    return TOKEN_RE.findall(text.lower()) + [f"#{hint}" for hint in keyword_hints(text)]
+
+
+class NaiveBayesModel:
+    """Multinomial Naive Bayes over word tokens, one model per label (intent / type / tone)."""
+
+    def __init__(self, priors=None, likelihoods=None, vocab_size=0, totals=None):
+        self.priors = priors or {}          # label -> log P(label)
+        self.likelihoods = likelihoods or {}  # label -> {token: log P(token|label)}
+        self.totals = totals or {}          # label -> token count (for unseen-token smoothing)
+        self.vocab_size = vocab_size
+
+    @classmethod
+    def fit(cls, texts, labels):
+        counts = defaultdict(Counter)
+        label_counts = Counter(labels)
+        for text, label in zip(texts, labels):
+            counts[label].update(tokenize(text))
+        vocab = set(t for c in counts.values() for t in c)
+        priors = {str(l): math.log(n / len(labels)) for l, n in label_counts.items()}
+        likelihoods, totals = {}, {}
+        for label, c in counts.items():
+            total = sum(c.values())
+            totals[str(label)] = total
+            likelihoods[str(label)] = {t: math.log((n + 1) / (total + len(vocab))) for t, n in c.items()}
+        return cls(priors, likelihoods, len(vocab), totals)
+
+    def predict(self, text):
+        """Returns (label, posterior probability)."""
+        if not self.priors:
+            return None, 0.0
+        tokens = tokenize(text)
+        scores = {}
+        for label, prior in self.priors.items():
+            unseen = math.log(1 / (self.totals[label] + self.vocab_size))
+            table = self.likelihoods[label]
+            scores[label] = prior + sum(table.get(t, unseen) for t in tokens)
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+    def to_dict(self):
+        return {"priors": self.priors, "likelihoods": self.likelihoods,
+                "vocab_size": self.vocab_size, "totals": self.totals}
+
+
+class FastClassifier:
+    """
+    First-stage intent/tone classifier that runs locally in microseconds.
+    A keyword rule catches greetings; a Naive Bayes model trained on logged LLM
+    classifications (hostile / grievance keywords are features, not verdicts) covers
+    the rest. classify() returns None when neither is confident enough, and the caller
+    falls back to the LLM.
+    """
+
+    FIELDS = ("intent", "type", "tone")
+
+    def __init__(self, model_path=None, threshold=None):
+        self.model_path = model_path or Config.CLASSIFIER_MODEL_PATH
+        self.threshold = threshold if threshold is not None else Config.FAST_CLASSIFIER_CONFIDENCE
+        self.models = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.model_path):
+            return {}
+        with open(self.model_path, "r") as f:
+            raw = json.load(f)
+        return {field: NaiveBayesModel(**raw[field]) for field in self.FIELDS if field in raw}
+
+    def train(self, rows, save=True):
+        """rows: [(question, {"intent", "type", "tone"})] -> fits one model per field."""
+        texts = [q for q, _ in rows]
+        self.models = {
+            field: NaiveBayesModel.fit(texts, [str(m.get(field)) for _, m in rows])
+            for field in self.FIELDS
+        }
+        if save:
+            os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+            with open(self.model_path, "w") as f:
+                json.dump({field: m.to_dict() for field, m in self.models.items()}, f)
+        return self
+
+    def predict(self, question):
+        """Best local guess regardless of threshold -> {"metrics", "confidence", "path"}."""
+        for pattern, metrics, confidence in RULES:
+            if pattern.search(question):
+                return {"metrics": dict(metrics), "confidence": confidence, "path": "local_rules"}
+
+        if len(self.models) == len(self.FIELDS):
+            metrics, confidence = {}, 1.0
+            for field, model in self.models.items():
+                label, p = model.predict(question)
+                metrics[field] = int(label) if field == "tone" and label.isdigit() else label
+                confidence = min(confidence, p) # As confident as the weakest field
+            return {"metrics": metrics, "confidence": round(confidence, 3), "path": "local_model"}
+
+        return {"metrics": None, "confidence": 0.0, "path": "none"}
+
+    def classify(self, question):
+        """Returns the prediction only if it clears the confidence threshold, else None."""
+        guess = self.predict(question)
+        if guess["metrics"] and guess["confidence"] >= self.threshold:
+            return guess
+        return None
@@ -1,117 +1,610 @@
+import json
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 import pandas as pd
 from config import Config
+from modules.migrations import ensure_migrated
+
+# ==========================================
+# CONNECTION POOL (WAL, busy timeout, statement cache)
+# ==========================================
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",      # Readers never block the single writer
+    "PRAGMA synchronous=NORMAL",    # Safe with WAL, far fewer fsyncs
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",     # ~16 MB page cache per connection
+    "PRAGMA foreign_keys=ON",
+]
+
+
+def _configure(conn):
+    conn.execute(f"PRAGMA busy_timeout={Config.DB_BUSY_TIMEOUT_MS}")
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class PoolExhaustedError(sqlite3.OperationalError):
+    """Every pooled connection stayed checked out for the whole busy timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived SQLite connections shared by every Streamlit session.
+    Connections run in autocommit mode; writes are grouped with transaction().
+    Reusing connections also reuses sqlite3's per-connection prepared statement cache.
+    """
+
+    def __init__(self, db_path, size=None):
+        self.db_path = db_path
+        self.size = size or Config.DB_POOL_SIZE
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _new_connection(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=Config.DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False, # Handed between threads, but only ever used by one at a time
+            isolation_level=None,
+            cached_statements=256,
+        )
+        return _configure(conn)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._new_connection()
+        try:
+            return self._idle.get(timeout=Config.DB_BUSY_TIMEOUT_MS / 1000)
+        except queue.Empty:
+            raise PoolExhaustedError(
+                f"connection pool exhausted ({self.size} connections busy for {Config.DB_BUSY_TIMEOUT_MS} ms)"
+            ) from None
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed:
+                self._idle.put(conn)
+                return
+        conn.close() # Checked out when the pool was closed: don't hand it out again
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Closes idle connections now; ones still checked out are closed when released."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local() # Holds the connection of the transaction open on this thread
+_ticket_listeners = [] # Called with every ticket create / status change (see on_ticket_change)
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_path != Config.DB_PATH:
+            ensure_migrated(Config.DB_PATH) # Upgrade older DB files in place before first use
+            if _pool is not None:
+                _pool.close() # DB path changed: don't leak the old file's connections
+            _pool = ConnectionPool(Config.DB_PATH)
+        return _pool
+
 
 def get_connection():
-    return sqlite3.connect(Config.DB_PATH)
+    """Standalone connection with the same pragmas (scripts / one-off maintenance)."""
+    return _configure(sqlite3.connect(Config.DB_PATH, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000))
+
+
+@contextmanager
+def transaction():
+    """
+    Groups several writes into one atomic commit, e.g. one chat turn:
+
+        with transaction():
+            save_chat_message(uid, "user", q)
+            save_chat_message(uid, "assistant", a)
 
+    Helpers called inside the block join it instead of committing on their own.
+    Ticket-change notifications raised inside the block are held until the commit
+    (and dropped on rollback), so listeners never see uncommitted tickets.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        yield conn # Nested: the outermost block commits
+        return
+    with get_pool().connection() as conn:
+        _local.conn = conn
+        _local.pending_notifications = []
+        try:
+            conn.execute("BEGIN IMMEDIATE") # Take the write lock up front (no upgrade deadlocks)
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            _local.conn = None
+            pending, _local.pending_notifications = _local.pending_notifications, []
+    # Committed: listeners may now read the rows (and use a pooled connection of their own)
+    for change in pending:
+        _fire_ticket_change(*change)
+
+
+@contextmanager
+def _reader():
+    """Pooled connection for reads (joins an open transaction so it sees its own writes)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        yield conn
+        return
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def on_ticket_change(callback):
+    """
+    Registers callback(ticket_id, assigned_to, old_status, new_status); old_status is None
+    for new tickets. Used by the assignment engine to keep its load counters in step.
+    """
+    if callback not in _ticket_listeners:
+        _ticket_listeners.append(callback)
+
+def _notify_ticket_change(ticket_id, assigned_to, old_status, new_status):
+    if getattr(_local, "conn", None) is not None:
+        _local.pending_notifications.append((ticket_id, assigned_to, old_status, new_status)) # Fired on commit
+        return
+    _fire_ticket_change(ticket_id, assigned_to, old_status, new_status)
+
+def _fire_ticket_change(ticket_id, assigned_to, old_status, new_status):
+    for callback in list(_ticket_listeners):
+        try:
+            callback(ticket_id, assigned_to, old_status, new_status)
+        except Exception as e:
+            print(f"Ticket listener error: {e}")
+
+
+# ==========================================
+# QUERIES
+# ==========================================
 def get_employee_salary_details(emp_id):
-    mock_db = {
-        "EMP001": {"base_hourly": 50, "currency": "USD", "pending_ot_hours": 10}, # John
-        "EMP002": {"base_hourly": 1153, "currency": "Rs", "pending_ot_hours": 30}, # Rahul (Approx 2L/month)
-    }
-    return mock_db.get(emp_id, None)
+    with _reader() as conn:
+        row = conn.execute(
+            "SELECT base_hourly, currency, pending_ot_hours, ot_multiplier FROM payroll WHERE emp_id=?", (emp_id,)
+        ).fetchone()
+    if row:
+        return {"base_hourly": row[0], "currency": row[1], "pending_ot_hours": row[2], "ot_multiplier": row[3]}
+    return None
+
+def upsert_payroll(rows):
+    """rows: (emp_id, region, currency, base_hourly, pending_ot_hours, ot_multiplier) tuples."""
+    with transaction() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO payroll (emp_id, region, currency, base_hourly, pending_ot_hours, ot_multiplier) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+
+def read_payroll_chunk(region=None, after_rowid=0, limit=50000):
+    """Next chunk of payroll rows (rowid > after_rowid) as a columnar DataFrame; keyset-paged, never OFFSET."""
+    where, params = ("region=? AND rowid>?", [region, after_rowid]) if region else ("rowid>?", [after_rowid])
+    with _reader() as conn:
+        return pd.read_sql(
+            "SELECT rowid, emp_id, region, currency, base_hourly, pending_ot_hours, ot_multiplier "
+            f"FROM payroll WHERE {where} ORDER BY rowid LIMIT ?", conn, params=params + [limit]
+        )
+
+def start_payroll_run(region, new_multiplier, regulation=None):
+    with transaction() as conn:
+        cursor = conn.execute(
+            "INSERT INTO payroll_runs (region, new_multiplier, regulation) VALUES (?, ?, ?)",
+            (region, new_multiplier, regulation)
+        )
+        return cursor.lastrowid
+
+def save_payroll_arrears(rows):
+    """rows: (run_id, emp_id, region, currency, hours, old_multiplier, new_multiplier, arrears) tuples."""
+    with transaction() as conn:
+        conn.executemany("INSERT OR REPLACE INTO payroll_arrears VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+def finish_payroll_run(run_id, employees, affected, totals, seconds):
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE payroll_runs SET status='done', employees=?, affected=?, totals=?, seconds=? WHERE run_id=?",
+            (employees, affected, json.dumps(totals), seconds, run_id)
+        )
+
+def fail_payroll_run(run_id):
+    """Marks an interrupted run 'failed' and drops the partial arrears it had written."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM payroll_arrears WHERE run_id=?", (run_id,))
+        conn.execute("UPDATE payroll_runs SET status='failed' WHERE run_id=?", (run_id,))
 
 def fetch_user(user_id):
-    conn = get_connection()
-    user = conn.execute("SELECT * FROM users WHERE id=?", (user_id,)).fetchone()
-    conn.close()
+    with _reader() as conn:
+        user = conn.execute("SELECT * FROM users WHERE id=?", (user_id,)).fetchone()
     if user:
         return {'id': user[0], 'name': user[1], 'role': user[2], 'region': user[3], 'lang': user[4]}
     return None
 
 def create_ticket(emp_id, question, score, assigned_hr):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO tickets (emp_id, question, score, assigned_to, status) VALUES (?, ?, ?, ?, ?)",
-        (emp_id, question, score, assigned_hr, "Open")
-    )
-    t_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return t_id
+    with transaction() as conn:
+        cursor = conn.execute(
+            "INSERT INTO tickets (emp_id, question, score, assigned_to, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)",
+            (emp_id, question, score, assigned_hr, "Open")
+        )
+    _notify_ticket_change(cursor.lastrowid, assigned_hr, None, "Open")
+    return cursor.lastrowid
 
 def get_hr_list():
-    conn = get_connection()
-    res = conn.execute("SELECT id FROM users WHERE role='HR'").fetchall()
-    conn.close()
+    with _reader() as conn:
+        res = conn.execute("SELECT id FROM users WHERE role='HR'").fetchall()
     return [r[0] for r in res]
 
+def get_hr_roster():
+    """{hr_id: region} for every HR specialist."""
+    with _reader() as conn:
+        rows = conn.execute("SELECT id, region FROM users WHERE role='HR' ORDER BY id").fetchall()
+    return {r[0]: r[1] for r in rows}
+
+def get_open_ticket_counts():
+    """{assigned_to: number of Open / In Progress tickets}, summed from the ticket_counts counters."""
+    with _reader() as conn:
+        rows = conn.execute(
+            "SELECT assigned_to, tickets FROM ticket_counts WHERE status IN ('Open', 'In Progress')"
+        ).fetchall()
+    counts = {}
+    for assigned_to, tickets in rows:
+        if assigned_to != ALL_ASSIGNEES and tickets:
+            counts[assigned_to] = counts.get(assigned_to, 0) + tickets
+    return counts
+
+def get_assignment_cursor(key):
+    with _reader() as conn:
+        row = conn.execute("SELECT last_assigned FROM assignment_state WHERE key=?", (key,)).fetchone()
+    return row[0] if row else None
+
+def set_assignment_cursor(key, last_assigned):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO assignment_state (key, last_assigned, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(key) DO UPDATE SET last_assigned=excluded.last_assigned, updated_at=excluded.updated_at",
+            (key, last_assigned)
+        )
+
 def update_language_pref(emp_id, lang):
-    conn = get_connection()
-    conn.execute("UPDATE users SET language=? WHERE id=?", (lang, emp_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("UPDATE users SET language=? WHERE id=?", (lang, emp_id))
+
+TICKET_COLUMNS = ["ticket_id", "emp_id", "question", "score", "assigned_to", "status", "created_at", "updated_at"]
+TICKET_SORTS = { # sort -> (ORDER BY, cursor columns)
+    "newest": ("ticket_id DESC", ("ticket_id",)),
+    "oldest": ("ticket_id ASC", ("ticket_id",)),
+    "risk": ("score DESC, ticket_id DESC", ("score", "ticket_id")),
+}
+MAX_TICKET_ID = 2 ** 63 - 1
+ALL_ASSIGNEES = "*" # ticket_counts rows that total every assignee (migration 11)
+
+def _ticket_filters(assigned_to=None, status=None, min_score=None, unresolved=False):
+    clauses, params = [], []
+    if assigned_to is not None:
+        clauses.append("assigned_to=?")
+        params.append(assigned_to)
+    if status is not None:
+        clauses.append("status=?")
+        params.append(status)
+    if unresolved:
+        clauses.append("status<>'Resolved'")
+    if min_score is not None:
+        clauses.append("score>=?")
+        params.append(min_score)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def get_tickets_page(assigned_to=None, status=None, min_score=None, unresolved=False,
+                     sort="newest", after=None, page_size=None):
+    """
+    One page of the ticket queue, filtered and sorted in SQL. Returns a DataFrame.
+    Keyset-paged: `after` is the previous page's ticket_cursor() (None for the first page),
+    so a deep page costs the same as the first.
+    """
+    page_size = page_size or Config.TICKET_PAGE_SIZE
+    sort = sort if sort in TICKET_SORTS else "newest"
+    where, params = _ticket_filters(assigned_to, status, min_score, unresolved)
+    frames = []
+    with _reader() as conn:
+        for condition, bounds in _keyset_ranges(sort, after):
+            remaining = page_size - sum(len(f) for f in frames)
+            if remaining <= 0:
+                break
+            sql = (f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets{where}{' AND' if where else ' WHERE'} {condition} "
+                   f"ORDER BY {TICKET_SORTS[sort][0]} LIMIT ?")
+            frames.append(pd.read_sql(sql, conn, params=params + bounds + [remaining]))
+    frames = [f for f in frames if not f.empty] or frames[:1]
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+def _keyset_ranges(sort, after):
+    """
+    [(condition, params)] continuing `sort` after the cursor, in order. Each is one index seek:
+    a row-value (score, ticket_id) < (?, ?) would only seek on score and then walk the whole
+    score bucket (scores take a handful of values), so "risk" finishes the cursor's bucket first.
+    """
+    if sort == "oldest":
+        return [("ticket_id>?", [after[0] if after else 0])]
+    if sort == "risk":
+        if after is None:
+            return [("score<?", [float("inf")])]
+        return [("score=? AND ticket_id<?", list(after)), ("score<?", [after[0]])]
+    return [("ticket_id<?", [after[0] if after else MAX_TICKET_ID])]
 
-def get_all_tickets():
-    conn = get_connection()
-    df = pd.read_sql("SELECT * FROM tickets", conn)
-    conn.close()
-    return df
+def ticket_cursor(page, sort="newest"):
+    """Cursor after the last row of a get_tickets_page() result (None if the page is empty)."""
+    if page.empty:
+        return None
+    columns = TICKET_SORTS.get(sort, TICKET_SORTS["newest"])[1]
+    return tuple(page.iloc[-1][column].item() for column in columns)
+
+def _count_filters(assigned_to=None, status=None, min_score=None, unresolved=False):
+    """_ticket_filters for ticket_counts: always keyed by assignee (ALL_ASSIGNEES for everyone)."""
+    return _ticket_filters(ALL_ASSIGNEES if assigned_to is None else assigned_to, status, min_score, unresolved)
+
+def get_ticket_metrics(assigned_to=None, high_risk_score=None):
+    """
+    Dashboard counters, read from the trigger-maintained ticket_counts rows of one assignee
+    (a few rows, however many tickets exist):
+    {"total", "open", "in_progress", "resolved", "high_risk", "by_status"}.
+    """
+    high_risk_score = high_risk_score if high_risk_score is not None else Config.HIGH_RISK_SCORE
+    where, params = _count_filters(assigned_to)
+    with _reader() as conn:
+        rows = conn.execute(
+            f"SELECT status, SUM(tickets), SUM(CASE WHEN score>=? THEN tickets ELSE 0 END) FROM ticket_counts{where} "
+            "GROUP BY status HAVING SUM(tickets)>0",
+            [high_risk_score] + params
+        ).fetchall()
+    by_status = {r[0]: r[1] for r in rows}
+    return {
+        "total": sum(by_status.values()),
+        "open": by_status.get("Open", 0),
+        "in_progress": by_status.get("In Progress", 0),
+        "resolved": by_status.get("Resolved", 0),
+        "high_risk": sum(r[2] or 0 for r in rows),
+        "by_status": by_status,
+    }
+
+def count_tickets(assigned_to=None, status=None, min_score=None, unresolved=False):
+    """Tickets matching the get_tickets_page() filters, summed from ticket_counts."""
+    where, params = _count_filters(assigned_to, status, min_score, unresolved)
+    with _reader() as conn:
+        return conn.execute(f"SELECT COALESCE(SUM(tickets), 0) FROM ticket_counts{where}", params).fetchone()[0]
 
 def update_ticket_status(ticket_id, new_status):
-    conn = get_connection()
     try:
-        conn.execute("UPDATE tickets SET status=? WHERE ticket_id=?", (new_status, ticket_id))
-        conn.commit()
+        with transaction() as conn:
+            row = conn.execute("SELECT assigned_to, status FROM tickets WHERE ticket_id=?", (ticket_id,)).fetchone()
+            conn.execute(
+                "UPDATE tickets SET status=?, updated_at=CURRENT_TIMESTAMP WHERE ticket_id=?",
+                (new_status, ticket_id)
+            )
+        if row and row[1] != new_status:
+            _notify_ticket_change(ticket_id, row[0], row[1], new_status)
     except Exception as e:
         print(f"DB Error: {e}")
-    finally:
-        conn.close()
-
-def log_hr_response(ticket_id, response_text):
-    # Optional: You could create a new table for 'responses' if you wanted to keep a history
-    # For now, we will just print it to the console to simulate sending an email
-    print(f"📧 SENDING EMAIL FOR TICKET #{ticket_id}")
-    print(f"📄 CONTENT: {response_text}")
-    # In a real app, you would use smtplib here to send the actual email
-    return True
 
 def fetch_chat_history(user_id):
     """Loads previous chat messages for a specific user."""
-    conn = get_connection()
-    rows = conn.execute(
-        "SELECT role, content FROM chat_history WHERE user_id=? ORDER BY msg_id ASC", 
-        (user_id,)
-    ).fetchall()
-    conn.close()
+    with _reader() as conn:
+        rows = conn.execute(
+            "SELECT role, content FROM chat_history WHERE user_id=? ORDER BY msg_id ASC",
+            (user_id,)
+        ).fetchall()
     # Convert to list of dicts for Streamlit
     return [{"role": r[0], "content": r[1]} for r in rows]
 
+def fetch_chat_history_page(user_id, before_msg_id=None, limit=None):
+    """
+    Keyset-paginated history: the newest `limit` messages older than before_msg_id
+    (or the newest overall), returned oldest-first for display.
+    Returns (messages, oldest_msg_id, has_more).
+    """
+    limit = limit or Config.CHAT_PAGE_SIZE
+    with _reader() as conn:
+        if before_msg_id is None:
+            rows = conn.execute(
+                "SELECT msg_id, role, content FROM chat_history WHERE user_id=? ORDER BY msg_id DESC LIMIT ?",
+                (user_id, limit + 1)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT msg_id, role, content FROM chat_history WHERE user_id=? AND msg_id<? ORDER BY msg_id DESC LIMIT ?",
+                (user_id, before_msg_id, limit + 1)
+            ).fetchall()
+    has_more = len(rows) > limit # The extra row only tells us another page exists
+    rows = rows[:limit][::-1]
+    messages = [{"msg_id": r[0], "role": r[1], "content": r[2]} for r in rows]
+    oldest = rows[0][0] if rows else before_msg_id
+    return messages, oldest, has_more
+
 def save_chat_message(user_id, role, content):
     """Saves a single message to the DB."""
-    conn = get_connection()
-    conn.execute(
-        "INSERT INTO chat_history (user_id, role, content) VALUES (?, ?, ?)",
-        (user_id, role, content)
-    )
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO chat_history (user_id, role, content) VALUES (?, ?, ?)",
+            (user_id, role, content)
+        )
 
 def log_hr_response(ticket_id, response_text):
     """
     1. Finds which employee owns the ticket.
     2. Inserts the HR response into THAT employee's chat history.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # 1. Get Employee ID from the Ticket
-    res = cursor.execute("SELECT emp_id FROM tickets WHERE ticket_id=?", (ticket_id,)).fetchone()
-    
-    if res:
-        emp_id = res[0]
-        formatted_reply = f"📩 **HR RESPONSE (Ticket #{ticket_id}):**\n{response_text}"
-        
-        # 2. Save to Chat History as an 'assistant' message
-        cursor.execute(
-            "INSERT INTO chat_history (user_id, role, content) VALUES (?, ?, ?)",
-            (emp_id, 'assistant', formatted_reply)
+    with transaction() as conn:
+        # 1. Get Employee ID from the Ticket
+        res = conn.execute("SELECT emp_id FROM tickets WHERE ticket_id=?", (ticket_id,)).fetchone()
+
+        if res:
+            emp_id = res[0]
+            formatted_reply = f"📩 **HR RESPONSE (Ticket #{ticket_id}):**\n{response_text}"
+
+            # 2. Save to Chat History as an 'assistant' message
+            conn.execute(
+                "INSERT INTO chat_history (user_id, role, content) VALUES (?, ?, ?)",
+                (emp_id, 'assistant', formatted_reply)
+            )
+            print(f"✅ Reply saved to chat history for {emp_id}")
+        else:
+            print("❌ Error: Ticket not found.")
+
+def fetch_undrafted_tickets(kb_version, assigned_to=None):
+    """Open / In Progress tickets (with the employee's region) that have no draft for kb_version."""
+    sql = (
+        "SELECT t.ticket_id, t.emp_id, t.question, t.score, COALESCE(u.region, 'General') "
+        "FROM tickets t LEFT JOIN users u ON u.id = t.emp_id "
+        "WHERE t.status IN ('Open', 'In Progress') "
+        "AND NOT EXISTS (SELECT 1 FROM ticket_drafts d WHERE d.ticket_id = t.ticket_id AND d.kb_version = ?)"
+    )
+    params = [kb_version]
+    if assigned_to is not None:
+        sql += " AND t.assigned_to = ?"
+        params.append(assigned_to)
+    with _reader() as conn:
+        rows = conn.execute(sql + " ORDER BY t.ticket_id", params).fetchall()
+    return [{"ticket_id": r[0], "emp_id": r[1], "question": r[2], "score": r[3], "region": r[4]} for r in rows]
+
+def save_ticket_draft(ticket_id, kb_version, draft, latency_ms=None):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO ticket_drafts (ticket_id, kb_version, draft, latency_ms, created_at) "
+            "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
+            (ticket_id, kb_version, draft, latency_ms)
         )
-        conn.commit()
-        print(f"✅ Reply saved to chat history for {emp_id}")
-    else:
-        print("❌ Error: Ticket not found.")
-        
-    conn.close()
\ No newline at end of file
+
+def fetch_ticket_draft(ticket_id, kb_version):
+    """Stored draft for this ticket under the current knowledge base, or None."""
+    with _reader() as conn:
+        row = conn.execute(
+            "SELECT draft, latency_ms, created_at FROM ticket_drafts WHERE ticket_id=? AND kb_version=?",
+            (ticket_id, kb_version)
+        ).fetchone()
+    if row:
+        return {"draft": row[0], "latency_ms": row[1], "created_at": row[2]}
+    return None
+
+def delete_stale_drafts(keep_version):
+    """Drops drafts written against any other knowledge-base version."""
+    with transaction() as conn:
+        return conn.execute("DELETE FROM ticket_drafts WHERE kb_version<>?", (keep_version,)).rowcount
+
+def fetch_watchdog_result(cache_key):
+    """Latest stored watchdog result for this key -> {"result", "created_at"} or None."""
+    with _reader() as conn:
+        row = conn.execute(
+            "SELECT result, created_at FROM watchdog_results WHERE cache_key=? ORDER BY result_id DESC LIMIT 1",
+            (cache_key,)
+        ).fetchone()
+    if row:
+        return {"result": json.loads(row[0]), "created_at": row[1]}
+    return None
+
+def save_watchdog_result(cache_key, kind, title, content_hash, kb_version, model, result):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO watchdog_results (cache_key, kind, title, content_hash, kb_version, model, result) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cache_key, kind, title, content_hash, kb_version, model, json.dumps(result))
+        )
+
+def fetch_watchdog_history(kind="analysis", limit=20):
+    """Most recent stored results of one kind, newest first."""
+    with _reader() as conn:
+        rows = conn.execute(
+            "SELECT result_id, title, kb_version, model, created_at, result FROM watchdog_results "
+            "WHERE kind=? ORDER BY result_id DESC LIMIT ?",
+            (kind, limit)
+        ).fetchall()
+    return [{"result_id": r[0], "title": r[1], "kb_version": r[2], "model": r[3], "created_at": r[4],
+             "result": json.loads(r[5])} for r in rows]
+
+def fetch_source_states():
+    """{source: {"etag", "last_modified", "mtime", "size", "content_hash"}} for the regulation poller."""
+    with _reader() as conn:
+        rows = conn.execute(
+            "SELECT source, etag, last_modified, mtime, size, content_hash FROM regulation_sources"
+        ).fetchall()
+    return {r[0]: {"etag": r[1], "last_modified": r[2], "mtime": r[3], "size": r[4], "content_hash": r[5]} for r in rows}
+
+def save_source_state(source, state, changed=False, title=None):
+    """Upserts one source's validators; changed=True also stamps changed_at and the new title."""
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO regulation_sources (source, etag, last_modified, mtime, size, content_hash, title, checked_at, changed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) "
+            "ON CONFLICT(source) DO UPDATE SET etag=excluded.etag, last_modified=excluded.last_modified, "
+            "mtime=excluded.mtime, size=excluded.size, content_hash=excluded.content_hash, checked_at=excluded.checked_at"
+            + (", title=excluded.title, changed_at=excluded.changed_at" if changed else ""),
+            (source, state.get("etag"), state.get("last_modified"), state.get("mtime"), state.get("size"),
+             state.get("content_hash"), title)
+        )
+
+def enqueue_regulation(source, region, title, body, content_hash):
+    with transaction() as conn:
+        return conn.execute(
+            "INSERT INTO regulation_queue (source, region, title, body, content_hash) VALUES (?, ?, ?, ?, ?)",
+            (source, region, title, body, content_hash)
+        ).lastrowid
+
+def fetch_pending_regulations(limit=10):
+    """Oldest first: regulations detected as new/changed and not yet analyzed."""
+    with _reader() as conn:
+        rows = conn.execute(
+            "SELECT item_id, source, region, title, body, content_hash, detected_at FROM regulation_queue "
+            "WHERE status=? ORDER BY item_id LIMIT ?",
+            ("pending", limit)
+        ).fetchall()
+    return [{"item_id": r[0], "source": r[1], "region": r[2], "title": r[3], "body": r[4],
+             "content_hash": r[5], "detected_at": r[6]} for r in rows]
+
+def mark_regulation(item_id, status):
+    with transaction() as conn:
+        conn.execute("UPDATE regulation_queue SET status=? WHERE item_id=?", (status, item_id))
+
+def log_classification(question, metrics, decided_by):
+    """Stores one (question, metrics) pair; LLM-decided rows are the fast classifier's training data."""
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO classifier_log (question, intent, type, tone, decided_by) VALUES (?, ?, ?, ?, ?)",
+            (question, metrics.get("intent"), metrics.get("type"), metrics.get("tone"), decided_by)
+        )
+
+def fetch_classification_log(decided_by="llm"):
+    """Returns [(question, {"intent", "type", "tone"})] for rows decided by the given path."""
+    with _reader() as conn:
+        rows = conn.execute(
+            "SELECT question, intent, type, tone FROM classifier_log WHERE decided_by=? ORDER BY log_id",
+            (decided_by,)
+        ).fetchall()
+    return [(r[0], {"intent": r[1], "type": r[2], "tone": r[3]}) for r in rows]
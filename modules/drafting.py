@@ -0,0 +1,89 @@
+# modules/drafting.py
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import Config
+from modules.database import fetch_undrafted_tickets, save_ticket_draft, fetch_ticket_draft, delete_stale_drafts
+
+
+class TicketDrafter:
+    """
+    Pre-drafts HR replies off the request path so the Resolution Console loads them instantly.
+
+    Drafts are stored in ticket_drafts keyed by (ticket_id, kb_version). After a knowledge
+    base rebuild the old drafts no longer match the current version, and refresh()
+    regenerates them. Work runs on a bounded thread pool (Config.DRAFT_WORKERS). A ticket
+    already queued or in flight is not queued a second time.
+    """
+
+    def __init__(self, agent, workers=None):
+        self.agent = agent
+        self.workers = workers or Config.DRAFT_WORKERS
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ticket-drafter")
+        self._in_flight = set() # (ticket_id, kb_version)
+        self._lock = threading.Lock()
+        self.stats = {"drafted": 0, "failed": 0, "draft_ms": 0.0}
+
+    @property
+    def kb_version(self):
+        return self.agent.researcher.kb_version
+
+    def _draft_one(self, ticket, kb_version):
+        key = (ticket["ticket_id"], kb_version)
+        try:
+            start = time.perf_counter()
+            draft = self.agent.draft_ticket_resolution(ticket)
+            latency_ms = round((time.perf_counter() - start) * 1000, 1)
+            save_ticket_draft(ticket["ticket_id"], kb_version, draft, latency_ms)
+            with self._lock:
+                self.stats["drafted"] += 1
+                self.stats["draft_ms"] += latency_ms
+            return True
+        except Exception as e:
+            print(f"Draft failed for ticket #{ticket['ticket_id']}: {e}")
+            with self._lock:
+                self.stats["failed"] += 1
+            return False
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def submit(self, ticket):
+        """
+        Queues one ticket dict (ticket_id, emp_id, question, region). Returns a Future,
+        or None if this ticket is already being drafted for the current KB version.
+        """
+        kb_version = self.kb_version
+        key = (ticket["ticket_id"], kb_version)
+        with self._lock:
+            if key in self._in_flight:
+                return None
+            self._in_flight.add(key)
+        return self._pool.submit(self._draft_one, ticket, kb_version)
+
+    def draft_open_tickets(self, assigned_to=None, block=True):
+        """
+        Pre-drafts every open ticket that has no draft for the current KB version.
+        With block=True waits and returns {"queued", "drafted", "failed", "seconds"}.
+        """
+        start = time.perf_counter()
+        futures = [f for f in (self.submit(t) for t in fetch_undrafted_tickets(self.kb_version, assigned_to)) if f]
+        if not block:
+            return {"queued": len(futures)}
+        done, _ = wait(futures)
+        drafted = sum(1 for f in done if f.result())
+        return {"queued": len(futures), "drafted": drafted, "failed": len(futures) - drafted,
+                "seconds": round(time.perf_counter() - start, 2)}
+
+    def refresh(self):
+        """After an index rebuild: drop drafts from older KB versions and regenerate in the background."""
+        removed = delete_stale_drafts(self.kb_version)
+        queued = self.draft_open_tickets(block=False)["queued"]
+        return {"removed": removed, "queued": queued}
+
+    def get(self, ticket_id):
+        """Stored draft for the current KB version, or None (not drafted yet / stale)."""
+        return fetch_ticket_draft(ticket_id, self.kb_version)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
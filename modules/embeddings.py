@@ -0,0 +1,268 @@
+# modules/embeddings.py
+import os
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import openai
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from config import Config
+from modules.local_embeddings import LocalEmbeddings
+
+
+class EmbeddingMismatchError(RuntimeError):
+    """Query embeddings come from a different backend / model than the one that built the index."""
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Transparent on-disk cache in front of any LangChain embeddings object.
+    Vectors are keyed by (model, sha256(text)) and stored as float32 blobs in SQLite;
+    the least recently used rows are evicted once the cache grows past its size cap.
+    """
+
+    def __init__(self, underlying, model_name, cache_path=None, max_mb=None):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache_path = cache_path or Config.EMBEDDING_CACHE_PATH
+        self.max_bytes = int((max_mb or Config.EMBEDDING_CACHE_MAX_MB) * 1024 * 1024)
+        self.signature = model_name # What built the vectors; stored in the index manifest
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS embeddings
+                              (model TEXT, text_hash TEXT, vector BLOB, last_used REAL,
+                               PRIMARY KEY (model, text_hash))''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_lru ON embeddings (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def _hash(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes):
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Chunk the IN (...) list to stay under SQLite's variable limit
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model=? AND text_hash IN ({marks})",
+                    [self.model_name] + batch
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used=? WHERE model=? AND text_hash=?",
+                    [(now, self.model_name, h) for h in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, pairs):
+        now = time.time()
+        rows = [(self.model_name, h, np.asarray(v, dtype=np.float32).tobytes(), now) for h, v in pairs]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        """Drops least recently used rows until the cache fits under max_bytes."""
+        total = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        row = self._conn.execute("SELECT AVG(LENGTH(vector)) FROM embeddings").fetchone()
+        # Trim to 90% of the cap so we don't evict on every single insert
+        excess_rows = int((total - 0.9 * self.max_bytes) / max(row[0] or 1, 1)) + 1
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess_rows,)
+        )
+        self._conn.commit()
+
+    def embed_documents(self, texts):
+        hashes = [self._hash(t) for t in texts]
+        cached = self._lookup(hashes)
+
+        # Only send texts we have never seen (deduplicated) to the API
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            # Round-trip through float32 so a hit and a miss return identical vectors
+            fresh = [(h, np.asarray(v, dtype=np.float32).tolist()) for h, v in zip(missing.keys(), vectors)]
+            self._store(fresh)
+            cached.update(fresh)
+
+        # Counted after the API call so retried batches aren't double-counted
+        self.hits += len(texts) - sum(1 for h in hashes if h in missing)
+        self.misses += len(missing)
+
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text):
+        h = self._hash(text)
+        cached = self._lookup([h])
+        if h in cached:
+            self.hits += 1
+            return cached[h]
+
+        self.misses += 1
+        vector = np.asarray(self.underlying.embed_query(text), dtype=np.float32).tolist()
+        self._store([(h, vector)])
+        return vector
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def build_embeddings():
+    """The embeddings object used by both ingestion and query paths (Config.EMBEDDING_BACKEND)."""
+    if Config.EMBEDDING_BACKEND == "local":
+        return LocalEmbeddings() # Local and cheap: nothing to cache
+    if Config.EMBEDDING_BACKEND != "openai":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {Config.EMBEDDING_BACKEND!r} (expected 'openai' or 'local')")
+    openai_embeddings = OpenAIEmbeddings(
+        model=Config.EMBEDDING_MODEL,
+        dimensions=Config.EMBEDDING_DIMENSIONS,
+        api_key=Config.OPENAI_API_KEY,
+        base_url=Config.OPENAI_BASE_URL,
+        max_retries=0, # embed_in_batches' AIMD limiter is the only retry / backoff policy
+    )
+    return CachedEmbeddings(openai_embeddings, embedding_key())
+
+
+def embedding_key():
+    """Cache / manifest key for the vectors we produce: shortened vectors are not interchangeable with full ones."""
+    if Config.EMBEDDING_BACKEND == "local":
+        return f"local-tfidf-svd@{Config.LOCAL_EMBEDDING_DIM}"
+    if Config.EMBEDDING_DIMENSIONS:
+        return f"{Config.EMBEDDING_MODEL}@{Config.EMBEDDING_DIMENSIONS}"
+    return Config.EMBEDDING_MODEL
+
+
+# ==========================================
+# INGESTION: BATCHED, BACKPRESSURED EMBEDDING
+# ==========================================
+def is_transient_error(exc):
+    """429s, 5xx, timeouts and dropped connections are worth retrying; anything else is a real failure."""
+    if isinstance(exc, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def retry_after_seconds(exc):
+    """Honours the server's Retry-After header when there is one."""
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class _AdaptiveLimiter:
+    """
+    Bounded in-flight gate with AIMD backpressure: every throttled request halves
+    the allowed concurrency and pauses new sends; every success adds one slot back.
+    """
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self.limit = max_in_flight
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+            delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, throttled=False, backoff=0.0):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+            else:
+                self.limit = min(self.max_in_flight, self.limit + 1)
+            self._cond.notify_all()
+
+
+def embed_in_batches(embeddings, texts, batch_size=None, max_in_flight=None, max_retries=None):
+    """
+    Embeds `texts` in fixed-size batches with at most `max_in_flight` requests open.
+    Transient errors back off (jittered exponential, or Retry-After) and shrink concurrency
+    instead of aborting the rebuild. When `embeddings` is a CachedEmbeddings every finished
+    batch is written to the cache immediately, so an interrupted rebuild resumes from there.
+    Returns (vectors, stats) with vectors aligned to `texts`.
+    """
+    batch_size = batch_size or Config.EMBED_BATCH_SIZE
+    max_in_flight = max_in_flight or Config.EMBED_MAX_IN_FLIGHT
+    max_retries = Config.EMBED_MAX_RETRIES if max_retries is None else max_retries
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    limiter = _AdaptiveLimiter(max_in_flight)
+    stats = {"batches": len(batches), "retries": 0, "throttled": 0}
+    stats_lock = threading.Lock()
+
+    def embed_batch(batch):
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                vectors = embeddings.embed_documents(batch)
+            except Exception as e:
+                if not is_transient_error(e) or attempt >= max_retries:
+                    limiter.release()
+                    raise
+                delay = retry_after_seconds(e) or min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+                limiter.release(throttled=True, backoff=delay)
+                with stats_lock:
+                    stats["retries"] += 1
+                    stats["throttled"] += isinstance(e, openai.RateLimitError)
+                attempt += 1
+                continue
+            limiter.release()
+            return vectors
+
+    start = time.perf_counter()
+    vectors = []
+    if batches:
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            # map() keeps batch order, so vectors line up with texts
+            for i, batch_vectors in enumerate(pool.map(embed_batch, batches), start=1):
+                vectors.extend(batch_vectors)
+                if i % 10 == 0 or i == len(batches):
+                    print(f"🧮 Embedded {i}/{len(batches)} batches")
+
+    elapsed = time.perf_counter() - start
+    stats["chunks"] = len(texts)
+    stats["seconds"] = round(elapsed, 3)
+    stats["chunks_per_sec"] = round(len(texts) / elapsed, 1) if elapsed > 0 else 0.0
+    return vectors, stats
@@ -0,0 +1,312 @@
+# modules/knowledge_base.py
+import os
+import json
+import shutil
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from config import Config
+from modules.embeddings import embed_in_batches, embedding_key
+from modules.vector_store import MmapShard, write_shard, is_shard, remove_stale_staging
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_LAYOUT = "region_shards_mmap_bm25" # Per region: <VECTOR_DB_PATH>/shards/<region>/{index.faiss, chunks.db}
+SHARDS_DIR = "shards"
+
+
+# ==========================================
+# HELPERS
+# ==========================================
+def region_from_filename(file):
+    """'Policy_India.pdf' -> 'India'. Anything unexpected falls back to 'General'."""
+    try:
+        return file.split("_")[1].replace(".pdf", "")
+    except IndexError:
+        return "General"
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(db_path=None):
+    path = os.path.join(db_path or Config.VECTOR_DB_PATH, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, db_path=None):
+    db_path = db_path or Config.VECTOR_DB_PATH
+    os.makedirs(db_path, exist_ok=True)
+    tmp_path = os.path.join(db_path, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(db_path, MANIFEST_FILE))
+
+
+def index_spec():
+    """What the stored vectors depend on besides the PDFs; any change means a full rebuild."""
+    return {"embedding": embedding_key(), "type": Config.VECTOR_INDEX_TYPE}
+
+
+def get_kb_version(db_path=None):
+    """Content version of the knowledge base; changes whenever any indexed PDF does."""
+    manifest = load_manifest(db_path)
+    return (manifest or {}).get("version", "empty")
+
+
+def _manifest_version(files, spec):
+    h = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8"))
+    for file in sorted(files):
+        h.update(f"{file}:{files[file]['sha256']};".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def scan_policies(policies_dir=None):
+    """Returns {filename: sha256} for every PDF currently in the policy folder."""
+    policies_dir = policies_dir or Config.POLICIES_DIR
+    files = sorted(f for f in os.listdir(policies_dir) if f.endswith(".pdf"))
+    return {f: file_sha256(os.path.join(policies_dir, f)) for f in files}
+
+
+def diff_manifest(manifest, current):
+    """Compares the stored manifest against the folder scan."""
+    known = manifest.get("files", {})
+    added = [f for f in current if f not in known]
+    modified = [f for f in current if f in known and known[f]["sha256"] != current[f]]
+    removed = [f for f in known if f not in current]
+    unchanged = [f for f in current if f in known and known[f]["sha256"] == current[f]]
+    return {"added": added, "modified": modified, "removed": removed, "unchanged": unchanged}
+
+
+def load_and_split(file_path, region):
+    """Parses one PDF into region-tagged chunks."""
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    chunks = text_splitter.split_documents(PyPDFLoader(file_path).load())
+    for doc in chunks:
+        doc.metadata["region"] = region
+    return chunks
+
+
+def _parse_one(args):
+    """Process-pool worker: parse + chunk one PDF and time it."""
+    file_path, region = args
+    start = time.perf_counter()
+    chunks = load_and_split(file_path, region)
+    return chunks, time.perf_counter() - start
+
+
+def parse_policies(files, policies_dir=None, workers=None):
+    """
+    Parses & chunks PDFs across a process pool.
+    Returns [(file, region, chunks)] in the same order as `files`, whatever the completion order.
+    """
+    policies_dir = policies_dir or Config.POLICIES_DIR
+    workers = workers or Config.INGEST_WORKERS or os.cpu_count() or 1
+    jobs = [(os.path.join(policies_dir, f), region_from_filename(f)) for f in files]
+
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        results = [_parse_one(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_parse_one, jobs))
+
+    parsed = []
+    for file, (_, region), (chunks, seconds) in zip(files, jobs, results):
+        print(f"📖 Parsed {file} [{region}] -> {len(chunks)} chunks in {seconds:.2f}s")
+        parsed.append((file, region, chunks))
+    if jobs:
+        slowest = max(zip(files, results), key=lambda pair: pair[1][1])
+        print(f"⏱️ Parsed {len(jobs)} PDFs in {time.perf_counter() - start:.2f}s "
+              f"(slowest: {slowest[0]} {slowest[1][1]:.2f}s)")
+    return parsed
+
+
+def chunk_ids(file, sha, count):
+    """Deterministic vector IDs so a file's chunks can be found and deleted later."""
+    return [f"{file}::{sha[:12]}::{i}" for i in range(count)]
+
+
+def shard_path(region, db_path=None):
+    return os.path.join(db_path or Config.VECTOR_DB_PATH, SHARDS_DIR, region)
+
+
+def load_shards(db_path=None):
+    """Opens every region shard memory-mapped -> {region: MmapShard}. Cost does not grow with the corpus."""
+    shards_root = os.path.join(db_path or Config.VECTOR_DB_PATH, SHARDS_DIR)
+    shards = {}
+    if not os.path.isdir(shards_root):
+        return shards
+    for region in sorted(os.listdir(shards_root)):
+        path = os.path.join(shards_root, region)
+        if is_shard(path):
+            shards[region] = MmapShard(path)
+    return shards
+
+
+# ==========================================
+# INCREMENTAL SYNC
+# ==========================================
+def sync_knowledge_base(embeddings, shards=None, policies_dir=None, db_path=None, workers=None):
+    """
+    Brings the per-region FAISS shards in line with the policy folder.
+    Only added/modified PDFs are parsed and embedded. A touched shard is rewritten from
+    its kept vectors (deleted + modified files filtered out) plus the new ones; untouched
+    shards are not read at all. Returns (shards, report) with every shard freshly opened.
+    The exception: when the local model knows too little of the new chunks' vocabulary
+    (LOCAL_EMBEDDING_MIN_COVERAGE), it is refitted on the whole corpus and every shard re-embedded.
+
+    With the local backend, `embeddings` is never loaded or refitted in place (it may be
+    serving queries against the live shards). Any other model is loaded into, or fitted on, a
+    clone. report["query_embeddings"] is the instance the new shards were built with; it
+    goes live together with them (ResearcherAgent.publish).
+    """
+    policies_dir = policies_dir or Config.POLICIES_DIR
+    db_path = db_path or Config.VECTOR_DB_PATH
+
+    manifest = load_manifest(db_path)
+    previous_embedder = (manifest or {}).get("embedder")
+    local = hasattr(embeddings, "fit")
+    ingest = embeddings # What embeds this sync's vectors
+    reset = manifest is None or manifest.get("layout") != MANIFEST_LAYOUT or manifest.get("index") != index_spec()
+    if not reset and local and embeddings.signature != previous_embedder and manifest["files"]:
+        # Keep embedding in the space these shards were built in (loaded privately, see above)
+        ingest = embeddings.clone()
+        if not ingest.load(db_path, previous_embedder):
+            print("⚠️ Local embedding model of the current index is missing -> full rebuild")
+            reset = True
+    if reset:
+        # Legacy index (pickled docstore / single global index) cannot be diffed, and vectors from another
+        # embedding model or index type cannot be mixed in -> start clean (the embedding cache keeps this cheap).
+        if os.path.exists(db_path):
+            shutil.rmtree(db_path)
+        manifest = {"layout": MANIFEST_LAYOUT, "index": index_spec(), "files": {}}
+        shards = {}
+    else:
+        for name in remove_stale_staging(os.path.join(db_path, SHARDS_DIR)):
+            print(f"🧹 Removed leftover shard staging dir {name} (interrupted sync)")
+        if shards is None:
+            shards = load_shards(db_path)
+
+    current = scan_policies(policies_dir)
+    report = diff_manifest(manifest, current)
+    files = manifest["files"]
+    touched = set()
+
+    # 1. Collect stale vector IDs (deleted + modified files) per region shard
+    stale_ids = set()
+    for file in report["removed"] + report["modified"]:
+        entry = files[file]
+        stale_ids.update(entry["chunk_ids"])
+        touched.add(entry["region"])
+    stale_count = len(stale_ids)
+    for file in report["removed"]:
+        del files[file]
+
+    # 2. Parse & embed only what changed, grouped by region
+    new_by_region = {}
+    new_count = 0
+    for file, region, chunks in parse_policies(report["added"] + report["modified"], policies_dir, workers):
+        ids = chunk_ids(file, current[file], len(chunks))
+        docs, doc_ids = new_by_region.setdefault(region, ([], []))
+        docs.extend(chunks)
+        doc_ids.extend(ids)
+        new_count += len(chunks)
+        files[file] = {"sha256": current[file], "region": region, "chunk_ids": ids}
+
+    # Embed every new chunk through one batched, rate-limit-aware stage
+    texts = [d.page_content for docs, _ in new_by_region.values() for d in docs]
+    kept_rows = {} # region -> shard.read_all(), read up front when every vector is rebuilt
+    refit = local and texts and not report["unchanged"] # Every vector is being (re)built anyway
+    if local and texts and not refit:
+        coverage = ingest.coverage(texts)
+        if coverage < Config.LOCAL_EMBEDDING_MIN_COVERAGE:
+            # New terms would embed near zero in the old space: refit on the whole corpus, re-embed every shard
+            print(f"🔤 Local model knows {coverage:.0%} of the new chunks' words -> refitting and re-embedding all shards")
+            refit = True
+            kept_rows = {region: shard.read_all() for region, shard in shards.items()}
+            touched.update(kept_rows)
+    if refit:
+        # Fit a fresh vectorizer on the corpus it is about to index. Its file is new (named by
+        # fingerprint); the live model's file stays until the manifest moves on.
+        corpus = texts + [text for _, ids, region_texts, _ in kept_rows.values()
+                          for cid, text in zip(ids, region_texts) if cid not in stale_ids]
+        ingest = embeddings.clone().fit(corpus)
+        ingest.save(db_path)
+    vectors, embed_stats = embed_in_batches(ingest, texts)
+    if texts:
+        print(f"⚡ Embedded {embed_stats['chunks']} chunks at {embed_stats['chunks_per_sec']} chunks/s "
+              f"({embed_stats['retries']} retries)")
+
+    new_rows = {} # region -> (vectors, ids, texts, metadatas)
+    offset = 0
+    for region, (docs, ids) in new_by_region.items():
+        if not docs:
+            continue
+        new_rows[region] = (vectors[offset:offset + len(docs)], ids,
+                            [d.page_content for d in docs], [d.metadata for d in docs])
+        offset += len(docs)
+        touched.add(region)
+
+    # 3. Rewrite touched shards (kept rows + new rows); a region with no files left loses its shard
+    live_regions = {f["region"] for f in files.values() if f["chunk_ids"]}
+    for region in touched:
+        path = shard_path(region, db_path)
+        if region not in live_regions:
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+        kept_vectors, kept_ids, kept_texts, kept_metas = [], [], [], []
+        if region in shards:
+            old_vectors, old_ids, old_texts, old_metas = kept_rows.get(region) or shards[region].read_all()
+            keep = [i for i, cid in enumerate(old_ids) if cid not in stale_ids]
+            if keep:
+                kept_ids = [old_ids[i] for i in keep]
+                kept_texts = [old_texts[i] for i in keep]
+                kept_metas = [old_metas[i] for i in keep]
+                if old_vectors is None or kept_rows:
+                    # PQ codes are lossy: take the originals back from the embedding cache.
+                    # After a local refit the old vectors are in the wrong space: re-embed them all.
+                    old_vectors, _ = embed_in_batches(ingest, kept_texts)
+                    kept_vectors = [np.asarray(old_vectors, dtype=np.float32)]
+                else:
+                    kept_vectors = [old_vectors[keep]]
+        add_vectors, add_ids, add_texts, add_metas = new_rows.get(region, ([], [], [], []))
+        if len(add_vectors):
+            kept_vectors.append(np.asarray(add_vectors, dtype=np.float32))
+        write_shard(path, np.vstack(kept_vectors), kept_ids + add_ids, kept_texts + add_texts, kept_metas + add_metas)
+    manifest["embedder"] = ingest.signature # Exact model (incl. fitted state) that produced the vectors
+    manifest["version"] = _manifest_version(files, {**manifest["index"], "embedder": manifest["embedder"]}) if files else "empty"
+    save_manifest(manifest, db_path)
+    if local:
+        # Processes still on the previous manifest may yet load its model lazily; older ones can go
+        ingest.prune(db_path, keep=(manifest["embedder"], previous_embedder))
+
+    report["chunks_embedded"] = new_count
+    report["chunks_removed"] = stale_count
+    report["total_chunks"] = sum(len(f["chunk_ids"]) for f in files.values())
+    report["regions"] = sorted(live_regions)
+    report["version"] = manifest["version"]
+    report["embedding"] = embed_stats
+    report["index"] = manifest["index"]
+    report["embedder"] = manifest["embedder"]
+    report["query_embeddings"] = ingest
+    # Shards the caller already holds stay valid (they map the replaced files); hand back fresh ones
+    return load_shards(db_path), report
+
+
+def format_report(report):
+    return (
+        f"+{len(report['added'])} added, ~{len(report['modified'])} modified, "
+        f"-{len(report['removed'])} removed, {len(report['unchanged'])} unchanged; "
+        f"{report['chunks_embedded']} chunks embedded, {report['total_chunks']} total"
+    )
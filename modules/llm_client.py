@@ -0,0 +1,258 @@
+# modules/llm_client.py
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import numpy as np
+from langchain_openai import ChatOpenAI
+from config import Config
+from modules.embeddings import is_transient_error, retry_after_seconds
+
+
+class LLMTimeoutError(TimeoutError):
+    """The call's deadline passed (waiting for a slot, in flight, or between retries)."""
+
+
+class LLMClient:
+    """
+    The single way the app talks to the chat model (HRAgent, ResearcherAgent, PolicyWatchdog).
+
+    Every call gets:
+      - a deadline (timeout seconds, default Config.LLM_TIMEOUT_SECONDS) covering the
+        wait for a slot, the request itself, and any retries;
+      - jittered exponential retries on transient errors (429 / 5xx / timeouts / dropped
+        connections), honouring Retry-After;
+      - a slot in a process-wide semaphore (Config.LLM_MAX_IN_FLIGHT) shared by every session,
+        so a slow upstream queues callers up to their deadline instead of piling on requests;
+      - a metrics record (latency, attempts, tokens), see stats().
+
+    invoke / ainvoke / stream / batch mirror the LangChain chat model methods.
+    """
+
+    def __init__(self, llm=None, max_in_flight=None, timeout=None, max_retries=None):
+        self.llm = llm or ChatOpenAI(
+            model=Config.MODEL_NAME,
+            temperature=0,
+            api_key=Config.OPENAI_API_KEY,
+            base_url=Config.OPENAI_BASE_URL,
+            max_retries=0, # Retries happen here, inside the call's deadline
+        )
+        self.max_in_flight = max_in_flight or Config.LLM_MAX_IN_FLIGHT
+        self.timeout = timeout or Config.LLM_TIMEOUT_SECONDS
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        # Sync requests run here so the caller can walk away at its deadline; httpx timeouts
+        # apply per phase (connect / read), so on their own they can overrun the budget
+        self._requests = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="llm-request")
+        self._metrics_lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = deque(maxlen=1000) # Recent per-call records
+        self.totals = {"calls": 0, "errors": 0, "timeouts": 0, "retries": 0,
+                       "prompt_tokens": 0, "completion_tokens": 0}
+
+    # --- Deadlines & slots ---
+    def _deadline(self, timeout):
+        return time.monotonic() + (timeout or self.timeout)
+
+    @staticmethod
+    def _remaining(deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMTimeoutError("LLM deadline exceeded")
+        return remaining
+
+    def _acquire(self, deadline):
+        if not self._slots.acquire(timeout=self._remaining(deadline)):
+            raise LLMTimeoutError("Timed out waiting for an LLM slot")
+        self._enter()
+
+    async def _aacquire(self, deadline):
+        # Polling keeps a cancelled caller from leaking a slot (no thread left blocked in acquire)
+        while not self._slots.acquire(blocking=False):
+            self._remaining(deadline)
+            await asyncio.sleep(0.005)
+        self._enter()
+
+    def _enter(self):
+        with self._metrics_lock:
+            self.in_flight += 1
+
+    def _release(self):
+        with self._metrics_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _backoff(self, exc, attempt, deadline):
+        """Seconds to wait before the next attempt; raises when no retry fits the deadline."""
+        if not is_transient_error(exc) or attempt >= self.max_retries:
+            raise exc
+        delay = retry_after_seconds(exc) or min(8.0, 0.25 * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if time.monotonic() + delay >= deadline:
+            raise LLMTimeoutError(f"LLM deadline exceeded after {attempt + 1} attempt(s): {exc}") from exc
+        return delay
+
+    # --- Metrics ---
+    def _record(self, label, start, attempts, response=None, error=None):
+        usage = getattr(response, "usage_metadata", None) or {}
+        record = {
+            "label": label,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "attempts": attempts,
+            "prompt_tokens": usage.get("input_tokens", 0),
+            "completion_tokens": usage.get("output_tokens", 0),
+            "error": type(error).__name__ if error else None,
+        }
+        with self._metrics_lock:
+            self.calls.append(record)
+            self.totals["calls"] += 1
+            self.totals["retries"] += attempts - 1
+            self.totals["prompt_tokens"] += record["prompt_tokens"]
+            self.totals["completion_tokens"] += record["completion_tokens"]
+            if error is not None:
+                self.totals["errors"] += 1
+                self.totals["timeouts"] += isinstance(error, TimeoutError) or "Timeout" in record["error"]
+
+    def stats(self, label=None):
+        """Lifetime totals plus latency percentiles over recent calls (optionally for one label)."""
+        with self._metrics_lock:
+            recent = [c for c in self.calls if label is None or c["label"] == label]
+            totals = dict(self.totals)
+            in_flight = self.in_flight
+        latencies = [c["latency_ms"] for c in recent if c["error"] is None]
+        percentile = lambda q: round(float(np.percentile(latencies, q)), 1) if latencies else None
+        return {**totals, "in_flight": in_flight, "recent": len(recent),
+                "p50_ms": percentile(50), "p95_ms": percentile(95), "p99_ms": percentile(99)}
+
+    # --- Calls ---
+    def invoke(self, messages, timeout=None, label="invoke"):
+        deadline = self._deadline(timeout)
+        start, attempt = time.perf_counter(), 0
+        while True:
+            try:
+                self._acquire(deadline)
+                try:
+                    future = self._requests.submit(self.llm.invoke, messages, timeout=self._remaining(deadline))
+                except BaseException:
+                    self._release()
+                    raise
+                # The slot is only freed once the request really ends, even if we stop waiting
+                future.add_done_callback(lambda _: self._release())
+                try:
+                    response = future.result(timeout=self._remaining(deadline))
+                except FutureTimeout:
+                    raise LLMTimeoutError("LLM deadline exceeded while waiting for the response") from None
+                self._record(label, start, attempt + 1, response)
+                return response
+            except Exception as e:
+                try:
+                    delay = self._backoff(e, attempt, deadline)
+                except Exception as final:
+                    self._record(label, start, attempt + 1, error=final)
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    async def ainvoke(self, messages, timeout=None, label="invoke"):
+        deadline = self._deadline(timeout)
+        start, attempt = time.perf_counter(), 0
+        while True:
+            try:
+                await self._aacquire(deadline)
+                try:
+                    remaining = self._remaining(deadline)
+                    try:
+                        response = await asyncio.wait_for(self.llm.ainvoke(messages, timeout=remaining), remaining)
+                    except asyncio.TimeoutError:
+                        raise LLMTimeoutError("LLM deadline exceeded while waiting for the response") from None
+                finally:
+                    self._release()
+                self._record(label, start, attempt + 1, response)
+                return response
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                try:
+                    delay = self._backoff(e, attempt, deadline)
+                except Exception as final:
+                    self._record(label, start, attempt + 1, error=final)
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def stream(self, messages, timeout=None, label="stream"):
+        """
+        Yields chunks like ChatOpenAI.stream(). Only the wait for the first token is retried;
+        once text has reached the user a failure is raised rather than replayed. The deadline
+        covers the whole stream, not just the first token.
+        """
+        deadline = self._deadline(timeout)
+        start, attempt = time.perf_counter(), 0
+        while True:
+            started = False
+            try:
+                self._acquire(deadline)
+                chunks = self.llm.stream(messages, timeout=self._remaining(deadline))
+                try:
+                    for chunk in chunks:
+                        if time.monotonic() >= deadline:
+                            raise LLMTimeoutError("LLM deadline exceeded while streaming the response")
+                        started = True
+                        yield chunk
+                finally:
+                    chunks.close() # Drops the HTTP stream when we stop early (deadline, consumer gone)
+                    self._release()
+                self._record(label, start, attempt + 1)
+                return
+            except Exception as e:
+                try:
+                    if started:
+                        raise
+                    delay = self._backoff(e, attempt, deadline)
+                except Exception as final:
+                    self._record(label, start, attempt + 1, error=final)
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    def batch(self, batch_messages, timeout=None, label="batch", return_exceptions=True):
+        """
+        Runs many prompts concurrently (bounded by the shared semaphore), all under one deadline.
+        Results keep input order; failures are returned as exceptions unless return_exceptions=False.
+        """
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+
+        def run_one(messages):
+            try:
+                return self.invoke(messages, timeout=max(deadline - time.monotonic(), 1e-3), label=label)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        if not batch_messages:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batch_messages))) as pool:
+            return list(pool.map(run_one, batch_messages))
+
+    async def abatch(self, batch_messages, timeout=None, label="batch", return_exceptions=True):
+        timeout = timeout or self.timeout
+        return await asyncio.gather(
+            *(self.ainvoke(m, timeout=timeout, label=label) for m in batch_messages),
+            return_exceptions=return_exceptions,
+        )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Process-wide client: one in-flight budget and one metrics stream for every session."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
@@ -0,0 +1,249 @@
+# modules/local_embeddings.py
+"""
+Offline embedding backend (Config.EMBEDDING_BACKEND = "local"): hashed word + bigram
+TF-IDF projected onto the top singular vectors of the policy corpus (LSA). Pure NumPy,
+no downloads, no network. Each fitted model is saved next to the shards it embedded as
+<VECTOR_DB_PATH>/local_embedder-<fingerprint>.npz; the manifest's embedder signature names
+the one the live shards were built with, so a refit never overwrites the model in use.
+"""
+import os
+import re
+import zlib
+import hashlib
+import threading
+from functools import lru_cache
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config import Config
+
+MODEL_FILE = "local_embedder-{fingerprint}.npz"
+MODEL_FILE_RE = re.compile(r"^local_embedder-[0-9a-f]+\.npz$")
+SIGNATURE_PREFIX = "local-tfidf-svd@"
+HASH_BUCKETS = 1 << 22 # Token hash space; only buckets seen while fitting are kept
+
+
+@lru_cache(maxsize=1 << 20)
+def _bucket(token):
+    return zlib.crc32(token.encode("utf-8")) % HASH_BUCKETS # Stable across processes, unlike hash()
+
+
+def _tokens(text):
+    words = re.findall(r"\w+", text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _csr(texts, features):
+    """
+    Sub-linear TF matrix of `texts` over the known `features` (sorted bucket ids) as CSR arrays
+    (indptr, indices, data). Unknown buckets are dropped: they carry no weight in the fitted space.
+    """
+    indptr, indices, data = [0], [], []
+    for text in texts:
+        buckets = np.fromiter((_bucket(t) for t in _tokens(text)), dtype=np.int64)
+        if features is not None and len(buckets):
+            cols = np.minimum(np.searchsorted(features, buckets), max(len(features) - 1, 0))
+            buckets = cols[features[cols] == buckets] if len(features) else buckets[:0]
+        cols, counts = np.unique(buckets, return_counts=True)
+        indices.append(cols)
+        data.append(1.0 + np.log(counts))
+        indptr.append(indptr[-1] + len(cols))
+    return (np.asarray(indptr, dtype=np.int64), np.concatenate(indices or [np.empty(0, np.int64)]),
+            np.concatenate(data or [np.empty(0)]).astype(np.float32))
+
+
+def _spmm(indptr, indices, data, dense, block=4096):
+    """CSR (n x F) @ dense (F x l) without SciPy: row blocks of products summed with reduceat."""
+    n = len(indptr) - 1
+    out = np.zeros((n, dense.shape[1]), dtype=np.float32)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        lo, hi = indptr[start], indptr[stop]
+        if lo == hi:
+            continue
+        products = data[lo:hi, None] * dense[indices[lo:hi]]
+        row_starts = indptr[start:stop] - lo
+        nonempty = indptr[start + 1:stop + 1] > indptr[start:stop]
+        out[start:stop][nonempty] = np.add.reduceat(products, row_starts[nonempty], axis=0)
+    return out
+
+
+def _transpose(indptr, indices, data, n_cols):
+    """CSR -> CSR of the transpose (i.e. CSC of the original)."""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    t_indptr = np.zeros(n_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=n_cols), out=t_indptr[1:])
+    return t_indptr, rows[order], data[order]
+
+
+def _orthonormalize(y):
+    """Orthonormal basis of y's columns by CholeskyQR2: two small l x l factorizations instead of a tall QR."""
+    q = y.astype(np.float64)
+    for _ in range(2):
+        gram = q.T @ q
+        gram[np.diag_indices_from(gram)] += 1e-10 * np.trace(gram) # Keep rank-deficient samples factorable
+        q = q @ np.linalg.inv(np.linalg.cholesky(gram)).T # Y = Q L^T  =>  Q = Y L^-T
+    return q.astype(np.float32)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    LangChain Embeddings over a fitted hashed TF-IDF + SVD model. fit() learns the vocabulary
+    (the LOCAL_EMBEDDING_MAX_FEATURES most frequent buckets), IDF weights and a
+    LOCAL_EMBEDDING_DIM projection from a sample of the corpus. Corpora too small for a
+    full-rank SVD get a seeded random projection of the TF-IDF vectors instead.
+    """
+
+    def __init__(self, db_path=None, dim=None):
+        self.db_path = db_path or Config.VECTOR_DB_PATH
+        self.dim = dim or Config.LOCAL_EMBEDDING_DIM
+        self.features = self.idf = self.components = None
+        self.fingerprint = None
+        self._lock = threading.Lock()
+
+    @property
+    def signature(self):
+        """Exact identity of the vectors this object produces (backend, size and fitted model)."""
+        return f"{SIGNATURE_PREFIX}{self.dim}:{self.fingerprint or 'unfitted'}"
+
+    @staticmethod
+    def fingerprint_of(signature):
+        """Fingerprint part of a local signature, or None (other backend / unfitted)."""
+        if not signature or not signature.startswith(SIGNATURE_PREFIX) or ":" not in signature:
+            return None
+        fingerprint = signature.rsplit(":", 1)[1]
+        return None if fingerprint == "unfitted" else fingerprint
+
+    def clone(self):
+        """Unfitted twin with the same settings: rebuilds load / fit this, never the instance serving queries."""
+        return LocalEmbeddings(self.db_path, self.dim)
+
+    def _path(self, fingerprint, db_path=None):
+        return os.path.join(db_path or self.db_path, MODEL_FILE.format(fingerprint=fingerprint))
+
+    def load(self, db_path=None, signature=None):
+        """Loads the fitted model named by `signature` (a manifest's embedder) from db_path. False if absent."""
+        fingerprint = self.fingerprint_of(signature)
+        if fingerprint is None:
+            return False
+        path = self._path(fingerprint, db_path)
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as model:
+            features, idf, components = model["features"], model["idf"], model["components"]
+        with self._lock:
+            self.features, self.idf, self.components = features, idf, components
+            self.dim = components.shape[1]
+            self.fingerprint = self._fingerprint(features, idf, components)
+        return True
+
+    @staticmethod
+    def _fingerprint(*arrays):
+        h = hashlib.sha256()
+        for array in arrays:
+            h.update(np.ascontiguousarray(array).tobytes())
+        return h.hexdigest()[:12]
+
+    def fit(self, texts):
+        """Learns vocabulary, IDF and projection from `texts` (in memory; save() writes the model file)."""
+        texts = list(texts)
+        if len(texts) > Config.LOCAL_EMBEDDING_FIT_SAMPLE:
+            rows = np.random.default_rng(0).choice(len(texts), Config.LOCAL_EMBEDDING_FIT_SAMPLE, replace=False)
+            texts = [texts[i] for i in np.sort(rows)]
+
+        indptr, buckets, data = _csr(texts, None)
+        # Vocabulary: most frequent buckets by document frequency
+        uniq, df = np.unique(buckets, return_counts=True)
+        if len(uniq) > Config.LOCAL_EMBEDDING_MAX_FEATURES:
+            keep = np.sort(np.argsort(-df, kind="stable")[:Config.LOCAL_EMBEDDING_MAX_FEATURES])
+            uniq, df = uniq[keep], df[keep]
+        features = uniq
+        idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+
+        indptr, indices, data = _csr(texts, features)
+        data = data * idf[indices]
+        rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        row_norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=len(texts)))
+        data = (data / row_norms[rows]).astype(np.float32)
+
+        components = self._svd(indptr, indices, data, len(features))
+        with self._lock:
+            self.features, self.idf, self.components = features, idf, components
+            self.fingerprint = self._fingerprint(features, idf, components)
+        return self
+
+    def _svd(self, indptr, indices, data, n_features, oversample=10, power_iters=2):
+        """Top-`dim` right singular vectors (F x dim) via randomized SVD (Halko et al.)."""
+        rng = np.random.default_rng(0)
+        n_docs = len(indptr) - 1
+        if min(n_docs, n_features) < 2 * self.dim:
+            # Too few docs/terms to span `dim` directions: JL random projection keeps TF-IDF cosines instead
+            return (rng.standard_normal((n_features, self.dim)) / np.sqrt(self.dim)).astype(np.float32)
+        t_indptr, t_indices, t_data = _transpose(indptr, indices, data, n_features)
+        width = self.dim + oversample
+        q = _orthonormalize(_spmm(indptr, indices, data, rng.standard_normal((n_features, width)).astype(np.float32)))
+        for _ in range(power_iters):
+            z = _orthonormalize(_spmm(t_indptr, t_indices, t_data, q))
+            q = _orthonormalize(_spmm(indptr, indices, data, z))
+        b_t = _spmm(t_indptr, t_indices, t_data, q) # (Q^T X)^T: F x width
+        u, _, _ = np.linalg.svd(b_t, full_matrices=False)
+        return np.ascontiguousarray(u[:, :self.dim], dtype=np.float32)
+
+    def save(self, db_path=None):
+        """Writes the fitted model atomically to local_embedder-<fingerprint>.npz under db_path."""
+        db_path = db_path or self.db_path
+        with self._lock:
+            features, idf, components, fingerprint = self.features, self.idf, self.components, self.fingerprint
+        os.makedirs(db_path, exist_ok=True)
+        path = self._path(fingerprint, db_path)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as f: # A file object: np.savez would otherwise append ".npz"
+            np.savez(f, features=features, idf=idf, components=components)
+        os.replace(tmp_path, path)
+        return path
+
+    def prune(self, db_path=None, keep=()):
+        """Deletes model files not named by a signature in `keep` (e.g. the live and previous manifests)."""
+        db_path = db_path or self.db_path
+        keep_files = {MODEL_FILE.format(fingerprint=fp) for fp in map(self.fingerprint_of, keep) if fp}
+        for name in os.listdir(db_path) if os.path.isdir(db_path) else []:
+            if MODEL_FILE_RE.match(name) and name not in keep_files:
+                os.remove(os.path.join(db_path, name))
+
+    def _ensure_model(self):
+        if self.components is not None:
+            return
+        from modules.knowledge_base import load_manifest # Deferred: knowledge_base imports the embeddings layer
+        signature = (load_manifest(self.db_path) or {}).get("embedder")
+        if not self.load(signature=signature):
+            raise RuntimeError(f"Local embedding model for {self.db_path} not found (run build_knowledge_base.py)")
+
+    def coverage(self, texts):
+        """
+        Share of the word occurrences in `texts` the fitted vocabulary knows (1.0 if there are none).
+        Unknown words carry no weight, so text the model mostly cannot see embeds near zero.
+        """
+        self._ensure_model()
+        with self._lock:
+            features = self.features
+        buckets = np.fromiter((_bucket(w) for text in texts for w in re.findall(r"\w+", text.lower())), dtype=np.int64)
+        if not len(buckets) or not len(features):
+            return 1.0 if not len(buckets) else 0.0
+        cols = np.minimum(np.searchsorted(features, buckets), len(features) - 1)
+        return float(np.mean(features[cols] == buckets))
+
+    def embed_documents(self, texts):
+        self._ensure_model()
+        with self._lock:
+            features, idf, components = self.features, self.idf, self.components
+        indptr, indices, data = _csr(texts, features)
+        vectors = _normalize(_spmm(indptr, indices, data * idf[indices], components))
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
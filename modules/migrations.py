@@ -0,0 +1,310 @@
+# modules/migrations.py
+"""
+Versioned schema migrations for data/hr_system.db.
+
+Each migration runs once, in its own transaction, and is recorded in
+schema_migrations. Append new migrations to MIGRATIONS; never edit one that
+has shipped. Existing databases are upgraded in place, and whenever that
+changes the schema the HOT_QUERIES plans are re-checked (QueryPlanError on a
+regression), so a migration that drops an index cannot ship unnoticed:
+
+    python -m modules.migrations            # apply pending migrations
+    python -m modules.migrations --plans    # EXPLAIN the hot queries, fail on full scans / temp B-trees
+"""
+import sys
+import sqlite3
+import threading
+from config import Config
+
+MIGRATIONS = [
+    (1, "baseline schema (users, tickets, chat_history)", [
+        '''CREATE TABLE IF NOT EXISTS users
+           (id TEXT PRIMARY KEY, name TEXT, role TEXT, region TEXT, language TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS tickets
+           (ticket_id INTEGER PRIMARY KEY AUTOINCREMENT, emp_id TEXT,
+            question TEXT, score REAL, assigned_to TEXT, status TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS chat_history
+           (msg_id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, role TEXT, content TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+    ]),
+    (2, "classifier_log for the fast-path classifier", [
+        '''CREATE TABLE IF NOT EXISTS classifier_log
+           (log_id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT, intent TEXT, type TEXT,
+            tone INTEGER, decided_by TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+    ]),
+    (3, "indexes for chat history, HR queue and dashboard counts", [
+        "CREATE INDEX IF NOT EXISTS idx_chat_history_user_msg ON chat_history (user_id, msg_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_assignee_status ON tickets (assigned_to, status)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status_score ON tickets (status, score)",
+    ]),
+    (4, "created/updated timestamps on tickets", [
+        # ALTER TABLE cannot add a CURRENT_TIMESTAMP default, so backfill and set on write instead
+        "ALTER TABLE tickets ADD COLUMN created_at DATETIME",
+        "ALTER TABLE tickets ADD COLUMN updated_at DATETIME",
+        "UPDATE tickets SET created_at=CURRENT_TIMESTAMP, updated_at=CURRENT_TIMESTAMP WHERE created_at IS NULL",
+    ]),
+    (5, "covering indexes for the paged HR dashboard", [
+        # (assigned_to, status, score) answers the grouped metrics from the index alone and
+        # supersedes (assigned_to, status); (assigned_to, ticket_id) serves "newest first" pages
+        "CREATE INDEX IF NOT EXISTS idx_tickets_assignee_status_score ON tickets (assigned_to, status, score)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_assignee_id ON tickets (assigned_to, ticket_id)",
+        "DROP INDEX IF EXISTS idx_tickets_assignee_status",
+    ]),
+    (6, "assignment_state for persistent round-robin", [
+        '''CREATE TABLE IF NOT EXISTS assignment_state
+           (key TEXT PRIMARY KEY, last_assigned TEXT, updated_at DATETIME)''',
+        # Open-load counters per specialist are a grouped count over unresolved tickets
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status_assignee ON tickets (status, assigned_to)",
+    ]),
+    (7, "ticket_drafts for bulk AI pre-drafting", [
+        '''CREATE TABLE IF NOT EXISTS ticket_drafts
+           (ticket_id INTEGER, kb_version TEXT, draft TEXT, latency_ms REAL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (ticket_id, kb_version))''',
+    ]),
+    (8, "watchdog_results: memoized impact analyses and legal emails", [
+        '''CREATE TABLE IF NOT EXISTS watchdog_results
+           (result_id INTEGER PRIMARY KEY AUTOINCREMENT, cache_key TEXT, kind TEXT, title TEXT,
+            content_hash TEXT, kb_version TEXT, model TEXT, result TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        # Latest result per key (a refresh appends a row, so older ones stay as history)
+        "CREATE INDEX IF NOT EXISTS idx_watchdog_results_key ON watchdog_results (cache_key, result_id)",
+        "CREATE INDEX IF NOT EXISTS idx_watchdog_results_kind ON watchdog_results (kind, result_id)",
+    ]),
+    (9, "regulation feed: per-source fetch state and the analysis queue", [
+        '''CREATE TABLE IF NOT EXISTS regulation_sources
+           (source TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, mtime REAL, size INTEGER,
+            content_hash TEXT, title TEXT, checked_at DATETIME, changed_at DATETIME)''',
+        '''CREATE TABLE IF NOT EXISTS regulation_queue
+           (item_id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT, region TEXT, title TEXT, body TEXT,
+            content_hash TEXT, status TEXT DEFAULT 'pending', detected_at DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        "CREATE INDEX IF NOT EXISTS idx_regulation_queue_status ON regulation_queue (status, item_id)",
+    ]),
+    (10, "payroll: base rates + pending overtime, and bulk arrears runs", [
+        '''CREATE TABLE IF NOT EXISTS payroll
+           (emp_id TEXT PRIMARY KEY, region TEXT, currency TEXT, base_hourly REAL, pending_ot_hours REAL,
+            ot_multiplier REAL DEFAULT 1.5, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        # (region, rowid) order: the arrears engine pages through a region in rowid chunks
+        "CREATE INDEX IF NOT EXISTS idx_payroll_region ON payroll (region)",
+        '''CREATE TABLE IF NOT EXISTS payroll_runs
+           (run_id INTEGER PRIMARY KEY AUTOINCREMENT, region TEXT, new_multiplier REAL, regulation TEXT,
+            status TEXT DEFAULT 'running', employees INTEGER, affected INTEGER, totals TEXT, seconds REAL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS payroll_arrears
+           (run_id INTEGER, emp_id TEXT, region TEXT, currency TEXT, hours REAL, old_multiplier REAL,
+            new_multiplier REAL, arrears REAL, PRIMARY KEY (run_id, emp_id)) WITHOUT ROWID''',
+    ]),
+    (11, "ticket_counts for constant-time dashboard counters; keyset-paging indexes for every queue sort", [
+        # Tickets per (assignee, status, score). Scores come from a handful of scoring rules, so the
+        # table grows with specialists, not tickets. assigned_to='*' rows total every assignee
+        # (the admin view); a NULL assignee / status / score is counted as '' / '' / 0.
+        '''CREATE TABLE IF NOT EXISTS ticket_counts
+           (assigned_to TEXT NOT NULL, status TEXT NOT NULL, score REAL NOT NULL, tickets INTEGER NOT NULL,
+            PRIMARY KEY (assigned_to, status, score)) WITHOUT ROWID''',
+        "CREATE INDEX IF NOT EXISTS idx_ticket_counts_status ON ticket_counts (status, assigned_to, score, tickets)",
+        '''INSERT INTO ticket_counts (assigned_to, status, score, tickets)
+           SELECT IFNULL(assigned_to, ''), IFNULL(status, ''), IFNULL(score, 0), COUNT(*) FROM tickets GROUP BY 1, 2, 3''',
+        '''INSERT INTO ticket_counts (assigned_to, status, score, tickets)
+           SELECT '*', status, score, SUM(tickets) FROM ticket_counts GROUP BY status, score''',
+        # Triggers keep the counters current inside the writing transaction, whoever the writer is
+        '''CREATE TRIGGER IF NOT EXISTS trg_ticket_counts_insert AFTER INSERT ON tickets BEGIN
+               INSERT INTO ticket_counts VALUES (IFNULL(NEW.assigned_to, ''), IFNULL(NEW.status, ''), IFNULL(NEW.score, 0), 1)
+                   ON CONFLICT DO UPDATE SET tickets = tickets + 1;
+               INSERT INTO ticket_counts VALUES ('*', IFNULL(NEW.status, ''), IFNULL(NEW.score, 0), 1)
+                   ON CONFLICT DO UPDATE SET tickets = tickets + 1;
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_ticket_counts_delete AFTER DELETE ON tickets BEGIN
+               UPDATE ticket_counts SET tickets = tickets - 1
+                   WHERE assigned_to IN (IFNULL(OLD.assigned_to, ''), '*')
+                   AND status = IFNULL(OLD.status, '') AND score = IFNULL(OLD.score, 0);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_ticket_counts_update AFTER UPDATE OF assigned_to, status, score ON tickets
+           WHEN OLD.assigned_to IS NOT NEW.assigned_to OR OLD.status IS NOT NEW.status OR OLD.score IS NOT NEW.score
+           BEGIN
+               UPDATE ticket_counts SET tickets = tickets - 1
+                   WHERE assigned_to IN (IFNULL(OLD.assigned_to, ''), '*')
+                   AND status = IFNULL(OLD.status, '') AND score = IFNULL(OLD.score, 0);
+               INSERT INTO ticket_counts VALUES (IFNULL(NEW.assigned_to, ''), IFNULL(NEW.status, ''), IFNULL(NEW.score, 0), 1)
+                   ON CONFLICT DO UPDATE SET tickets = tickets + 1;
+               INSERT INTO ticket_counts VALUES ('*', IFNULL(NEW.status, ''), IFNULL(NEW.score, 0), 1)
+                   ON CONFLICT DO UPDATE SET tickets = tickets + 1;
+           END''',
+        # Keyset pages: each (filter, sort) pair walks one index from its cursor, with no sort step.
+        # (assigned_to, status, score, ticket_id) supersedes migration 5's (assigned_to, status, score)
+        "CREATE INDEX IF NOT EXISTS idx_tickets_assignee_status_risk ON tickets (assigned_to, status, score, ticket_id)",
+        "DROP INDEX IF EXISTS idx_tickets_assignee_status_score",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_assignee_risk ON tickets (assigned_to, score, ticket_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_risk ON tickets (score, ticket_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status_id ON tickets (status, ticket_id)",
+    ]),
+]
+
+# Queries the UI runs on every rerun; none of them may fall back to a full table scan or sort
+# (or group) through a temporary B-tree, i.e. do work that grows with the table.
+_TICKET_COLUMNS = "ticket_id, emp_id, question, score, assigned_to, status, created_at, updated_at"
+HOT_QUERIES = {
+    "chat history": ("SELECT role, content FROM chat_history WHERE user_id=? ORDER BY msg_id", ("EMP001",)),
+    "chat history page": ("SELECT msg_id, role, content FROM chat_history WHERE user_id=? AND msg_id<? "
+                          "ORDER BY msg_id DESC LIMIT ?", ("EMP001", 1000, 50)),
+    # Keyset-paged queue: (assignee | admin) x (all | one status) x (newest | oldest | risk), as get_tickets_page builds them
+    "HR queue page": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE assigned_to=? AND ticket_id<? "
+                      "ORDER BY ticket_id DESC LIMIT ?", ("HR001", 2 ** 63 - 1, 50)),
+    "HR queue page oldest": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE assigned_to=? AND ticket_id>? "
+                             "ORDER BY ticket_id ASC LIMIT ?", ("HR001", 0, 50)),
+    "HR queue page by status": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE assigned_to=? AND status=? AND ticket_id<? "
+                                "ORDER BY ticket_id DESC LIMIT ?", ("HR001", "Open", 2 ** 63 - 1, 50)),
+    # "risk" pages finish the cursor's score bucket, then continue below it (see get_tickets_page)
+    "HR queue page by risk": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE assigned_to=? AND score<? "
+                              "ORDER BY score DESC, ticket_id DESC LIMIT ?", ("HR001", 9.0, 50)),
+    "HR queue page by risk, cursor bucket": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE assigned_to=? AND score=? "
+                                             "AND ticket_id<? ORDER BY score DESC, ticket_id DESC LIMIT ?",
+                                             ("HR001", 3.5, 1000, 50)),
+    "HR queue page by status and risk": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE assigned_to=? AND status=? "
+                                         "AND score>=? AND score<? ORDER BY score DESC, ticket_id DESC LIMIT ?",
+                                         ("HR001", "Open", 3.0, 9.0, 50)),
+    "HR queue page by status and risk, cursor bucket": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE assigned_to=? "
+                                                        "AND status=? AND score=? AND ticket_id<? "
+                                                        "ORDER BY score DESC, ticket_id DESC LIMIT ?",
+                                                        ("HR001", "Open", 3.5, 1000, 50)),
+    "admin queue page": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE ticket_id<? ORDER BY ticket_id DESC LIMIT ?",
+                         (2 ** 63 - 1, 50)),
+    "admin queue page oldest": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE ticket_id>? ORDER BY ticket_id ASC LIMIT ?",
+                                (0, 50)),
+    "admin queue page by status": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE status=? AND ticket_id<? "
+                                   "ORDER BY ticket_id DESC LIMIT ?", ("Open", 2 ** 63 - 1, 50)),
+    "admin queue page by risk": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE score<? "
+                                 "ORDER BY score DESC, ticket_id DESC LIMIT ?", (9.0, 50)),
+    "admin queue page by risk, cursor bucket": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE score=? AND ticket_id<? "
+                                                "ORDER BY score DESC, ticket_id DESC LIMIT ?", (3.5, 1000, 50)),
+    "admin queue page by status and risk": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE status=? AND score<? "
+                                            "ORDER BY score DESC, ticket_id DESC LIMIT ?", ("Open", 9.0, 50)),
+    "admin queue page by status and risk, cursor bucket": (f"SELECT {_TICKET_COLUMNS} FROM tickets WHERE status=? "
+                                                           "AND score=? AND ticket_id<? "
+                                                           "ORDER BY score DESC, ticket_id DESC LIMIT ?",
+                                                           ("Open", 3.5, 1000, 50)),
+    # Counters come from ticket_counts ('*' = every assignee), never from COUNT(*) over tickets
+    "HR metrics": ("SELECT status, SUM(tickets), SUM(CASE WHEN score>=? THEN tickets ELSE 0 END) FROM ticket_counts "
+                   "WHERE assigned_to=? GROUP BY status HAVING SUM(tickets)>0", (3.0, "HR001")),
+    "admin metrics": ("SELECT status, SUM(tickets), SUM(CASE WHEN score>=? THEN tickets ELSE 0 END) FROM ticket_counts "
+                      "WHERE assigned_to=? GROUP BY status HAVING SUM(tickets)>0", (3.0, "*")),
+    "queue count": ("SELECT COALESCE(SUM(tickets), 0) FROM ticket_counts WHERE assigned_to=? AND status=? AND score>=?",
+                    ("*", "Open", 3.0)),
+    "open load per specialist": ("SELECT assigned_to, tickets FROM ticket_counts WHERE status IN ('Open', 'In Progress')", ()),
+    "ticket draft": ("SELECT draft, latency_ms, created_at FROM ticket_drafts WHERE ticket_id=? AND kb_version=?",
+                     (1, "v1")),
+    "watchdog result": ("SELECT result, created_at FROM watchdog_results WHERE cache_key=? "
+                        "ORDER BY result_id DESC LIMIT 1", ("k",)),
+    "watchdog history": ("SELECT result_id, title, kb_version, model, created_at, result FROM watchdog_results "
+                         "WHERE kind=? ORDER BY result_id DESC LIMIT ?", ("analysis", 20)),
+    "pending regulations": ("SELECT item_id, source, region, title, body, content_hash, detected_at FROM regulation_queue "
+                            "WHERE status=? ORDER BY item_id LIMIT ?", ("pending", 10)),
+    "employee payroll": ("SELECT base_hourly, currency, pending_ot_hours, ot_multiplier FROM payroll WHERE emp_id=?",
+                         ("EMP001",)),
+    "payroll chunk": ("SELECT rowid, emp_id, region, currency, base_hourly, pending_ot_hours, ot_multiplier "
+                      "FROM payroll WHERE region=? AND rowid>? ORDER BY rowid LIMIT ?", ("India", 0, 50000)),
+}
+
+
+
+class QueryPlanError(RuntimeError):
+    """A hot query's plan regressed to a full table scan or temporary B-tree after a migration."""
+
+
+_applied = set() # DB paths already migrated by this process
+_lock = threading.Lock()
+
+
+def current_version(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_migrations
+                    (version INTEGER PRIMARY KEY, description TEXT,
+                     applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+
+def migrate(db_path=None, verbose=True):
+    """
+    Applies every pending migration in order and returns the resulting schema version.
+    Safe to run from several processes at once; raises QueryPlanError if the new schema
+    leaves a hot query without an index.
+    """
+    db_path = db_path or Config.DB_PATH
+    conn = sqlite3.connect(db_path, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    applied = False
+    try:
+        version = current_version(conn)
+        for number, description, statements in MIGRATIONS:
+            if number <= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process (a second Streamlit worker, setup_env.py) may have applied it
+                # while we waited for the write lock; the version read above is stale by then
+                version = current_version(conn)
+                if number <= version:
+                    conn.execute("COMMIT")
+                    continue
+                for sql in statements:
+                    conn.execute(sql)
+                conn.execute("INSERT INTO schema_migrations (version, description) VALUES (?, ?)", (number, description))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            version = number
+            applied = True
+            if verbose:
+                print(f"🛠️ Applied migration {number}: {description}")
+    finally:
+        conn.close()
+    if applied:
+        check_plans(db_path)
+    return version
+
+
+def ensure_migrated(db_path=None):
+    """Cheap per-process guard for app startup: migrates each DB file once."""
+    db_path = db_path or Config.DB_PATH
+    with _lock:
+        if db_path not in _applied:
+            migrate(db_path, verbose=False)
+            _applied.add(db_path)
+
+
+def explain_hot_queries(db_path=None):
+    """Returns {name: [plan details]} for HOT_QUERIES."""
+    conn = sqlite3.connect(db_path or Config.DB_PATH)
+    try:
+        return {
+            name: [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+            for name, (sql, params) in HOT_QUERIES.items()
+        }
+    finally:
+        conn.close()
+
+
+def full_scans(db_path=None):
+    """Hot queries whose plan contains a table SCAN (no usable index) or a temporary B-tree (sort / group step)."""
+    return {
+        name: plan for name, plan in explain_hot_queries(db_path).items()
+        if any(step.startswith(("SCAN", "USE TEMP B-TREE")) for step in plan)
+    }
+
+
+def check_plans(db_path=None):
+    """Raises QueryPlanError naming every hot query that full-scans or sorts through a temp B-tree."""
+    scans = full_scans(db_path)
+    if scans:
+        raise QueryPlanError("Full scans in hot queries: " + "; ".join(
+            f"{name}: {' | '.join(plan)}" for name, plan in scans.items()
+        ))
+
+
+if __name__ == "__main__":
+    print(f"📦 {Config.DB_PATH} at schema version {migrate()}")
+    if "--plans" in sys.argv:
+        for name, plan in explain_hot_queries().items():
+            print(f"  {name}: {' | '.join(plan)}")
+        scans = full_scans()
+        if scans:
+            print(f"❌ Full scans in: {', '.join(scans)}")
+            sys.exit(1)
+        print("✅ No full scans on hot queries.")
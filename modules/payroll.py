@@ -0,0 +1,115 @@
+# modules/payroll.py
+"""
+Overtime arrears engine. A regulation that changes the overtime multiplier affects every
+employee of a region at once, so the batch path never loops per employee: it pages the
+payroll table in keyset chunks (PAYROLL_CHUNK_SIZE rows, loaded columnar via pandas),
+computes old-vs-new arrears with NumPy over whole columns, aggregates per region and
+currency, and writes each chunk's results back with one executemany.
+"""
+import re
+import time
+from itertools import repeat
+import numpy as np
+from config import Config
+from modules.database import (
+    get_employee_salary_details, read_payroll_chunk, start_payroll_run, save_payroll_arrears, finish_payroll_run,
+    fail_payroll_run
+)
+
+ARREARS_COLUMNS = ["emp_id", "region", "currency", "pending_ot_hours", "ot_multiplier", "new_multiplier", "arrears"]
+
+
+# A rate counts only when it follows "overtime" / "OT" within the same sentence ('Overtime ... at 1.75x'),
+# so dates, version numbers and unrelated multipliers elsewhere in the text are ignored
+OT_RATE_RE = re.compile(r"\b(?:overtime|over-time|OT)\b[^.]*?(\d+(?:\.\d+)?)\s*(?:x|×|times)(?![a-z])", re.I)
+
+
+def extract_ot_multiplier(policy_text):
+    """
+    Overtime multiplier a policy sets ('Overtime must be paid at 1.75x'), or None when it names
+    no rate within PAYROLL_OT_MULTIPLIER_RANGE. Callers decide what to do without one; nothing
+    here assumes a default rate.
+    """
+    low, high = Config.PAYROLL_OT_MULTIPLIER_RANGE
+    for match in OT_RATE_RE.finditer(policy_text or ""):
+        rate = float(match.group(1))
+        if low <= rate <= high:
+            return rate
+    return None
+
+
+def compute_arrears(base_hourly, hours, old_multiplier, new_multiplier):
+    """
+    Arrears owed on pending overtime: hours * base * (new - old), rounded to the cent.
+    Works on scalars or whole columns; a lower new rate never claws money back (floored at 0).
+    """
+    base = np.asarray(base_hourly, dtype=np.float64)
+    owed = np.asarray(hours, dtype=np.float64) * base * (np.asarray(new_multiplier, dtype=np.float64) - old_multiplier)
+    return np.round(np.maximum(np.nan_to_num(owed), 0.0), 2)
+
+
+def employee_arrears(emp_id, new_multiplier):
+    """Single-employee view (chat tools): salary details plus `new_multiplier` and `arrears`, or None."""
+    data = get_employee_salary_details(emp_id)
+    if not data:
+        return None
+    arrears = compute_arrears(data["base_hourly"], data["pending_ot_hours"], data["ot_multiplier"], new_multiplier)
+    return {**data, "new_multiplier": new_multiplier, "arrears": float(arrears)}
+
+
+def recompute_arrears(new_multiplier, region=None, regulation=None, chunk_size=None):
+    """
+    Recomputes overtime arrears for every employee of `region` (all regions if None) under
+    `new_multiplier` and stores them as one payroll run. Returns the run report:
+    {"run_id", "region", "new_multiplier", "employees", "affected", "totals", "seconds"}, where
+    totals is [{"region", "currency", "employees", "arrears"}] for employees owed something.
+    If anything fails mid-run, the run is marked 'failed', its partial arrears are deleted and the
+    error is re-raised.
+    """
+    start = time.perf_counter()
+    chunk_size = chunk_size or Config.PAYROLL_CHUNK_SIZE
+    run_id = start_payroll_run(region, new_multiplier, regulation)
+    employees = affected = 0
+    totals = {} # (region, currency) -> [employees, arrears]
+    after = 0
+    try:
+        while True:
+            chunk = read_payroll_chunk(region, after, chunk_size)
+            if chunk.empty:
+                break
+            after = int(chunk["rowid"].iloc[-1])
+            employees += len(chunk)
+
+            chunk["new_multiplier"] = new_multiplier
+            chunk["arrears"] = compute_arrears(
+                chunk["base_hourly"].to_numpy(), chunk["pending_ot_hours"].to_numpy(),
+                chunk["ot_multiplier"].to_numpy(), new_multiplier
+            )
+            owed = chunk[chunk["arrears"] > 0]
+            if owed.empty:
+                continue
+            affected += len(owed)
+            for (reg, currency), group in owed.groupby(["region", "currency"])["arrears"]:
+                entry = totals.setdefault((reg, currency), [0, 0.0])
+                entry[0] += len(group)
+                entry[1] += float(group.sum())
+
+            # Whole columns to Python lists, then zip: far cheaper than itertuples over Arrow-backed strings
+            save_payroll_arrears(zip(repeat(run_id), *(owed[column].tolist() for column in ARREARS_COLUMNS)))
+
+        report_totals = [
+            {"region": reg, "currency": currency, "employees": n, "arrears": round(amount, 2)}
+            for (reg, currency), (n, amount) in sorted(totals.items())
+        ]
+        seconds = round(time.perf_counter() - start, 3)
+        finish_payroll_run(run_id, employees, affected, report_totals, seconds)
+    except BaseException:
+        # Never leave a 'running' run with a partial set of arrears behind, but never let the
+        # cleanup's own failure (locked DB, pool timeout) mask the error that broke the run
+        try:
+            fail_payroll_run(run_id)
+        except Exception as cleanup_error:
+            print(f"⚠️ Could not mark payroll run #{run_id} failed: {cleanup_error}")
+        raise
+    return {"run_id": run_id, "region": region, "new_multiplier": new_multiplier, "employees": employees,
+            "affected": affected, "totals": report_totals, "seconds": seconds}
@@ -0,0 +1,157 @@
+# modules/regulation_feed.py
+import os
+import time
+import hashlib
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup
+from config import Config
+from modules.database import fetch_source_states, save_source_state, enqueue_regulation, transaction
+
+
+def parse_regulation(html):
+    """Regulation page -> (title, body). Falls back to <title>/page text for unfamiliar layouts."""
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.find("h1", class_="reg-title") or soup.find("h1") or soup.find("title")
+    body = soup.find("div", class_="reg-body") or soup.body or soup
+    return (title.text.strip() if title else "Untitled regulation"), body.get_text(" ", strip=True)
+
+
+def content_hash(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+class RegulationPoller:
+    """
+    Watches Config.REGULATION_SOURCES (local files or http(s) URLs) for new or changed regulations.
+
+    Each cycle checks every source concurrently, and most checks stop at the cheapest test:
+      - files: os.stat. An unchanged mtime and size skips the read entirely.
+      - http: a conditional GET with If-None-Match / If-Modified-Since. A 304 has no body.
+    A source that did return content is only parsed and enqueued when its sha256 differs
+    from the stored hash. Per-source validators and hashes live in regulation_sources,
+    and new or changed regulations wait in regulation_queue for analysis.
+    """
+
+    def __init__(self, sources=None, workers=None, timeout=None):
+        self.sources = sources if sources is not None else Config.REGULATION_SOURCES
+        self.workers = workers or Config.REGULATION_POLL_WORKERS
+        self.timeout = timeout or Config.REGULATION_HTTP_TIMEOUT
+        self.last_report = None
+        self._lock = threading.Lock() # One cycle at a time (background thread vs. scan button)
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Fetchers: return (raw bytes or None if unchanged, new validators) ---
+    def _fetch_file(self, source, state):
+        path = source["url"]
+        stat = os.stat(path)
+        validators = {"mtime": stat.st_mtime, "size": stat.st_size}
+        if state and state.get("mtime") == stat.st_mtime and state.get("size") == stat.st_size:
+            return None, validators
+        with open(path, "rb") as f:
+            return f.read(), validators
+
+    def _fetch_http(self, source, state):
+        request = urllib.request.Request(source["url"], headers={"User-Agent": "HR-Nexus-Watchdog"})
+        if state and state.get("etag"):
+            request.add_header("If-None-Match", state["etag"])
+        if state and state.get("last_modified"):
+            request.add_header("If-Modified-Since", state["last_modified"])
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                raw = response.read()
+                validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+                return raw, validators
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None, {"etag": state.get("etag"), "last_modified": state.get("last_modified")}
+            raise
+
+    def _check(self, source, state):
+        """Returns ("unchanged" | "same_content" | "changed", detail)."""
+        is_http = source["url"].startswith(("http://", "https://"))
+        raw, validators = (self._fetch_http if is_http else self._fetch_file)(source, state)
+        if raw is None:
+            return "unchanged", None
+
+        digest = content_hash(raw)
+        validators["content_hash"] = digest
+        if state and state.get("content_hash") == digest:
+            save_source_state(source["url"], validators) # Touched but identical: refresh validators only
+            return "same_content", None
+
+        title, body = parse_regulation(raw.decode("utf-8", errors="replace"))
+        # One commit: new validators without the queued item would make the next poll see
+        # "unchanged" and lose this regulation for good
+        with transaction():
+            item_id = enqueue_regulation(source["url"], source.get("region"), title, body, digest)
+            save_source_state(source["url"], validators, changed=True, title=title)
+        return "changed", {"item_id": item_id, "title": title, "source": source.get("name", source["url"])}
+
+    def poll_once(self):
+        """One cycle over every source -> {"checked", "unchanged", "same_content", "changed", "errors", "new", "seconds"}."""
+        with self._lock:
+            start = time.perf_counter()
+            states = fetch_source_states()
+            report = {"checked": len(self.sources), "unchanged": 0, "same_content": 0, "changed": 0,
+                      "errors": [], "new": []}
+
+            def check(source):
+                try:
+                    return source, self._check(source, states.get(source["url"]))
+                except Exception as e:
+                    return source, ("error", f"{source.get('name', source['url'])}: {e}")
+
+            if self.sources:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(self.sources))) as pool:
+                    for source, (outcome, detail) in pool.map(check, self.sources):
+                        if outcome == "error":
+                            report["errors"].append(detail)
+                            continue
+                        report[outcome] += 1
+                        if detail:
+                            report["new"].append(detail)
+
+            report["seconds"] = round(time.perf_counter() - start, 3)
+            self.last_report = report
+            return report
+
+    # --- Background polling ---
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                report = self.poll_once()
+                if report["new"]:
+                    print(f"📡 Regulation feed: {len(report['new'])} new/changed of {report['checked']} sources")
+            except Exception as e:
+                print(f"Regulation poller error: {e}")
+            self._stop.wait(interval)
+
+    def start(self, interval=None):
+        """Starts the background thread (idempotent). interval <= 0 leaves polling manual."""
+        interval = Config.REGULATION_POLL_SECONDS if interval is None else interval
+        if interval <= 0 or (self._thread and self._thread.is_alive()):
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True, name="regulation-poller")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def get_regulation_poller():
+    """Process-wide poller shared by every admin session."""
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = RegulationPoller()
+        return _poller
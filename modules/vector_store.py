@@ -0,0 +1,282 @@
+# modules/vector_store.py
+"""
+On-disk format for one region shard, replacing LangChain's FAISS.save_local/load_local
+(a pickled docstore that is read whole into RAM):
+
+    <shard>/index.faiss   raw FAISS index, opened memory-mapped (pages shared via the OS cache)
+    <shard>/chunks.db     SQLite docstore: one row per vector position (chunk id, text, JSON metadata)
+                          plus an FTS5 inverted index over the text for BM25 (lexical) search
+
+Opening a shard costs the same whatever the corpus size. Only the top-k hits of a
+search are read from chunks.db and turned into Documents, and nothing is unpickled.
+"""
+import os
+import re
+import json
+import shutil
+import sqlite3
+import threading
+import numpy as np
+import faiss
+from langchain_core.documents import Document
+from config import Config
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "chunks.db"
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+STOPWORDS = frozenset(
+    "a an and are am as at be by can do does for from get got how i if in is it me my of on or our "
+    "should so than that the their there this to was what when where which who why will with you your".split()
+)
+# In-place mmap of flat vector storage (older FAISS builds only have the copying IO_FLAG_MMAP)
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+class MmapShard:
+    """Read-only shard: memory-mapped FAISS index + lazily materialized chunks."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = tune(faiss.read_index(os.path.join(path, INDEX_FILE), MMAP_FLAGS))
+        # Opened now, not lazily: after write_shard() swaps the directory this handle still
+        # reads the docstore that matches our index, never the new one
+        uri = f"file:{os.path.join(path, DOCSTORE_FILE)}?mode=ro"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def _rows(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal
+
+    def _materialize(self, positions):
+        """{position: Document} for just these vector positions."""
+        marks = ",".join("?" * len(positions))
+        rows = self._rows(f"SELECT pos, chunk_id, text, metadata FROM chunks WHERE pos IN ({marks})", positions)
+        return {pos: Document(id=chunk_id, page_content=text, metadata=json.loads(metadata))
+                for pos, chunk_id, text, metadata in rows}
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        """[(Document, L2 distance)] nearest first, like the LangChain FAISS method of the same name."""
+        if self.index.ntotal == 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        distances, positions = self.index.search(query, min(k, self.index.ntotal))
+        hits = [(int(p), float(d)) for p, d in zip(positions[0], distances[0]) if p >= 0]
+        docs = self._materialize([p for p, _ in hits]) if hits else {}
+        return [(docs[p], d) for p, d in hits if p in docs]
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def lexical_search_with_score(self, text, k=4):
+        """[(Document, BM25 score)] best first; FTS5 scores are negative, lower is better. No embedding needed."""
+        query = match_query(text)
+        if not query:
+            return []
+        rows = self._rows(
+            """SELECT c.chunk_id, c.text, c.metadata, bm25(chunks_fts) AS score
+               FROM chunks_fts JOIN chunks c ON c.pos = chunks_fts.rowid
+               WHERE chunks_fts MATCH ? ORDER BY score LIMIT ?""", (query, k)
+        )
+        return [(Document(id=chunk_id, page_content=text, metadata=json.loads(metadata)), score)
+                for chunk_id, text, metadata, score in rows]
+
+    def search(self, text, query_vector, k=4, mode="vector"):
+        """
+        [(Document, score)] best first in the given RETRIEVAL_MODE, lower score is better:
+        L2 distance (vector), BM25 (lexical) or negated reciprocal-rank-fusion score (hybrid).
+        query_vector may be None in lexical mode.
+        """
+        if mode == "lexical":
+            return self.lexical_search_with_score(text, k)
+        if mode == "vector":
+            return self.similarity_search_with_score_by_vector(query_vector, k)
+        rankings = [self.similarity_search_with_score_by_vector(query_vector, 2 * k),
+                    self.lexical_search_with_score(text, 2 * k)]
+        return [(doc, -score) for doc, score in reciprocal_rank_fusion(rankings)[:k]]
+
+    def read_all(self):
+        """
+        (vectors n x d float32, [chunk_id], [text], [metadata]) in position order, for rewrites.
+        vectors is None when the index only keeps compressed codes (PQ): re-embed the texts instead.
+        """
+        vectors = None
+        if self.index.ntotal and not is_lossy(self.index):
+            ivf = _ivf(self.index)
+            if ivf is not None:
+                ivf.make_direct_map() # IVF lists are keyed by cluster; reconstruct needs id -> slot
+            vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        rows = self._rows("SELECT chunk_id, text, metadata FROM chunks ORDER BY pos")
+        return vectors, [r[0] for r in rows], [r[1] for r in rows], [json.loads(r[2]) for r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _ivf(index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def is_lossy(index):
+    ivf = _ivf(index)
+    return ivf is not None and isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ)
+
+
+def tune(index):
+    """Applies the query-time knobs from Config (they are not fixed at build time)."""
+    ivf = _ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(Config.IVF_NPROBE, ivf.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = Config.HNSW_EF_SEARCH
+    return index
+
+
+def factory_string(count, dim, index_type=None):
+    """
+    FAISS index_factory description for a shard of `count` vectors. Small shards stay
+    exact whatever the configured type; approximate indexes only pay off at scale.
+    """
+    index_type = index_type or Config.VECTOR_INDEX_TYPE
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown VECTOR_INDEX_TYPE {index_type!r} (expected one of {INDEX_TYPES})")
+    if index_type == "flat" or count < Config.VECTOR_INDEX_MIN_CHUNKS:
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{Config.HNSW_M}"
+    # ~39 training points per centroid is FAISS's floor for a usable k-means
+    nlist = Config.IVF_NLIST or int(4 * np.sqrt(count))
+    nlist = max(1, min(nlist, count // 39))
+    if index_type == "ivf_flat" or count < 39 * 2 ** Config.PQ_BITS: # Too few points to train the PQ codebooks
+        return f"IVF{nlist},Flat"
+    if dim % Config.PQ_M:
+        raise ValueError(f"PQ_M={Config.PQ_M} must divide the embedding dimension {dim}")
+    return f"IVF{nlist},PQ{Config.PQ_M}x{Config.PQ_BITS}"
+
+
+def build_index(vectors, index_type=None):
+    """Builds (and trains, for IVF/PQ) the configured index type over `vectors`."""
+    count, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(count, dim, index_type))
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = Config.HNSW_EF_CONSTRUCTION
+    if not index.is_trained:
+        sample = vectors
+        if count > Config.IVF_TRAIN_SAMPLE:
+            rows = np.random.default_rng(0).choice(count, Config.IVF_TRAIN_SAMPLE, replace=False)
+            sample = vectors[np.sort(rows)]
+        index.train(sample)
+    index.add(vectors)
+    return tune(index)
+
+
+def tokenize(text):
+    """Lower-cased word pieces; '401k' also yields '401' and 'k' to line up with FTS5's split of '401(k)'."""
+    terms = []
+    for word in re.findall(r"\w+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        terms.append(word)
+        pieces = re.findall(r"\d+|[^\W\d_]+", word)
+        if len(pieces) > 1:
+            terms.extend(pieces)
+    return list(dict.fromkeys(terms))
+
+
+def match_query(text):
+    """FTS5 MATCH expression: any term may match (BM25 ranks docs matching more/rarer terms higher)."""
+    return " OR ".join(f'"{term}"' for term in tokenize(text))
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=None):
+    """Merges ranked [(Document, score)] lists by sum(1 / (rrf_k + rank)) -> [(Document, fused)] best first."""
+    rrf_k = rrf_k or Config.HYBRID_RRF_K
+    fused, docs = {}, {}
+    for ranking in rankings:
+        for rank, (doc, _) in enumerate(ranking, start=1):
+            fused[doc.id] = fused.get(doc.id, 0.0) + 1.0 / (rrf_k + rank)
+            docs[doc.id] = doc
+    return sorted(((docs[i], score) for i, score in fused.items()), key=lambda pair: -pair[1])
+
+
+STAGING_RE = re.compile(r"\.(tmp|old)-(\d+)$") # write_shard's <shard>.tmp-<pid> / <shard>.old-<pid> dirs
+
+
+def write_shard(path, vectors, chunk_ids, texts, metadatas, index_type=None):
+    """
+    Writes a complete shard next to `path` and swaps it in. Readers that already opened the
+    old files keep a valid mapping (the inodes live on until they close).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    faiss.write_index(build_index(vectors, index_type), os.path.join(tmp_path, INDEX_FILE))
+    conn = sqlite3.connect(os.path.join(tmp_path, DOCSTORE_FILE))
+    conn.execute("CREATE TABLE chunks (pos INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE, text TEXT, metadata TEXT)")
+    conn.executemany(
+        "INSERT INTO chunks VALUES (?, ?, ?, ?)",
+        ((pos, cid, text, json.dumps(meta)) for pos, (cid, text, meta) in enumerate(zip(chunk_ids, texts, metadatas)))
+    )
+    # External-content FTS5: only the inverted index is stored, the text stays in `chunks`
+    conn.execute("""CREATE VIRTUAL TABLE chunks_fts USING fts5(
+                        text, content='chunks', content_rowid='pos', tokenize='porter unicode61')""")
+    conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('rebuild')")
+    conn.commit()
+    conn.close()
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def describe(index):
+    """Short label for reports, e.g. 'IndexIVFPQ nlist=800 nprobe=16'."""
+    ivf = _ivf(index)
+    if ivf is not None:
+        return f"{type(index).__name__} nlist={ivf.nlist} nprobe={ivf.nprobe}"
+    if isinstance(index, faiss.IndexHNSW):
+        return f"{type(index).__name__} efSearch={index.hnsw.efSearch}"
+    return type(index).__name__
+
+
+def is_shard(path):
+    """A complete, swapped-in shard (write_shard's staging directories never count, even if complete)."""
+    if STAGING_RE.search(os.path.basename(os.path.normpath(path))):
+        return False
+    return os.path.exists(os.path.join(path, INDEX_FILE)) and os.path.exists(os.path.join(path, DOCSTORE_FILE))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def remove_stale_staging(shards_root):
+    """Deletes staging dirs left by writers that crashed mid-swap (their pid is gone). Returns their names."""
+    removed = []
+    if not os.path.isdir(shards_root):
+        return removed
+    for name in os.listdir(shards_root):
+        match = STAGING_RE.search(name)
+        if match and not _pid_alive(int(match.group(2))):
+            shutil.rmtree(os.path.join(shards_root, name), ignore_errors=True)
+            removed.append(name)
+    return removed
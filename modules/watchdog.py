@@ -1,33 +1,90 @@
 # modules/watchdog.py
-import os
-from bs4 import BeautifulSoup
+import hashlib
 from langchain_core.messages import HumanMessage, SystemMessage
 from config import Config
+from modules.database import (
+    fetch_watchdog_result,
+    save_watchdog_result,
+    fetch_watchdog_history,
+    fetch_pending_regulations,
+    mark_regulation,
+)
+from modules.regulation_feed import get_regulation_poller
+from modules.payroll import extract_ot_multiplier, recompute_arrears
 
 class PolicyWatchdog:
     def __init__(self, agent):
         self.agent = agent # We reuse the existing HRAgent instance
-        self.target_url = "simulated_internet/gov_page.html" # The mock URL
+        self.poller = get_regulation_poller() # Config.REGULATION_SOURCES (was a single mock URL)
 
     def check_for_updates(self):
-        """Simulates scraping the government website."""
-        if not os.path.exists(self.target_url):
-            return {"status": "error", "content": "No website found. Run gov_app.py first."}
-        
-        # 1. SCRAPE
-        with open(self.target_url, "r") as f:
-            html = f.read()
-            
-        soup = BeautifulSoup(html, "html.parser")
-        
-        try:
-            title = soup.find("h1", class_="reg-title").text
-            body = soup.find("div", class_="reg-body").text.strip()
-            return {"status": "success", "title": title, "body": body}
-        except AttributeError:
-            return {"status": "error", "content": "Could not parse website structure."}
+        """
+        Runs one poll over every regulation source and returns the oldest regulation still
+        waiting for analysis. Unchanged sources cost a stat() / 304 and never reach the queue.
+        """
+        report = self.poller.poll_once()
+        pending = fetch_pending_regulations(limit=1)
+        if pending:
+            item = pending[0]
+            return {"status": "success", "title": item["title"], "body": item["body"],
+                    "item_id": item["item_id"], "source": item["source"], "region": item["region"], "report": report}
+
+        detail = f"No new or changed regulations ({report['checked']} sources checked in {report['seconds']}s)."
+        if report["errors"]:
+            detail += " Errors: " + "; ".join(report["errors"])
+        return {"status": "error", "content": detail, "report": report}
+
+    def mark_analyzed(self, item_id):
+        mark_regulation(item_id, "analyzed")
+
+    def ot_multiplier(self, regulation_text):
+        """Overtime rate the regulation sets, or None; shown for confirmation before payroll_impact runs."""
+        return extract_ot_multiplier(regulation_text)
+
+    def payroll_impact(self, new_multiplier, region=None, title=None):
+        """
+        Workforce-wide arrears at a confirmed overtime rate (see ot_multiplier): one batch run over
+        the region's payroll (see modules.payroll), not one tool call per employee.
+        """
+        return recompute_arrears(new_multiplier, region=region, regulation=title)
+
+    # --- Result store (keyed by content, KB version and model) ---
+    def _cache_key(self, kind, text, *extra):
+        kb_version = self.agent.researcher.kb_version
+        raw = "|".join([kind, text, kb_version, Config.MODEL_NAME, *extra])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest(), kb_version
+
+    def _memoized(self, kind, text, compute, title=None, refresh=False, extra=()):
+        """Serves the stored result for (kind, text, KB version, model, extra); computes and appends on miss/refresh."""
+        cache_key, kb_version = self._cache_key(kind, text, *extra)
+        if not refresh:
+            stored = fetch_watchdog_result(cache_key)
+            if stored:
+                return {**stored["result"], "cached": True, "created_at": stored["created_at"]}
+        result = compute()
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        save_watchdog_result(cache_key, kind, title, content_hash, kb_version, Config.MODEL_NAME, result)
+        return {**result, "cached": False, "created_at": None}
+
+    def cached_analysis(self, new_regulation_text):
+        """Stored analysis for this text under the current KB + model, without any LLM call (or None)."""
+        stored = fetch_watchdog_result(self._cache_key("analysis", new_regulation_text)[0])
+        if stored:
+            return {**stored["result"], "cached": True, "created_at": stored["created_at"]}
+        return None
+
+    def history(self, limit=20):
+        return fetch_watchdog_history("analysis", limit)
 
-    def analyze_impact(self, new_regulation_text):
+    def analyze_impact(self, new_regulation_text, title=None, refresh=False):
+        """
+        Memoized: identical text against the same KB version and model is served from
+        watchdog_results. refresh=True recomputes and appends a new history entry.
+        """
+        return self._memoized("analysis", new_regulation_text,
+                              lambda: self._analyze_impact(new_regulation_text), title=title, refresh=refresh)
+
+    def _analyze_impact(self, new_regulation_text):
         """
         1. Summarize new law.
         2. RAG Search internal DB for relevant existing policies.
@@ -35,14 +92,14 @@ class PolicyWatchdog:
         """
         # A. Summarize & Extract Keywords
         summary_prompt = f"Extract the 3 main keywords from this new law: {new_regulation_text}"
-        keywords_res = self.agent.llm.invoke([HumanMessage(content=summary_prompt)])
+        keywords_res = self.agent.llm.invoke([HumanMessage(content=summary_prompt)], label="watchdog_keywords")
         keywords = keywords_res.content
         
-        # B. RAG Search (FIXED LINE BELOW)
-        # We now access the DB through the 'researcher' worker
-        # We check if the researcher has a loaded DB first
-        if self.agent.researcher.vector_db:
-            docs = self.agent.researcher.vector_db.similarity_search(new_regulation_text, k=4)
+        # B. RAG Search across every region shard
+        # We access the DB through the 'researcher' worker
+        # We check if the researcher has any loaded shard first
+        if self.agent.researcher.shards:
+            docs = self.agent.researcher.search_all(new_regulation_text, k=4)
             current_policy_context = "\n".join([d.page_content for d in docs])
         else:
             current_policy_context = "Internal Policy Database is empty."
@@ -68,7 +125,7 @@ class PolicyWatchdog:
         Output format: Markdown.
         """
         
-        comparison = self.agent.llm.invoke([HumanMessage(content=analysis_prompt)]).content
+        comparison = self.agent.llm.invoke([HumanMessage(content=analysis_prompt)], label="watchdog_analysis").content
         
         return {
             "keywords": keywords,
@@ -76,7 +133,14 @@ class PolicyWatchdog:
             "comparison_analysis": comparison
         }
 
-    def draft_legal_email(self, analysis_text, recipient="legal@company.com"):
+    def draft_legal_email(self, analysis_text, recipient="legal@company.com", refresh=False):
+        """Memoized on (analysis text, recipient, KB version, model)."""
+        result = self._memoized("legal_email", analysis_text,
+                                lambda: {"email": self._draft_legal_email(analysis_text, recipient)},
+                                refresh=refresh, extra=(recipient,))
+        return result["email"]
+
+    def _draft_legal_email(self, analysis_text, recipient):
         prompt = f"""
         Draft a formal email to Legal Counsel ({recipient}).
         Subject: URGENT: Policy Update Required - Compliance Gap Identified
@@ -89,5 +153,5 @@ class PolicyWatchdog:
         Analysis Data:
         {analysis_text}
         """
-        email = self.agent.llm.invoke([HumanMessage(content=prompt)]).content
+        email = self.agent.llm.invoke([HumanMessage(content=prompt)], label="legal_email").content
         return email
\ No newline at end of file
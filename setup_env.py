@@ -3,6 +3,7 @@ import os
 import sqlite3
 from fpdf import FPDF
 from config import Config
+from modules.migrations import migrate
 
 # Ensure data directories exist
 os.makedirs(os.path.dirname(Config.DB_PATH), exist_ok=True)
@@ -13,26 +14,12 @@ os.makedirs(Config.POLICIES_DIR, exist_ok=True)
 
 # --- 2. GENERATE SQLITE DATABASE ---
 print(f"Initializing Database at: {Config.DB_PATH}")
+# Tables & indexes come from the versioned migrations (also upgrades existing DBs in place)
+schema_version = migrate(Config.DB_PATH)
+
 conn = sqlite3.connect(Config.DB_PATH)
 c = conn.cursor()
 
-# Table: Users
-c.execute('''CREATE TABLE IF NOT EXISTS users 
-             (id TEXT PRIMARY KEY, name TEXT, role TEXT, region TEXT, language TEXT)''')
-
-# Table: Tickets
-c.execute('''CREATE TABLE IF NOT EXISTS tickets 
-             (ticket_id INTEGER PRIMARY KEY AUTOINCREMENT, emp_id TEXT, 
-              question TEXT, score REAL, assigned_to TEXT, status TEXT)''')
-
-# NEW TABLE: Chat History
-c.execute('''CREATE TABLE IF NOT EXISTS chat_history 
-             (msg_id INTEGER PRIMARY KEY AUTOINCREMENT, 
-              user_id TEXT, 
-              role TEXT, 
-              content TEXT, 
-              timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-
 # --- DATA SEEDING ---
 # (Keep your existing user list here)
 users = [
@@ -44,7 +31,15 @@ users = [
 ]
 
 c.executemany("INSERT OR REPLACE INTO users VALUES (?,?,?,?,?)", users)
+
+# (emp_id, region, currency, base_hourly, pending_ot_hours, ot_multiplier currently paid)
+payroll = [
+    ('EMP001', 'US', 'USD', 50, 10, 1.5), # John
+    ('EMP002', 'India', 'Rs', 1153, 30, 1.5), # Rahul (Approx 2L/month)
+]
+c.executemany("INSERT OR REPLACE INTO payroll (emp_id, region, currency, base_hourly, pending_ot_hours, ot_multiplier) "
+              "VALUES (?,?,?,?,?,?)", payroll)
 conn.commit()
 conn.close()
 
-print("\n✅ Database Updated! 'chat_history' table created.")
\ No newline at end of file
+print(f"\n✅ Database Updated! Schema version {schema_version}.")
\ No newline at end of file